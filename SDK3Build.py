@@ -54,6 +54,13 @@ from xml.dom.minidom import parseString
 from ARFuncs import *
 from time import localtime, strftime
 from Common_GitUtils import *
+from Common_BuildScheduler import *
+from Common_CheckBuild import *
+from Common_BuildTrace import *
+from Common_BuildRusage import *
+from Common_PyProfile import *
+from Common_BuildHistory import *
+from Common_ArtifactCache import *
 import commandLine
 import xmlreader
 import time
@@ -75,8 +82,19 @@ DEBUG_MODE = False
 
 #
 # Init the log file
+# (the check mode has its own, to keep the log and records of the last build)
 #
-ARInitLogFile()
+if '--check' in sys.argv:
+    ARInitLogFile('build.check.log')
+else:
+    ARInitLogFile()
+
+#
+# Profile the build scripts if requested
+# (this must be done before parsing the command line, to include the XML parsing)
+#
+if '--pyprofile' in sys.argv:
+    Common_StartPyProfile()
 
 #
 # Get extra xml dirs
@@ -92,7 +110,7 @@ except:
 #
 # Parse XML
 #
-(repos, targets, prebuilts, libraries, binaries) = xmlreader.parseAll(xmlDirs)
+(repos, targets, prebuilts, libraries, binaries) = xmlreader.parseAll(xmlDirs, cacheFile=xmlreader.getModelCacheFile())
 
 if DEBUG_MODE:
     ARPrint ('Debug mode enabled : dump XML contents')
@@ -111,18 +129,68 @@ if hasArgComplete:
     argcomplete.autocomplete(parser.parser)
 parser.parse(sys.argv)
 
+#
+# Setup console verbosity and structured log
+#
+if parser.logLevel is not None:
+    ARSetLogLevel(parser.logLevel)
+if parser.logJsonFile is not None:
+    ARSetLogJsonFile(parser.logJsonFile)
+if parser.taskLogs:
+    ARSetEnv('ARSDK_TASK_LOGS', '1')
+if parser.keepGoing:
+    ARSetEnv('ARSDK_KEEP_GOING', '1')
+
 #
 # Dump command line args into log file
 #
 parser.dump()
 
+#
+# Check mode : report what needs to be rebuilt, without running any command
+# (this must stay before any git/make/terminal command, and before the
+# records of the last build are reset)
+#
+if parser.checkOnly:
+    upToDate = Common_CheckTargets(parser.activeTargets, parser.activeLibs, parser.activeBins, debug=parser.isDebug, inhouse=parser.isInHouse, nodeps=parser.noDeps, requestedArchs=parser.archs)
+    exit(0 if upToDate else 1)
+
+Common_StartRusageRecording()
+Common_StartBuildHistory()
+
+#
+# Record the build spans if a trace was requested
+#
+buildSpan = None
+if parser.traceFile is not None:
+    ARSetTraceFile(Common_GetTraceSpansFile())
+    buildSpan = ARTraceSpan('SDK3Build', targets=' '.join([ str(t) for t in parser.activeTargets ]), variant='debug' if parser.isDebug else 'release')
+
 #
 # Export useful tools if available
 # (e.g. colormake)
 #
-ARMakeArgs = '-j ' + str(parser.threads)
+# All make invocations share a single jobserver, so that the whole build
+# runs at most -j jobs, however the work is split between processes
+if ARJobServerStart(parser.threads):
+    ARMakeArgs = ''
+else:
+    ARMakeArgs = '-j ' + str(parser.threads)
 ARSetEnvIfExists('ARMAKE', 'colormake', 'make', args=ARMakeArgs)
 
+#
+# Export artifact cache settings for the build processes
+#
+if not parser.useCache:
+    ARSetEnv('ARSDK_NO_CACHE', '1')
+else:
+    if parser.cacheDir:
+        ARSetEnv('ARSDK_CACHE_DIR', parser.cacheDir)
+    if parser.remoteCacheUrl:
+        ARSetEnv('ARSDK_REMOTE_CACHE_URL', parser.remoteCacheUrl)
+    # A remote cache disabled by a previous build is tried again
+    Common_ResetRemoteCache()
+
 # Import targets functions for library/binary/doc
 # This block will try to import the functions for all targets declared in targets.xml file
 # Adding a new target requires the following modifications :
@@ -196,15 +264,45 @@ ARSetEnv('AR_ANDROID_API_VERSION', '19')
 #
 # Actual build loop
 #
+if parser.parallelBuild and not Common_CanRunBuildTasks():
+    ARLog('Parallel build needs to fork the build tasks : building sequentially')
+    parser.parallelBuild = False
+    parser.parallelTargets = False
+
 allOk = True
-for target in parser.activeTargets:
+if parser.parallelTargets:
+    # All targets pipelines are run side by side, sharing the same job budget
+    scheduler = ARBuildScheduler(parser.threads)
+    for target in parser.activeTargets:
+        Common_AddTargetTasks(scheduler, target, parser.activeLibs, parser.activeBins, libraries, BUILD_LIB_FUNCS.get(target.name), BUILD_BIN_FUNCS.get(target.name), GEN_DOC_FUNCS.get(target.name), genDoc=parser.genDoc, clean=parser.isClean, debug=parser.isDebug, nodeps=parser.noDeps, inhouse=parser.isInHouse, requestedArchs=parser.archs, isMp=parser.multiProcess)
+    scheduler.dump()
+    allOk = scheduler.run()
+    scheduler.dump()
+    sequentialTargets = []
+else:
+    sequentialTargets = parser.activeTargets
+
+for target in sequentialTargets:
     libraries.clearCache()
     binaries.clearCache()
+    if parser.parallelBuild:
+        # Libraries and binaries are built together, following the dependency graph
+        scheduler = ARBuildScheduler(parser.threads)
+        Common_AddTargetTasks(scheduler, target, parser.activeLibs, parser.activeBins, libraries, BUILD_LIB_FUNCS.get(target.name), BUILD_BIN_FUNCS.get(target.name), GEN_DOC_FUNCS.get(target.name), genDoc=parser.genDoc, clean=parser.isClean, debug=parser.isDebug, nodeps=parser.noDeps, inhouse=parser.isInHouse, requestedArchs=parser.archs, isMp=parser.multiProcess)
+        scheduler.dump()
+        if not scheduler.run():
+            allOk = False
+        scheduler.dump()
+        if not allOk:
+            break
+        continue
     if parser.activeLibs:
         if target.name in BUILD_LIB_FUNCS:
             for lib in parser.activeLibs:
                 if not BUILD_LIB_FUNCS[target.name](target, lib, clean=parser.isClean, debug=parser.isDebug, nodeps=parser.noDeps, inhouse=parser.isInHouse, requestedArchs=parser.archs, isMp=parser.multiProcess):
                     allOk = False
+                # Give back the tokens of cancelled builds
+                ARJobServerResync()
         else:
             ARLog('Unable to build libraries for target %(target)s' % locals())
         if parser.genDoc and not parser.isClean:
@@ -223,14 +321,14 @@ for target in parser.activeTargets:
                 if not BUILD_BIN_FUNCS[target.name](target, bin, clean=parser.isClean, debug=parser.isDebug, nodeps=parser.noDeps, inhouse=parser.isInHouse, requestedArchs=parser.archs):
                     target.failed = True
                     allOk = False
+                ARJobServerResync()
         else:
             ARLog('Unable to build binaries for target %(target)s' % locals())
 
     for scrinfo in target.postbuildScripts:
         scr = scrinfo['path']
         if allOk:
-            if not ARExecute(scr + ' >/dev/null 2>&1', failOnError=False):
-                ARPrint('Error while running ' + scr + '. Run manually to see the output')
+            if not Common_RunPostbuildScript(target, scr):
                 target.failed = True
                 scrinfo['done'] = False
                 allOk=False
@@ -342,10 +440,18 @@ for t in targets.list:
     ARPrint('')
     ARPrint('')
 
+Common_PrintRusageSummary()
+
 ARLog('End of build')
 if not allOk:
     ARLog('-- Errors were found during build ! --')
 
+Common_CompactDurations()
+
+if buildSpan is not None:
+    buildSpan.stop(allOk)
+    Common_ExportChromeTrace(Common_GetTraceSpansFile(), parser.traceFile)
+
 end = time.time()
 
 seconds = int(end - start)
@@ -361,5 +467,7 @@ if hours > 0:
 if minutes > 0:
     strm = str(minutes) + 'm '
 ARLog('Build took %(strh)s%(strm)s%(strs)s' % locals())
+
+Common_ArchiveBuild(start, allOk, ' '.join(sys.argv[1:]))
         
 sys.exit (0 if allOk else 1)
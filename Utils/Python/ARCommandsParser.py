@@ -79,11 +79,15 @@ BITFIELD_TYPES_MAX_VAL = [2**7, 2**15, 2**31]
 #
 # Class definitions
 #
+# A generator loads all the features at once : the classes use __slots__ and
+# interned names to keep them small
+#
 
-class AREnumVal:
+class AREnumVal(object):
     "Represent an value of an Enum"
+    __slots__ = ('name', 'val', 'comments')
     def __init__(self, enumName):
-        self.name     = enumName
+        self.name     = ARIntern(enumName)
         self.val      = None
         self.comments = []
     def addCommentLine(self, newCommentLine):
@@ -98,10 +102,11 @@ class AREnumVal:
         desc = desc + '\n comments:' + str(self.comments)
         return desc
         
-class AREnum:
+class AREnum(object):
     "Represent an Enum"
+    __slots__ = ('name', 'values', 'comments', 'usedLikeBitfield')
     def __init__(self, enumName):
-        self.name     = enumName
+        self.name     = ARIntern(enumName)
         self.values = []
         self.comments = []
         self.usedLikeBitfield = False
@@ -121,8 +126,9 @@ class AREnum:
         desc = desc + '\n comments:' + str(self.comments)
         return desc
         
-class ARBitfield:
+class ARBitfield(object):
     "Represent an bitfield"
+    __slots__ = ('enum', 'type')
     def __init__(self, enum, lenType):
         self.enum = enum
         self.type = lenType
@@ -151,10 +157,11 @@ class ARBitfield:
             
         return ret
     
-class ARArg:
+class ARArg(object):
     "Represent an argument of a command"
+    __slots__ = ('name', 'type', 'comments', 'enums')
     def __init__(self, argName, argType):
-        self.name     = argName
+        self.name     = ARIntern(argName)
         self.type     = argType
         
         if isinstance(argType, AREnum):
@@ -278,8 +285,9 @@ class ARCommandNotification:
         else:
             raise ValueError
 
-class ARComment:
+class ARComment(object):
     "Commentary of command or event"
+    __slots__ = ('title', 'desc', 'support', 'triggered', 'result')
     def __init__(self, title):
         self.title      = title
         self.desc       = None
@@ -306,10 +314,11 @@ class ARComment:
         return desc
 
 
-class ARMessage :
+class ARMessage (object):
     "Represent a message"
+    __slots__ = ('name', 'ident', 'comments', 'args', 'buf', 'timeout', 'listtype', 'isNotif', 'mapKey', 'comment', 'cls')
     def __init__(self, cmdName, ident):
-        self.name     = cmdName
+        self.name     = ARIntern(cmdName)
         self.ident    = ident
         self.comments = []
         self.args     = []
@@ -376,6 +385,7 @@ class ARMessage :
         
 class ARCommand (ARMessage):
     "Represent a command"
+    __slots__ = ()
     def __init__(self, cmdName, ident):
         ARMessage.__init__(self, cmdName, ident)
     def strType(self):
@@ -383,6 +393,7 @@ class ARCommand (ARMessage):
         
 class AREvent (ARMessage):
     "Represent a event"
+    __slots__ = ()
     def __init__(self, cmdName, ident):
         ARMessage.__init__(self, cmdName, ident)
     def strType(self):
@@ -390,10 +401,11 @@ class AREvent (ARMessage):
 
 MAX_CLASS_ID = 255
 CLASS_MAX_CMDS = 65536
-class ARClass:
+class ARClass(object):
     "Represent a class of commands"
+    __slots__ = ('name', 'ident', 'comments', 'cmds', 'projExt')
     def __init__(self, className, ident):
-        self.name     = className
+        self.name     = ARIntern(className)
         self.ident    = ident
         self.comments = []
         self.cmds     = []
@@ -420,10 +432,11 @@ class ARClass:
 
 PROJECT_MAX_CLASS = 256
 MAX_PROJECT_ID = 255
-class ARProject:
+class ARProject(object):
     "Represent a project (an XML file)"
+    __slots__ = ('name', 'ident', 'comments', 'classes')
     def __init__(self, projectName, ident):
-        self.name     = projectName
+        self.name     = ARIntern(projectName)
         self.ident    = ident
         self.comments = []
         self.classes  = []
@@ -453,10 +466,11 @@ class ARProject:
         
 MAX_FEATURE_ID = 255
 FEATURE_MAX_CMDS_EVTS = 65536
-class ARFeature:
+class ARFeature(object):
     "Represent a feature (an XML file)"
+    __slots__ = ('name', 'ident', 'comments', 'enums', 'cmds', 'evts', 'classes')
     def __init__(self, featureName, ident):
-        self.name       = featureName
+        self.name       = ARIntern(featureName)
         self.ident      = ident
         self.comments   = []
         self.enums      = []
@@ -32,10 +32,13 @@ import sys
 import subprocess
 import os
 import inspect
+import functools
 import shutil
 import re
+import shlex
 import filecmp
 import errno
+import time
 
 # Print a message
 def ARPrint(msg, noNewLine=False):
@@ -70,43 +73,299 @@ class Chdir:
             except:
                 pass
 
-# Execute a bash command
+# Execute a command
+# A string is run by the shell, a list (argv) is run directly, without shell
 def ARExecute(cmdline, isShell=True, failOnError=False, printErrorMessage=True):
+    if isinstance(cmdline, list):
+        isShell = False
+    cmdstr = ARQuoteArgs(cmdline) if isinstance(cmdline, list) else cmdline
+    inTaskLog = ARTaskLogState['fd'] is not None and ARTaskLogState['pid'] == os.getpid()
+    if printErrorMessage:
+        # With a task log, the console only gets the progress line
+        ARLog('Running <%(cmdstr)s>' % locals(), level=ARLOG_DEBUG if inTaskLog else ARLOG_INFO)
     try:
-        if printErrorMessage:
-            ARLog('Running <%(cmdline)s>' % locals())
-        subprocess.check_call(cmdline, shell=isShell)
-        return True
-    except subprocess.CalledProcessError as e:
-        if printErrorMessage:
-            ARPrint('Error while running <%(cmdline)s>' % locals())
-        if failOnError:
-            EXIT(e.returncode)
+        if inTaskLog:
+            (ret, tail) = ARExecuteInTaskLog(cmdline, isShell)
         else:
-            return False
+            start = time.time()
+            p = ARPopen(cmdline, isShell)
+            (ret, tail) = (ARWaitProcess(p, cmdline, start), None)
+    except OSError as e:
+        return ARExecuteStartFailed(cmdstr, e, failOnError, printErrorMessage)
+    if ret == 0:
+        return True
+    if printErrorMessage:
+        if tail is not None:
+            ARTaskLogPrintTail(tail)
+        ARLogError('Error while running <%(cmdstr)s>' % locals())
+    if failOnError:
+        EXIT(ret)
+    return False
+
+# Start a command, with access to the jobserver
+# The messages logged so far are written first : the command (or the build
+# scripts it runs) may write to the log files too
+def ARPopen(cmdline, isShell, **kwargs):
+    ARFlushLog()
+    kwargs.update(ARJobServerPopenArgs())
+    return subprocess.Popen(cmdline, shell=isShell, **kwargs)
+
+# Failure of a command which could not be started (e.g. missing program)
+# It fails like a shell would for a command not found
+def ARExecuteStartFailed(cmdstr, err, failOnError, printErrorMessage):
+    if printErrorMessage:
+        ARLogError('Error while running <%(cmdstr)s> : %(err)s' % locals())
+    if failOnError:
+        EXIT(127)
+    return False
+
+#
+# Resources accounting
+#
+# Each command run by ARExecute/ARExecuteGetStdout is waited for with
+# os.wait4, and its wall time, user/sys CPU times and peak RSS are appended
+# (one JSON line per command) to ARSDK_RUSAGE_FILE, with the build step
+# (target, lib, arch, phase) it belongs to.
+#
+
+ARRusageState = { 'step' : ('', '', '', '') }
+
+# Set the build step the next commands belong to, return the previous one
+def ARSetRusageStep(target, lib, arch, phase):
+    previous = ARRusageState['step']
+    ARRusageState['step'] = (str(target), str(lib), arch, phase)
+    return previous
+
+# Restore a build step returned by ARSetRusageStep
+def ARRestoreRusageStep(step):
+    ARRusageState['step'] = step
+
+# Record the resources used by a command
+def ARRecordRusage(cmdline, wall, rusage):
+    RUSAGEFILE = os.environ.get('ARSDK_RUSAGE_FILE')
+    if not RUSAGEFILE:
+        return
+    import json
+    (target, lib, arch, phase) = ARRusageState['step']
+    if isinstance(cmdline, list):
+        cmdline = ARQuoteArgs(cmdline)
+    maxrss = rusage.ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        maxrss = maxrss // 1024
+    record = { 'target' : target,
+               'lib'    : lib,
+               'arch'   : arch,
+               'phase'  : phase,
+               'cmd'    : cmdline[:200],
+               'wall'   : round(wall, 3),
+               'utime'  : round(rusage.ru_utime, 3),
+               'stime'  : round(rusage.ru_stime, 3),
+               'maxrss' : maxrss }
+    ARLogWriteLines(RUSAGEFILE, [ json.dumps(record, sort_keys=True) + '\n' ])
+
+# Wait for a child process, record its resources usage, and return its exit code
+def ARWaitProcess(p, cmdline, start):
+    if not hasattr(os, 'wait4'):
+        return p.wait()
+    while True:
+        try:
+            (pid, status, rusage) = os.wait4(p.pid, 0)
+            break
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+    if os.WIFSIGNALED(status):
+        p.returncode = -os.WTERMSIG(status)
+    else:
+        p.returncode = os.WEXITSTATUS(status)
+    ARRecordRusage(cmdline, time.time() - start, rusage)
+    return p.returncode
+
+#
+# Task output capture
+#
+# When task logs are enabled (ARSDK_TASK_LOGS), each build task (scheduler
+# task or pool job) sends the output of the commands it runs to its own log
+# file, instead of the shared terminal. The last lines are kept in memory and
+# printed if a command fails. On a terminal, a single progress line shows the
+# last output line of the running commands.
+#
+
+# Number of output lines printed when a command fails
+ARTASK_TAIL_LINES = 40
+
+# Minimum time (in seconds) between two updates of the progress line
+ARTASK_PROGRESS_DELAY = 0.1
+
+ARTaskLogState = { 'pid' : None, 'fd' : None, 'path' : None, 'name' : None, 'progress' : 0 }
+
+# Check whether task logs are enabled
+def ARTaskLogsEnabled():
+    return os.environ.get('ARSDK_TASK_LOGS') == '1'
+
+# Get the log file of a task of a target
+def ARGetTaskLogFile(target, name):
+    return ARPathFromHere('Targets/%(target)s/Build/logs/%(name)s.log' % locals())
+
+# Class to send the output of the commands of this process to a task log file
+# (use 'tlog = ARTaskLog(path, name)' then 'tlog.exit()')
+class ARTaskLog:
+    def __init__(self, path, name):
+        self.saved = dict(ARTaskLogState)
+        logdir = os.path.dirname(path)
+        if not os.path.exists(logdir):
+            try:
+                os.makedirs(logdir)
+            except OSError:
+                pass
+        ARTaskLogState['pid'] = os.getpid()
+        ARTaskLogState['fd'] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_TRUNC, 420)
+        ARTaskLogState['path'] = path
+        ARTaskLogState['name'] = name
+    def exit(self):
+        os.close(ARTaskLogState['fd'])
+        ARTaskLogState.update(self.saved)
+
+# Update the progress line with a line of output of the current task
+def ARTaskLogProgress(line):
+    now = time.time()
+    if now - ARTaskLogState['progress'] < ARTASK_PROGRESS_DELAY:
+        return
+    ARTaskLogState['progress'] = now
+    if not isinstance(line, str):
+        line = line.decode('utf-8', 'replace')
+    line = ('[%s] %s' % (ARTaskLogState['name'], line.strip()))[:ARGetTerminalColumns() - 1]
+    sys.stdout.write('\r\033[K' + line)
+    sys.stdout.flush()
+
+# Get the width of the terminal
+def ARGetTerminalColumns():
+    try:
+        return int(os.environ.get('COLUMNS', ''))
+    except ValueError:
+        pass
+    if hasattr(shutil, 'get_terminal_size'):
+        return shutil.get_terminal_size().columns
+    return 80
+
+# Run a command with its output going to the task log file
+# Return its exit code and the last lines of its output
+# Raise OSError if it can not be started
+def ARExecuteInTaskLog(cmdline, isShell):
+    import collections
+    fd = ARTaskLogState['fd']
+    progress = sys.stdout.isatty()
+    tail = collections.deque(maxlen=ARTASK_TAIL_LINES)
+    cmdstr = ARQuoteArgs(cmdline) if isinstance(cmdline, list) else cmdline
+    os.write(fd, ('$ %s\n' % cmdstr).encode('utf-8'))
+    start = time.time()
+    p = ARPopen(cmdline, isShell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    for line in iter(p.stdout.readline, b''):
+        os.write(fd, line)
+        tail.append(line)
+        if progress:
+            ARTaskLogProgress(line)
+    p.stdout.close()
+    ret = ARWaitProcess(p, cmdline, start)
+    if progress:
+        sys.stdout.write('\r\033[K')
+        sys.stdout.flush()
+    return (ret, tail)
+
+# Print the last output lines of a failed command of the current task
+def ARTaskLogPrintTail(tail):
+    name = ARTaskLogState['name']
+    path = ARTaskLogState['path']
+    ARPrint('--- Last %d lines of %s output (full log in %s) ---' % (len(tail), name, path))
+    for line in tail:
+        if not isinstance(line, str):
+            line = line.decode('utf-8', 'replace')
+        ARPrint('[%s] %s' % (name, line.rstrip('\n')))
+    ARPrint('---')
 
 # Execute a bash command, and return the stdout output
 def ARExecuteGetStdout(args, isShell=False, failOnError=True, printErrorMessage=True):
     if printErrorMessage:
         ARLog('Running <' + ARListAsBashArg(args) + '>')
-    p = subprocess.Popen(args, shell=isShell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
-    out, err = p.communicate()
-    ret = p.wait()
+    start = time.time()
+    try:
+        p = ARPopen(args, isShell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    except OSError as e:
+        ARExecuteStartFailed(ARListAsBashArg(args), e, failOnError, printErrorMessage)
+        return ''
+    out = p.stdout.read()
+    p.stdout.close()
+    ret = ARWaitProcess(p, args, start)
     if ret:
         if printErrorMessage:
-            ARLog('Error while running <' + ARListAsBashArg(args) + '>')
+            ARLogError('Error while running <' + ARListAsBashArg(args) + '>')
         if failOnError:
             EXIT(ret)
         return ''
     return out.strip()
 
+#
+# Programs lookup
+#
+# Programs are looked up in PATH without running `which` : the content of
+# each PATH directory is listed once, and the results are memoized until
+# PATH changes. Forked processes inherit the results of their parent.
+#
+
+ARWhichState = { 'path' : None, 'relative' : False, 'dirs' : {}, 'found' : {} }
+
+# Get the list of the entries of a PATH directory (listed once)
+def ARWhichListDir(directory):
+    entries = ARWhichState['dirs'].get(directory)
+    if entries is None:
+        try:
+            entries = set(os.listdir(directory))
+        except OSError:
+            entries = set()
+        ARWhichState['dirs'][directory] = entries
+    return entries
+
+# Check that a path is an executable file
+def ARIsExecutable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+# Get the full path of a program (as `which` does), or None if not found
+def ARWhich(program):
+    if os.path.dirname(program):
+        if ARIsExecutable(program):
+            return os.path.abspath(program)
+        return None
+    PATH = os.environ.get('PATH', '')
+    if ARWhichState['path'] != PATH:
+        ARWhichState['path'] = PATH
+        ARWhichState['relative'] = False
+        for directory in PATH.split(os.pathsep):
+            if not os.path.isabs(directory):
+                ARWhichState['relative'] = True
+        ARWhichState['dirs'] = {}
+        ARWhichState['found'] = {}
+    # Relative PATH entries (empty entries are '.') depend on the current directory
+    key = program
+    if ARWhichState['relative']:
+        key = (program, os.getcwd())
+    found = ARWhichState['found']
+    if key in found:
+        return found[key]
+    result = None
+    for directory in PATH.split(os.pathsep):
+        directory = os.path.abspath(directory or '.')
+        if program in ARWhichListDir(directory):
+            path = os.path.join(directory, program)
+            if ARIsExecutable(path):
+                result = path
+                break
+    found[key] = result
+    return result
+
 # Checks if a given commands exists in path
 def ARExistsInPath(program, isShell=True):
-    try:
-        subprocess.check_call('which %(program)s 2>/dev/null 1>/dev/null' % locals(), shell=isShell)
-        return True
-    except subprocess.CalledProcessError as e:
-        return False
+    return ARWhich(program) is not None
 
 # Set an environment variable
 def ARSetEnv(var, val):
@@ -132,6 +391,114 @@ def ARSetEnvIfExists(var, ideal, fallback, args=''):
     else:
         ARSetEnv(var, fallback + ' ' + args)
 
+#
+# GNU make jobserver
+#
+# The build driver owns a single pipe holding the job tokens. Its file
+# descriptors are handed to every make (through MAKEFLAGS) and to every
+# other command, so that all concurrent make invocations share one -j.
+# Each process doing build work holds one token (the implicit job of the
+# makes it runs), and gives it back while it only waits for other processes.
+#
+
+ARJobServerHeldTokens = {}
+ARJobServerState = { 'owner' : None, 'jobs' : 0 }
+
+# Get the (read, write) descriptors of the jobserver, or None if not started
+def ARJobServerFds():
+    fds = os.environ.get('ARSDK_JOBSERVER')
+    if not fds:
+        return None
+    (rfd, wfd) = fds.split(',')
+    return (int(rfd), int(wfd))
+
+# Start a jobserver with the given number of jobs
+# The calling process holds the first token
+def ARJobServerStart(jobs):
+    if ARJobServerFds() is not None:
+        return True
+    try:
+        (rfd, wfd) = os.pipe()
+    except (AttributeError, OSError):
+        return False
+    if hasattr(os, 'set_inheritable'):
+        os.set_inheritable(rfd, True)
+        os.set_inheritable(wfd, True)
+    os.write(wfd, b'+' * max(1, jobs))
+    ARJobServerState['owner'] = os.getpid()
+    ARJobServerState['jobs'] = max(1, jobs)
+    ARSetEnv('ARSDK_JOBSERVER', '%d,%d' % (rfd, wfd))
+    # Both option names, as make < 4.2 only knows the old one
+    ARSetEnv('MAKEFLAGS', ' -j%d --jobserver-fds=%d,%d --jobserver-auth=%d,%d' % (max(1, jobs), rfd, wfd, rfd, wfd))
+    ARJobServerAcquire()
+    return True
+
+# Wait for a token to be available and take it
+def ARJobServerAcquire():
+    fds = ARJobServerFds()
+    if fds is None:
+        return
+    while True:
+        try:
+            if os.read(fds[0], 1):
+                break
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+    pid = os.getpid()
+    ARJobServerHeldTokens[pid] = ARJobServerHeldTokens.get(pid, 0) + 1
+
+# Give back a token taken by this process
+def ARJobServerRelease():
+    fds = ARJobServerFds()
+    pid = os.getpid()
+    if fds is None or ARJobServerHeldTokens.get(pid, 0) == 0:
+        return
+    os.write(fds[1], b'+')
+    ARJobServerHeldTokens[pid] -= 1
+
+# Put back the tokens lost by killed processes (a killed make never gives
+# back the tokens it holds)
+# Only valid in the process which started the jobserver, while no other
+# process uses it
+def ARJobServerResync():
+    fds = ARJobServerFds()
+    if fds is None or ARJobServerState['owner'] != os.getpid():
+        return
+    import fcntl
+    flags = fcntl.fcntl(fds[0], fcntl.F_GETFL)
+    fcntl.fcntl(fds[0], fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    available = 0
+    try:
+        while True:
+            data = os.read(fds[0], 512)
+            if not data:
+                break
+            available += len(data)
+    except OSError as e:
+        if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+            raise
+    finally:
+        fcntl.fcntl(fds[0], fcntl.F_SETFL, flags)
+    expected = ARJobServerState['jobs'] - ARJobServerHeldTokens.get(os.getpid(), 0)
+    if available != expected:
+        ARLog('Jobserver : %d tokens available instead of %d, resetting' % (available, expected))
+    if expected > 0:
+        os.write(fds[1], b'+' * expected)
+
+# Extra Popen arguments to let the children use the jobserver
+def ARJobServerPopenArgs():
+    fds = ARJobServerFds()
+    if fds is None or sys.version_info < (3, 2):
+        return {}
+    return { 'pass_fds' : fds }
+
+# -j argument for make-like tools, empty when they get their jobs from the jobserver
+def ARMakeJobsArgs():
+    if ARJobServerFds() is not None:
+        return ''
+    return '-j ' + str(ARGetNumberOfCpus())
+
 # Append a message to a file
 def ARAppendToFile(filename, message, doPrint=True):
     arfile = open(filename, 'a')
@@ -140,19 +507,192 @@ def ARAppendToFile(filename, message, doPrint=True):
     if doPrint:
         ARPrint(message)
 
-# Log a message(append to the default logfile + output to console)
-def ARLog(message):
+#
+# Logging
+#
+# The process which initialized the log file keeps it open, and its
+# messages are written by a background thread, in batches. Any other
+# process (forked pool workers, scripts run by the build) writes each
+# message synchronously, with a single write on a O_APPEND descriptor,
+# so that lines from concurrent processes never interleave nor get lost.
+# Every message goes to the log file (and to the optional JSON lines file
+# given by ARLOGJSON), the console only shows the ones at or above the
+# ARLOGLEVEL level.
+#
+
+ARLOG_DEBUG = 10
+ARLOG_INFO = 20
+ARLOG_WARNING = 30
+ARLOG_ERROR = 40
+
+ARLogLevelNames = { ARLOG_DEBUG : 'debug', ARLOG_INFO : 'info', ARLOG_WARNING : 'warning', ARLOG_ERROR : 'error' }
+
+# Maximum time (in seconds) a buffered message waits before being written
+ARLOG_FLUSH_DELAY = 0.5
+
+ARLogState = { 'owner' : None, 'pid' : None, 'fds' : {}, 'buffer' : [], 'lock' : None, 'cond' : None, 'thread' : None, 'atfork' : False }
+
+# Get a log level from its name (or number)
+def ARGetLogLevel(name, default=ARLOG_INFO):
+    if name is None or name == '':
+        return default
+    for level, levelName in ARLogLevelNames.items():
+        if str(name).lower() == levelName:
+            return level
+    try:
+        return int(name)
+    except ValueError:
+        return default
+
+# Set the minimum level of the messages shown on the console
+def ARSetLogLevel(level):
+    ARSetEnv('ARLOGLEVEL', ARLogLevelNames.get(level, str(level)))
+
+# Also write all messages, as JSON lines, to the given file
+def ARSetLogJsonFile(path):
+    ARSetEnv('ARLOGJSON', os.path.abspath(path))
+    ARDeleteIfExists(path)
+
+# Get the descriptor of a log file, opened once per process
+def ARLogGetFd(path):
+    fds = ARLogState['fds']
+    if path not in fds:
+        fds[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 420)
+    return fds[path]
+
+# Write lines to a log file in a single write
+def ARLogWriteLines(path, lines):
+    data = ''.join(lines)
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    try:
+        fd = ARLogGetFd(path)
+        while data:
+            data = data[os.write(fd, data):]
+    except OSError:
+        pass
+
+# Write all buffered messages of this process
+def ARFlushLog():
+    if ARLogState['pid'] != os.getpid() or ARLogState['lock'] is None:
+        return
+    ARLogState['lock'].acquire()
+    try:
+        buffered = ARLogState['buffer']
+        ARLogState['buffer'] = []
+        files = []
+        lines = {}
+        for (path, line) in buffered:
+            if path not in lines:
+                files.append(path)
+                lines[path] = []
+            lines[path].append(line)
+        for path in files:
+            ARLogWriteLines(path, lines[path])
+    finally:
+        ARLogState['lock'].release()
+
+# Body of the background flusher thread
+def ARLogFlusher():
+    cond = ARLogState['cond']
+    while True:
+        cond.acquire()
+        try:
+            cond.wait(ARLOG_FLUSH_DELAY)
+        finally:
+            cond.release()
+        ARFlushLog()
+
+# Reset the logging state after a fork, and start the flusher in the owner process
+def ARLogCheckProcess():
+    pid = os.getpid()
+    if ARLogState['pid'] == pid:
+        return
+    ARLogCloseFiles()
+    ARLogState['pid'] = pid
+    ARLogState['buffer'] = []
+    ARLogState['lock'] = None
+    ARLogState['thread'] = None
+    if ARLogState['owner'] == pid:
+        ARLogStartFlusher()
+
+# Close the log files opened by this process (or inherited)
+def ARLogCloseFiles():
+    for fd in ARLogState['fds'].values():
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    ARLogState['fds'] = {}
+
+# Start the flusher of the owner process (once)
+def ARLogStartFlusher():
+    if ARLogState['thread'] is not None:
+        return
+    import threading
+    import atexit
+    ARLogState['lock'] = threading.Lock()
+    ARLogState['cond'] = threading.Condition()
+    thread = threading.Thread(target=ARLogFlusher, name='ARLogFlusher')
+    thread.daemon = True
+    thread.start()
+    ARLogState['thread'] = thread
+    atexit.register(ARFlushLog)
+
+# Write a message to the log files
+def ARLogWrite(message, level):
+    ARLogCheckProcess()
     LOGFILE = os.environ.get('ARLOGF')
     if not LOGFILE:
         LOGFILE = ARPathFromHere('build.log')
-    ARAppendToFile(LOGFILE, message)
+    records = [ (LOGFILE, message + '\n') ]
+    JSONFILE = os.environ.get('ARLOGJSON')
+    if JSONFILE:
+        import json
+        record = { 'time' : time.time(), 'pid' : os.getpid(), 'level' : ARLogLevelNames.get(level, str(level)), 'msg' : message }
+        records.append((JSONFILE, json.dumps(record, sort_keys=True) + '\n'))
+    if ARLogState['thread'] is not None:
+        ARLogState['lock'].acquire()
+        ARLogState['buffer'].extend(records)
+        ARLogState['lock'].release()
+    else:
+        for (path, line) in records:
+            ARLogWriteLines(path, [ line ])
+
+# Log a message(append to the default logfile + output to console)
+def ARLog(message, level=ARLOG_INFO):
+    ARLogWrite(message, level)
+    if level >= ARGetLogLevel(os.environ.get('ARLOGLEVEL')):
+        ARPrint(message)
+
+# Log a debug message (only shown on console in debug verbosity)
+def ARLogDebug(message):
+    ARLog(message, level=ARLOG_DEBUG)
+
+# Log a warning message
+def ARLogWarning(message):
+    ARLog(message, level=ARLOG_WARNING)
+
+# Log an error message
+def ARLogError(message):
+    ARLog(message, level=ARLOG_ERROR)
 
 # Init the default log file
-def ARInitLogFile():
-    LOGFILE = ARPathFromHere('build.log')
+# The calling process becomes the one writing the log asynchronously
+def ARInitLogFile(name='build.log'):
+    ARFlushLog()
+    ARLogCloseFiles()
+    LOGFILE = ARPathFromHere(name)
     ARSetEnv('ARLOGF', LOGFILE)
     ARDeleteIfExists(LOGFILE)
-    
+    ARLogState['owner'] = os.getpid()
+    ARLogCheckProcess()
+    ARLogStartFlusher()
+    # Write everything already logged before a new process is forked
+    if hasattr(os, 'register_at_fork') and not ARLogState['atfork']:
+        os.register_at_fork(before=ARFlushLog)
+        ARLogState['atfork'] = True
+
 # Get the absolute path from a relative path
 def ARPathFromHere(path):
     MYDIR=os.path.abspath(os.path.dirname(sys.argv[0]))
@@ -169,6 +709,48 @@ def ARPathFromPwd(path):
 def ARListAsBashArg(lst):
     return ' '.join(lst)
 
+# Quote an argument for the shell (only when needed)
+def ARQuoteArg(arg):
+    if hasattr(shlex, 'quote'):
+        return shlex.quote(arg)
+    import pipes
+    return pipes.quote(arg)
+
+# Get a shell command line running the given argv
+def ARQuoteArgs(argv):
+    return ' '.join([ ARQuoteArg(arg) for arg in argv ])
+
+# Intern a name, so that all the objects using it share a single string
+# (python 2 can not intern unicode strings, they are returned as is)
+def ARIntern(string):
+    if hasattr(sys, 'intern'):
+        return sys.intern(string)
+    if isinstance(string, str):
+        return intern(string)
+    return string
+
+# Split shell-quoted arguments (e.g. 'CFLAGS="-g -O2"') into plain arguments
+# Return None if one of them needs a real shell (expansions, redirections, ...)
+def ARShellSplit(args):
+    argv = []
+    for arg in args:
+        if re.search(r'[$`|;&<>*?(){}\\[\]~]', arg) is not None:
+            return None
+        argv.extend(shlex.split(arg))
+    return argv
+
+# Get a command running argv followed by shell-quoted arguments
+# The result is an argv list, unless the arguments need a real shell
+def ARMakeCommand(argv, shellArgs=[]):
+    splitArgs = ARShellSplit(shellArgs)
+    if splitArgs is None:
+        return ARQuoteArgs(argv) + ' ' + ARListAsBashArg(shellArgs)
+    return argv + splitArgs
+
+# Get the argv of the make command (ARMAKE)
+def ARMakeArgv():
+    return shlex.split(os.environ.get('ARMAKE', 'make'))
+
 # Checks if file A is newer than file B
 def ARFileIsNewerThan(fileA, fileB):
     if not os.path.exists(fileA):
@@ -177,34 +759,119 @@ def ARFileIsNewerThan(fileA, fileB):
         return True
     return os.stat(fileA).st_mtime > os.stat(fileB).st_mtime
 
-# Called at the beginning of a function to log its start with all its arguments
-def StartDumpArgs(**kwargs):
-    CallerName = inspect.stack()[1][3]
-    if len(kwargs) > 0:
-        ARLog('Start running %(CallerName)s with args:' % locals())
-    else:
-        ARLog('Start running %(CallerName)s' % locals())
+#
+# Tracing spans
+#
+# A span covers a step of the build : its name, arguments, start/end times
+# and result. Spans are only recorded when ARSDK_TRACE_FILE is set, one JSON
+# line per span, written when the span ends. Otherwise starting and stopping
+# a span only logs its name (at debug level, unless it failed).
+# Spans nest through a per-process stack. Forked processes (pool workers,
+# scheduler tasks) inherit the stack of their parent, so the spans they
+# record are children of the span which was running when they were forked.
+#
 
-    for key, value in kwargs.items():
-        ARLog(' -- %(key)s -> %(value)s' % locals())
-    
-# Called at the end of a function to log its return status and all its arguments
-# (use 'return EndDumpArgs(res=True/False, args)')
-def EndDumpArgs(res, **kwargs):
-    CallerName = inspect.stack()[1][3]
-    START_MSG = 'Finished'
-    if not res:
-        START_MSG = 'Error while'
-
-    if len(kwargs) > 0:
-        ARLog('%(START_MSG)s running %(CallerName)s with args:' % locals())
-    else:
-        ARLog('%(START_MSG)s running %(CallerName)s' % locals())
+ARTraceState = { 'pid' : None, 'stack' : [], 'count' : 0 }
+
+# Check whether spans are recorded
+def ARTraceEnabled():
+    return bool(os.environ.get('ARSDK_TRACE_FILE'))
 
-    for key, value in kwargs.items():
-        ARLog(' -- %(key)s -> %(value)s' % locals())
+# Record the spans of this build in the given file
+def ARSetTraceFile(path):
+    ARSetEnv('ARSDK_TRACE_FILE', os.path.abspath(path))
+    ARDeleteIfExists(path)
 
-    return res
+# Format a span argument value
+def ARTraceValue(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+# Class to handle a span (use 'span = ARTraceSpan(name, key=value)' then 'span.stop(res)')
+# Arguments can also be given as a dict (args), whatever their names
+class ARTraceSpan:
+    def __init__(self, name, verbose=False, args=None, **kwargs):
+        self.name = name
+        self.verbose = verbose
+        self.stopped = False
+        if verbose:
+            ARLogDebug('Start running %s' % name)
+        self.traceFile = os.environ.get('ARSDK_TRACE_FILE')
+        if not self.traceFile:
+            return
+        pid = os.getpid()
+        if ARTraceState['pid'] != pid:
+            ARTraceState['pid'] = pid
+            ARTraceState['count'] = 0
+        ARTraceState['count'] += 1
+        self.id = '%d.%d' % (pid, ARTraceState['count'])
+        self.parent = ARTraceState['stack'][-1] if ARTraceState['stack'] else None
+        if args is not None:
+            kwargs.update(args)
+        self.args = dict((key, ARTraceValue(value)) for (key, value) in kwargs.items())
+        ARTraceState['stack'].append(self.id)
+        self.start = time.time()
+    # Add arguments to the span
+    def setArgs(self, **kwargs):
+        if self.traceFile:
+            for (key, value) in kwargs.items():
+                self.args[key] = ARTraceValue(value)
+    def stop(self, res=True):
+        if self.stopped:
+            return
+        self.stopped = True
+        if self.verbose:
+            if res:
+                ARLogDebug('Finished running %s' % self.name)
+            else:
+                ARLog('Error while running %s' % self.name)
+        if not self.traceFile:
+            return
+        import json
+        end = time.time()
+        stack = ARTraceState['stack']
+        if self.id in stack:
+            del stack[stack.index(self.id):]
+        record = { 'id' : self.id, 'parent' : self.parent, 'name' : self.name, 'pid' : os.getpid(), 'start' : self.start, 'end' : end, 'args' : self.args, 'result' : ARTraceValue(res) }
+        ARLogWriteLines(self.traceFile, [ json.dumps(record, sort_keys=True) + '\n' ])
+
+# Check whether the debug messages are shown on the console
+def ARLogDebugEnabled():
+    return ARGetLogLevel(os.environ.get('ARLOGLEVEL')) <= ARLOG_DEBUG
+
+# Decorator recording a span around each call of a function, with its arguments
+# A (res, payload) tuple result has the status of res
+# Without trace file nor debug console, only the failures are logged
+def ARTraced(func):
+    name = func.__name__
+    if hasattr(inspect, 'getfullargspec'):
+        spec = inspect.getfullargspec(func)
+    else:
+        spec = inspect.getargspec(func)
+    argNames = spec.args
+    defaults = dict(zip(argNames[len(argNames) - len(spec.defaults or ()):], spec.defaults or ()))
+    @functools.wraps(func)
+    def tracedFunc(*args, **kwargs):
+        if not ARTraceEnabled():
+            if not ARLogDebugEnabled():
+                res = func(*args, **kwargs)
+                if not (res[0] if isinstance(res, tuple) else res):
+                    ARLog('Error while running %s' % name)
+                return res
+            callArgs = None
+        else:
+            callArgs = dict(defaults)
+            callArgs.update(zip(argNames, args))
+            callArgs.update(kwargs)
+        span = ARTraceSpan(name, verbose=True, args=callArgs)
+        res = False
+        try:
+            res = func(*args, **kwargs)
+        finally:
+            span.stop(res[0] if isinstance(res, tuple) else res)
+        return res
+    return tracedFunc
 
 # Copy and replace a file
 def ARCopyAndReplaceFile(SrcFile, DstFile):
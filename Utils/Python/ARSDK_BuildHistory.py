@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+import os
+import re
+import sys
+import gzip
+import time
+from optparse import OptionParser
+from Common_BuildHistory import *
+
+#
+# Query the history of the last builds (see Common_BuildHistory.py)
+# e.g. the 10 slowest configure steps of the last week:
+#   ./ARSDK_BuildHistory.py --phase configure --since 7d
+#
+
+AGE_REGEX = re.compile(r'^([0-9]+)([smhd]?)$')
+AGE_UNITS = { '' : 1, 's' : 1, 'm' : 60, 'h' : 3600, 'd' : 86400 }
+
+# Convert an age like '7d' or '12h' to a number of seconds
+def parseAge(text):
+    match = AGE_REGEX.match(text)
+    if match is None:
+        return None
+    return int(match.group(1)) * AGE_UNITS[match.group(2)]
+
+def formatTime(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+def formatResult(result):
+    return 'ok' if result else 'FAILED'
+
+def printRuns(records, count):
+    runs = [ record for record in records if record['kind'] == 'run' ]
+    print('%-22s %-16s %10s %-6s %s' % ('RUN', 'DATE', 'DURATION', 'RESULT', 'ARGS'))
+    for run in runs[-count:]:
+        print('%-22s %-16s %9.1fs %-6s %s' % (run['run'], formatTime(run['time']), run['duration'], formatResult(run['result']), run['args']))
+
+def printSteps(steps, count):
+    print('%10s %-16s %-22s %-12s %-24s %-12s %-12s %s' % ('DURATION', 'DATE', 'RUN', 'TARGET', 'LIBRARY', 'ARCH', 'PHASE', 'RESULT'))
+    for step in steps[:count]:
+        print('%9.2fs %-16s %-22s %-12s %-24s %-12s %-12s %s' % (step['duration'], formatTime(step['time']), step['run'], step['target'], step['lib'], step['arch'] or '-', step['phase'], formatResult(step['result'])))
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-d", "--dir", dest="dir",
+                      default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'build.history'),
+                      help="history directory")
+    parser.add_option("-n", "--count", dest="count",
+                      type="int", default=10,
+                      help="number of lines to show")
+    parser.add_option("-t", "--target", dest="target",
+                      help="only show the steps of this target")
+    parser.add_option("-l", "--lib", dest="lib",
+                      help="only show the steps of this library/binary")
+    parser.add_option("-a", "--arch", dest="arch",
+                      help="only show the steps of this arch")
+    parser.add_option("-p", "--phase", dest="phase",
+                      help="only show the steps of this phase (configure, make, install, task, ...)")
+    parser.add_option("-s", "--since", dest="since",
+                      help="only show the steps of the last N seconds/minutes/hours/days (e.g. 12h, 7d)")
+    parser.add_option("-f", "--failed", dest="failed",
+                      action="store_true", default=False,
+                      help="only show failed steps")
+    parser.add_option("-r", "--runs", dest="runs",
+                      action="store_true", default=False,
+                      help="list the runs instead of the steps")
+    parser.add_option("--log", dest="log",
+                      help="print the log of a run")
+    (options, args) = parser.parse_args()
+
+    if options.log:
+        path = Common_GetHistoryLogFile(options.dir, options.log)
+        if not os.path.exists(path):
+            sys.stderr.write('No log for run %s in %s\n' % (options.log, options.dir))
+            return 1
+        gfile = gzip.open(path, 'rb')
+        data = gfile.read()
+        gfile.close()
+        if not isinstance(data, str):
+            data = data.decode('utf-8', 'replace')
+        sys.stdout.write(data)
+        return 0
+
+    records = Common_ReadHistoryRecords(Common_GetHistoryIndexFile(options.dir))
+    if options.runs:
+        printRuns(records, options.count)
+        return 0
+
+    since = None
+    if options.since:
+        age = parseAge(options.since)
+        if age is None:
+            parser.error('invalid age : %s' % options.since)
+        since = time.time() - age
+    steps = Common_QueryHistorySteps(records, target=options.target, lib=options.lib, arch=options.arch, phase=options.phase, since=since, failed=options.failed)
+    printSteps(steps, options.count)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+import os
+import re
+import sys
+import shutil
+import tempfile
+from optparse import OptionParser
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+#
+# Minimal remote artifact cache server
+# Serves GET/PUT of <key>.tar.gz and <key>.json blobs from a single directory.
+# Usable as a stand-in for the shared cache:
+#   ./ARSDK_CacheServer.py --dir /tmp/arsdk_cache --port 8765 &
+#   ARSDK_REMOTE_CACHE_URL=http://localhost:8765 ./SDK3Build.py ...
+#
+
+BLOB_NAME_REGEX = re.compile(r'^/([0-9a-f]{40}\.(tar\.gz|json))$')
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    def blobPath(self):
+        match = BLOB_NAME_REGEX.match(self.path)
+        if match is None:
+            self.send_error(400, 'Invalid blob name')
+            return None
+        return os.path.join(self.server.cacheDir, match.group(1))
+
+    def do_GET(self):
+        path = self.blobPath()
+        if path is None:
+            return
+        if not os.path.exists(path):
+            self.send_error(404, 'Not in cache')
+            return
+        bfile = open(path, 'rb')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        shutil.copyfileobj(bfile, self.wfile)
+        bfile.close()
+
+    def do_PUT(self):
+        path = self.blobPath()
+        if path is None:
+            return
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_error(411, 'Content-Length required')
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400, 'Bad Content-Length')
+            return
+        # Requests are handled by concurrent threads : one file per upload
+        (fd, tmpPath) = tempfile.mkstemp(suffix='.tmp', dir=self.server.cacheDir)
+        bfile = os.fdopen(fd, 'wb')
+        while length > 0:
+            data = self.rfile.read(min(length, 65536))
+            if not data:
+                break
+            bfile.write(data)
+            length -= len(data)
+        bfile.close()
+        if length > 0:
+            os.remove(tmpPath)
+            self.send_error(400, 'Truncated upload')
+            return
+        os.rename(tmpPath, path)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+class CacheServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    def __init__(self, address, cacheDir):
+        HTTPServer.__init__(self, address, CacheRequestHandler)
+        self.cacheDir = cacheDir
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-d", "--dir", dest="dir",
+                      default='arsdk_cache',
+                      help="storage directory")
+    parser.add_option("-a", "--address", dest="address",
+                      default='',
+                      help="listen address")
+    parser.add_option("-p", "--port", dest="port",
+                      type="int", default=8765,
+                      help="listen port")
+    (options, args) = parser.parse_args()
+    if not os.path.exists(options.dir):
+        os.makedirs(options.dir)
+    server = CacheServer((options.address, options.port), os.path.abspath(options.dir))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+import os
+import sys
+import gc
+import time
+import random
+import shutil
+import tempfile
+from optparse import OptionParser
+from xml.dom.minidom import parseString
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import xmlreader
+
+#
+# Benchmark of the xml manifests parsing (see xmlreader.py), on a synthetic
+# manifest with thousands of libraries:
+#   ./ARSDK_ManifestBench.py --libs 5000
+#
+
+TARGETS = [ 'Unix', 'iOS', 'Android' ]
+
+# Write the five xml files of a synthetic manifest in xmlDir
+# Libraries are split in 4 layers, each one depending on the previous one
+def generateManifest(xmlDir, nlibs, seed=1):
+    rand = random.Random(seed)
+    if not os.path.exists(xmlDir):
+        os.makedirs(xmlDir)
+    pbs = [ 'pb%d' % i for i in range(nlibs // 20 + 1) ]
+    layer = nlibs // 4 + 1
+
+    lines = [ '<targets>' ]
+    for t in TARGETS:
+        lines.append('  <target name="%s" soext="so"><postbuildscript name="%s.sh"/></target>' % (t, t))
+    lines.append('</targets>')
+    writeLines(os.path.join(xmlDir, 'targets.xml'), lines)
+
+    lines = [ '<prebuiltLibs>' ]
+    for i, pb in enumerate(pbs):
+        validtars = '<validtar name="Unix"/><validtar name="Android"/>' if i % 2 else ''
+        lines.append('  <prebuilt name="%s" type="jar" path="../%s/%s.jar">%s</prebuilt>' % (pb, pb, pb, validtars))
+    lines.append('</prebuiltLibs>')
+    writeLines(os.path.join(xmlDir, 'prebuilt.xml'), lines)
+
+    lines = [ '<libraries>' ]
+    for i in range(nlibs):
+        isExt = i % 10 == 0
+        lower = range((i // layer - 1) * layer, (i // layer) * layer) if i >= layer else []
+        deps = rand.sample(lower, min(len(lower), 3))
+        if isExt:
+            deps = [ d for d in deps if d % 10 == 0 ]
+        lines.append('  <%s name="L%d"%s>' % ('extlib' if isExt else 'lib', i, ' path="../ext/L%d"' % i if isExt else ''))
+        for d in deps:
+            lines.append('    <dep name="L%d">%s</dep>' % (d, '<validdeptar name="Unix"/>' if (i + d) % 7 == 0 else ''))
+        if not isExt and i % 5 == 1:
+            lines.append('    <prebuiltdep name="%s"/>' % pbs[i % len(pbs)])
+            lines.append('    <configureDepFile name="Xml/*.xml"/>')
+        if i % 13 == 0:
+            for t in TARGETS:
+                lines.append('    <validtar name="%s"/>' % t)
+        lines.append('    <extraConfigureFlag value="--enable-L%d"/>' % i)
+        lines.append('  </%s>' % ('extlib' if isExt else 'lib'))
+    lines.append('</libraries>')
+    writeLines(os.path.join(xmlDir, 'libraries.xml'), lines)
+
+    lines = [ '<binaries>' ]
+    for i in range(nlibs // 10):
+        lines.append('  <binary name="B%d" pathToBuildDir="../bin/B%d">' % (i, i))
+        for d in rand.sample(range(nlibs), 3):
+            lines.append('    <deplib name="L%d"/>' % d)
+        lines.append('    <validtar name="Unix"/>')
+        lines.append('  </binary>')
+    lines.append('</binaries>')
+    writeLines(os.path.join(xmlDir, 'binaries.xml'), lines)
+
+    lines = [ '<repos>' ]
+    for i in range(nlibs // 5):
+        lines.append('  <repo name="R%d" rev="master"><postDownloadAction command="./setup.sh"/></repo>' % i)
+        if i % 10 == 0:
+            lines.append('  <extrepo url="https://example.com/X%d.git" rev="v1.0"><patchFile path="X%d.patch"/></extrepo>' % (i, i))
+            lines.append('  <webfile url="https://example.com/W%d.tar.gz" storePath="../W%d"/>' % (i, i))
+    lines.append('</repos>')
+    writeLines(os.path.join(xmlDir, 'repos.xml'), lines)
+
+def writeLines(path, lines):
+    xfile = open(path, 'w')
+    xfile.write('\n'.join(lines) + '\n')
+    xfile.close()
+
+# Best wall time of several runs of func
+def bestTime(func, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func()
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+# Load a xml file the way the previous minidom parsers did
+def loadMinidom(path, tags):
+    xfile = open(path, 'r')
+    xmldata = parseString(xfile.read())
+    xfile.close()
+    for tag in tags:
+        xmldata.getElementsByTagName(tag)
+
+# Baseline of the memory measure : the model stored the way it was before
+# the slots and the shared dependency graph, with plain objects (with a
+# __dict__), lists, and a clone of the whole dependency subtree (ARCopy)
+# for each dependency. Its strings are shared with the parsed model, so it
+# is a bit smaller than the old model was
+class PlainRepo:
+    pass
+class PlainWebfile:
+    pass
+class PlainTarget:
+    pass
+class PlainPrebuilt:
+    pass
+class PlainLibrary:
+    pass
+class PlainBinary:
+    pass
+
+PLAIN_CLASSES = { xmlreader.ARRepo : PlainRepo,
+                  xmlreader.ARWebfile : PlainWebfile,
+                  xmlreader.ARTarget : PlainTarget,
+                  xmlreader.ARPrebuilt : PlainPrebuilt,
+                  xmlreader.ARLibrary : PlainLibrary,
+                  xmlreader.ARBinary : PlainBinary }
+
+def plainCopy(obj, plainTargets):
+    plain = PLAIN_CLASSES[type(obj)]()
+    for name in obj.__slots__:
+        if name in ('depTargets', 'pbdepTargets'):
+            continue
+        value = getattr(obj, name)
+        if name in ('deps', 'pbdeps'):
+            value = [ plainCopy(dep, plainTargets) for dep in value ]
+        elif name == 'targets':
+            value = [ plainTargets[t.name] for t in value ]
+        elif isinstance(value, tuple):
+            value = list(value)
+        setattr(plain, name, value)
+    return plain
+
+def makePlainModel(model):
+    (repos, targets, prebuilts, libraries, binaries) = model
+    plainTargets = {}
+    for t in targets.list:
+        plainTargets[t.name] = plainCopy(t, plainTargets)
+    return ([ plainCopy(r, plainTargets) for r in repos.list ],
+            [ plainCopy(w, plainTargets) for w in repos.webfilesList ],
+            [ plainTargets[t.name] for t in targets.list ],
+            [ plainCopy(pb, plainTargets) for pb in prebuilts.list ],
+            [ plainCopy(lib, plainTargets) for lib in libraries.list ],
+            [ plainCopy(bin, plainTargets) for bin in binaries.list ])
+
+# Memory held by the parsed model (measured with tracemalloc, None before
+# python 3.4), and size of the model once pickled, as sent to the workers
+# With plain, measure the baseline model instead
+def measureModel(xmlDir, plain=False):
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+    model = xmlreader.parseAll([ xmlDir ])
+    if plain:
+        model = makePlainModel(model)
+    gc.collect()
+    size = None
+    if tracemalloc is not None:
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return (size, len(pickle.dumps(model, pickle.HIGHEST_PROTOCOL)))
+
+FILES_TAGS = [ ('repos.xml', ('repo', 'extrarepo', 'extrepo', 'webfile')),
+               ('targets.xml', ('target',)),
+               ('prebuilt.xml', ('prebuilt',)),
+               ('libraries.xml', ('extlib', 'lib')),
+               ('binaries.xml', ('binary',)) ]
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-l", "--libs", dest="libs",
+                      type="int", default=2000,
+                      help="number of libraries of the synthetic manifest")
+    parser.add_option("-r", "--repeat", dest="repeat",
+                      type="int", default=3,
+                      help="number of runs of each measure (the best one is kept)")
+    parser.add_option("-d", "--dir", dest="dir",
+                      help="keep the synthetic manifest in this directory")
+    (options, args) = parser.parse_args()
+
+    xmlDir = options.dir or tempfile.mkdtemp(prefix='arsdk_manifest_')
+    try:
+        generateManifest(xmlDir, options.libs)
+        print('Synthetic manifest : %d libraries in %s' % (options.libs, xmlDir))
+        print('%-16s %12s %12s' % ('FILE', 'MINIDOM', 'ITERPARSE'))
+        for name, tags in FILES_TAGS:
+            path = os.path.join(xmlDir, name)
+            dom = bestTime(lambda: loadMinidom(path, tags), options.repeat)
+            ets = bestTime(lambda: xmlreader.parseXmlElements(path, tags), options.repeat)
+            print('%-16s %11.1fms %11.1fms' % (name, dom * 1000, ets * 1000))
+        total = bestTime(lambda: xmlreader.parseAll([ xmlDir ]), options.repeat)
+        print('parseAll : %.1fms' % (total * 1000))
+        cacheFile = os.path.join(xmlDir, 'build.model')
+        xmlreader.parseAll([ xmlDir ], cacheFile=cacheFile)
+        cached = bestTime(lambda: xmlreader.parseAll([ xmlDir ], cacheFile=cacheFile), options.repeat)
+        print('parseAll from the model cache : %.1fms (%d bytes)' % (cached * 1000, os.path.getsize(cacheFile)))
+        print('%-34s %12s %12s' % ('MODEL', 'MEMORY', 'PICKLED'))
+        for (title, plain) in [ ('plain objects, cloned deps', True), ('slots, shared dependency graph', False) ]:
+            (size, pickled) = measureModel(xmlDir, plain)
+            memory = '%.1fkB' % (size / 1024.0) if size is not None else 'n/a'
+            print('%-34s %12s %11.1fkB' % (title, memory, pickled / 1024.0))
+        if size is None:
+            print('(model memory needs tracemalloc, python >= 3.4)')
+    finally:
+        if not options.dir:
+            shutil.rmtree(xmlDir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -33,8 +33,11 @@ from Common_BuildConfigureLibrary import *
 from Common_RunAntScript import *
 from Android_CreateFiles import *
 from Common_HandlePrebuiltDep import *
+from Common_BuildDurations import *
+from Common_ArtifactCache import *
+from Common_BuildState import *
 import shutil
-from multiprocessing import Lock, Pool, Manager
+from multiprocessing import Lock, Manager
 
 KnownArchs = [{ 'arch' : 'arm',  'eabi' : 'armeabi',     'host' : 'arm-linux-androideabi' },
               { 'arch' : 'arm',  'eabi' : 'armeabi-v7a', 'host' : 'arm-linux-androideabi' },
@@ -42,22 +45,50 @@ KnownArchs = [{ 'arch' : 'arm',  'eabi' : 'armeabi',     'host' : 'arm-linux-and
               { 'arch' : 'x86',  'eabi' : 'x86',         'host' : 'i686-linux-android' },
 ]
 
-def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None, isMp=False):
-    args = dict(locals())
-
-    StartDumpArgs(**args)
+# Cache key of the jar (and JNI .so) outputs of a library, or None if it can't be cached
+def Android_ComputeJarArtifactKey(target, lib, debug, inhouse, ValidArchs, hasNative, hasJni):
+    if Common_GetArtifactCacheDir() is None:
+        return None
+    InstallDir = ARPathFromHere('Targets/%(target)s/Install' % locals())
+    key = ARArtifactKey('android-jar')
+    key.add('target', target.name)
+    key.add('lib', lib.name)
+    key.add('debug', debug)
+    key.add('inhouse', inhouse)
+    key.add('jni', hasJni)
+    for archInfos in ValidArchs:
+        key.add('eabi', archInfos['eabi'])
+    if hasJni:
+        key.addEnv(['ANDROID_NDK_PATH', 'ANDROID_SDK_PATH', 'AR_ANDROID_MIN_VERSION', 'AR_ANDROID_API_VERSION'])
+        key.add('javac', ARExecuteGetStdout(['javac', '-version'], failOnError=False, printErrorMessage=False))
+        key.addTree('utils', ARPathFromHere('Utils'))
+        key.addTree('sources', lib.path)
+        for pb in lib.pbdeps:
+            key.add('prebuilt', '%s:%s' % (pb.name, pb.type))
+            key.addTree('prebuilt', pb.path)
+        for dep in lib.deps:
+            if lib.isDepAvailableForTarget(dep, target) and not key.addInstalled('jar', dep, InstallDir + '/jars', debug):
+                ARLog('No cache key for %s jar (dependancy of %s), %s jar can not be cached' % (dep.name, lib.name, lib.name))
+                return None
+    if hasNative:
+        for archInfos in ValidArchs:
+            if not key.addInstalled('native:' + archInfos['eabi'], lib, InstallDir + '/' + archInfos['eabi'], debug):
+                return None
+    return key.digest()
 
+@ARTraced
+def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None, isMp=False):
     ANDROID_SDK_VERSION = os.environ.get('AR_ANDROID_API_VERSION')
 
     # Check that ANDROID_SDK_PATH and ANDROID_NDK_PATH environment variables are set
     if not os.environ.get('ANDROID_SDK_PATH') or not os.environ.get('ANDROID_NDK_PATH'):
         ARLog('ANDROID_SDK_PATH and ANDROID_NDK_PATH environment variabled must be set to build a library for %(target)s' % locals())
-        return EndDumpArgs(res=False, **args)
+        return False
 
     # Sanity check : is library valid for this target
     if not lib.isAvailableForTarget(target):
         ARLog('lib%(lib)s does not need to be built for %(target)s' % locals())
-        return EndDumpArgs(res=True, **args)
+        return True
 
     KnownEabis =  [ arch['eabi'] for arch in KnownArchs ]
 
@@ -69,7 +100,7 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
             if ra not in KnownEabis:
                 ARLog('Error : requested arch %(ra)s is not available for target Android' % locals())
                 ARLog('  Avaiable archs : %(KnownEabis)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     if not ValidArchs:
         ValidArchs = KnownArchs
 
@@ -78,25 +109,33 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
     if not nodeps:
         for pb in lib.pbdeps:
             abis = [arch['eabi'] for arch in ValidArchs]
-            if not Common_HandlePrebuiltDep(target, pb, outputSuffixes=abis):
+            if not Common_HandlePrebuiltDep(target, pb, outputSuffixes=abis, lib=lib):
                 ARLog('Error while handling prebuilt library %(pb)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
         for dep in lib.deps:
             ARLog('Building lib%(dep)s (dependancy of lib%(lib)s)' % locals())
             if target.hasAlreadyBuilt(dep):
                 ARLog('Dependancy lib%(dep)s already built for %(target)s' % locals())
-            elif not dep.isAvailableForTarget(target):
+            elif not lib.isDepAvailableForTarget(dep, target):
                 ARLog('Dependancy lib%(dep)s does not need to be built for %(target)s' % locals())
             elif Android_BuildLibrary(target, dep, clean, debug, nodeps, inhouse, requestedArchs):
                 ARLog('Dependancy lib%(dep)s built' % locals())
             else:
                 ARLog('Error while building dependancy lib%(dep)s' %locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     else:
         ARLog('Skipping deps building for %(lib)s' % locals())
 
     target.addTriedLibrary(lib)
 
+    # Nothing to do if the library did not change since its last build
+    variant = Common_GetBuildVariant(debug, inhouse)
+    archs = Common_GetBuildArchs(requestedArchs)
+    if clean:
+        Common_ForgetLibraryState(target, lib)
+    elif not Common_LibraryNeedsToBuild(target, lib, archs, variant):
+        return True
+
     res = True
 
     libLower = lib.name.lower()
@@ -112,7 +151,7 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
         forcedMalloc = ARSetEnvIfEmpty('ac_cv_func_malloc_0_nonnull', 'yes')
         forcedRealloc = ARSetEnvIfEmpty('ac_cv_func_realloc_0_nonnull', 'yes')
 
-        pool = Pool(processes=len(ValidArchs))
+        pool = Common_StartBuildConfigureLibraryPool(len(ValidArchs))
         poolResults = []
         retStatus = True
         bLock = Manager().Lock()
@@ -155,7 +194,7 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
             stripVersionNumber = lib.ext and not clean
 
             if isMp:
-                poolRes = pool.apply_async(Common_BuildConfigureLibrary,
+                poolRes = pool.apply_async(Common_BuildConfigureLibraryJob,
                                            args=(target, lib,),
                                            kwds={'extraArgs':ExtraConfFlags,
                                                  'clean':clean,
@@ -169,28 +208,29 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
                                                  'makeLock':mLock,
                                                  'isMp':isMp,},
                                            callback=None)
-                poolResults.append(poolRes)
+                poolResults.append((eabi, poolRes))
             else:
                 retStatus = Common_BuildConfigureLibrary(target, lib, extraArgs=ExtraConfFlags, clean=clean, debug=debug, confdirSuffix=eabi, installSubDir=eabi, stripVersionNumber=stripVersionNumber, inhouse=inhouse, bootstrapLock=bLock, configureLock=cLock, makeLock=mLock, isMp=False)
 
         if isMp:
-            for p in poolResults:
-                (p_res, p_updatedlib) = p.get()
-                if not p_res:
-                    retStatus = False
-                else:
-                    for p_lib in p_updatedlib.soLibs:
-                        if not p_lib in lib.soLibs:
-                            lib.soLibs.append(p_lib)
-        pool.close()
-        pool.join()
+            # The pool workers take their own jobserver token
+            ARJobServerRelease()
+            (p_res, p_updatedlibs) = Common_WaitBuildConfigureLibraryJobs(pool, poolResults, target, lib, debug)
+            if not p_res:
+                retStatus = False
+            for p_updatedlib in p_updatedlibs:
+                for p_lib in p_updatedlib.soLibs:
+                    if not p_lib in lib.soLibs:
+                        lib.soLibs.append(p_lib)
+            ARJobServerAcquire()
+        Common_CloseBuildConfigureLibraryPool(pool)
 
         if forcedMalloc:
             ARUnsetEnv('ac_cv_func_malloc_0_nonnull')
         if forcedRealloc:
             ARUnsetEnv('ac_cv_func_realloc_0_nonnull')
         if not retStatus:
-            return EndDumpArgs(res=False, **args)
+            return False
 
     # 2 Java part (Pure Java or Java + JNI), mandatory
     # Declare path
@@ -198,6 +238,8 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
     AndroidPath = lib.path + '/Android'
     JavaBuildDir = ARPathFromHere('Targets/%(target)s/Build/%(libPrefix)s%(lib)s_Java' % locals())
     JavaBuildDirDbg = ARPathFromHere('Targets/%(target)s/Build/%(libPrefix)s%(lib)s_Java_dbg' % locals())
+    InstallDir = ARPathFromHere('Targets/%(target)s/Install' % locals())
+    JarsDir = '%(InstallDir)s/jars' % locals()
     OutputJarDir = ARPathFromHere('Targets/%(target)s/Install/jars/release/' % locals())
     OutputJar = '%(OutputJarDir)s/%(libPrefix)s%(lib)s.jar' % locals()
     OutputJarDirDbg = ARPathFromHere('Targets/%(target)s/Install/jars/debug/' % locals())
@@ -215,7 +257,7 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
         BuildXmlFile = '%(AndroidPath)s/build.xml' % locals()
         if not os.path.exists(BuildXmlFile):
             ARLog('Unable to build %(libPrefix)s%(lib)s -> Missing build.xml script' % locals())
-            return EndDumpArgs(res=False, **args)
+            return False
         ClassPath=os.environ.get('ANDROID_SDK_PATH') + '/platforms/android-%(ANDROID_SDK_VERSION)s/android.jar' % locals()
         for dep in lib.deps:
             ClassPath += ':%(ActualOutputJarDir)s/lib%(dep)s%(suffix)s.jar' % locals()
@@ -224,16 +266,16 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
         if not os.path.exists(ActualJavaBuildDir):
             os.makedirs(ActualJavaBuildDir)
         if clean:
-            if not ARExecute('ant -f %(BuildXmlFile)s -Ddist.dir=%(OutputJarDir)s -Dbuild.dir=%(JavaBuildDir)s -Dproject.classpath=%(ClassPath)s clean' % locals()):
-                return EndDumpArgs(res=False, **args)
-            if not ARExecute('ant -f %(BuildXmlFile)s -Ddist.dir=%(OutputJarDirDbg)s -Dbuild.dir=%(JavaBuildDirDbg)s -Dproject.classpath=%(ClassPath)s clean' % locals()):
-                return EndDumpArgs(res=False, **args)
+            if not ARExecute(['ant', '-f', BuildXmlFile, '-Ddist.dir=' + OutputJarDir, '-Dbuild.dir=' + JavaBuildDir, '-Dproject.classpath=' + ClassPath, 'clean']):
+                return False
+            if not ARExecute(['ant', '-f', BuildXmlFile, '-Ddist.dir=' + OutputJarDirDbg, '-Dbuild.dir=' + JavaBuildDirDbg, '-Dproject.classpath=' + ClassPath, 'clean']):
+                return False
         elif debug:
-            if not ARExecute('ant -f %(BuildXmlFile)s -Ddist.dir=%(ActualOutputJarDir)s -Dbuild.dir=%(ActualJavaBuildDir)s -Dproject.classpath=%(ClassPath)s debug' % locals()):
-                return EndDumpArgs(res=False, **args)
+            if not ARExecute(['ant', '-f', BuildXmlFile, '-Ddist.dir=' + ActualOutputJarDir, '-Dbuild.dir=' + ActualJavaBuildDir, '-Dproject.classpath=' + ClassPath, 'debug']):
+                return False
         else:
-            if not ARExecute('ant -f %(BuildXmlFile)s -Ddist.dir=%(ActualOutputJarDir)s -Dbuild.dir=%(ActualJavaBuildDir)s -Dproject.classpath=%(ClassPath)s release' % locals()):
-                return EndDumpArgs(res=False, **args)
+            if not ARExecute(['ant', '-f', BuildXmlFile, '-Ddist.dir=' + ActualOutputJarDir, '-Dbuild.dir=' + ActualJavaBuildDir, '-Dproject.classpath=' + ClassPath, 'release']):
+                return False
     # Else, search for JNI subprojects
     elif os.path.exists(JniPath):
         mustRunAnt = False
@@ -245,61 +287,89 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
         BuildSrcDir = '%(ActualJavaBuildDir)s/src' % locals()
         BuildJniDir = '%(ActualJavaBuildDir)s/jni' % locals()
         if not clean:
-            # Copy files from JNI Dirs to Build Dir
-            if not os.path.exists(ActualJavaBuildDir):
-                os.makedirs(ActualJavaBuildDir)
-            ARCopyAndReplace(JniJavaDir, BuildSrcDir, deletePrevious=True)
-            if os.path.exists(JniJavaGenDir):
-                ARCopyAndReplace(JniJavaGenDir, BuildSrcDir, deletePrevious=False)
-            ARCopyAndReplace(JniCDir, BuildJniDir, deletePrevious=True, ignoreRegexpsForDeletion=[r'.*mk'])
-            if os.path.exists(JniCGenDir):
-                ARCopyAndReplace(JniCGenDir, BuildJniDir, deletePrevious=False)
-            # Create Android.mk / Application.mk / AndroidManifest.xml
-            Android_CreateApplicationMk(ActualJavaBuildDir, [arch['eabi'] for arch in ValidArchs])
-            Android_CreateAndroidManifest(ActualJavaBuildDir, lib)
-            Android_CreateAndroidMk(target, ActualJavaBuildDir, ARPathFromHere('Targets/%(target)s/Install' % locals()), lib, debug, hasNative, inhouse=inhouse)
-            # Call ndk-build
-            buildDir = Chdir(ActualJavaBuildDir)
-            ndk_debug = ''
-            if debug:
-                ndk_debug = 'NDK_DEBUG=1'
-            res = ARExecute(os.environ.get('ANDROID_NDK_PATH') + '/ndk-build -j ' + ndk_debug)
-            buildDir.exit()
-            if not res:
-                ARLog('Error while running ndk-build')
-                return EndDumpArgs(res=False, **args)
-            # Call java build (+ make jar)
-            classpath = ' -cp ' + os.environ.get('ANDROID_SDK_PATH') + '/platforms/android-%(ANDROID_SDK_VERSION)s/android.jar' % locals()
-            if lib.deps or lib.pbdeps:
-                classpath += ':"%(ActualOutputJarDir)s/*"' % locals()
-
-            JavaFilesDir = '%(BuildSrcDir)s/com/parrot/arsdk/%(libLower)s/' % locals()
-            JavaFiles = ARExecuteGetStdout(['find', JavaFilesDir, '-name', '*.java']).replace('\n', ' ')
-            if not ARExecute('javac -source 1.6 -target 1.6 -sourcepath %(BuildSrcDir)s %(JavaFiles)s %(classpath)s' % locals()):
-                ARLog('Error while building java sources')
-                return EndDumpArgs(res=False, **args)
-            if not os.path.exists(ActualOutputJarDir):
-                os.makedirs(ActualOutputJarDir)
-            # Move good files in a ./lib directory (instead of ./libs)
-            for archInfos in ValidArchs:
-                eabi = archInfos['eabi']
-                JarLibDir = '%(ActualJavaBuildDir)s/lib/%(eabi)s' % locals()
-                if not os.path.exists(JarLibDir):
-                    os.makedirs(JarLibDir)
-                for baseDir, directories, files in os.walk('%(ActualJavaBuildDir)s/libs/%(eabi)s' % locals()):
-                    for _file in files:
-                        if _file == '%(libPrefix)s%(libLower)s%(suffix)s.' % locals() + target.soext or _file == ActualAndroidSoLib:
-                            shutil.copy2(os.path.join(baseDir, _file), os.path.join(JarLibDir, _file))
-            # Create JAR File
-            if not ARExecute('jar cf %(ActualOutputJar)s -C %(ActualJavaBuildDir)s ./lib -C %(BuildSrcDir)s .' % locals()):
-                ARLog('Error while creating jar file')
-                return EndDumpArgs(res=False, **args)
-            # Copy output so libraries into target dir
-            for archInfos in ValidArchs:
-                eabi = archInfos['eabi']
-                shutil.copy2('%(ActualJavaBuildDir)s/libs/%(eabi)s/%(ActualAndroidSoLib)s' % locals(),
-                             ARPathFromHere('Targets/%(target)s/Install/%(eabi)s/lib/%(ActualAndroidSoLib)s' % locals()))
+            # Look for the jar and .so outputs in the artifact cache
+            JarKey = Android_ComputeJarArtifactKey(target, lib, debug, inhouse, ValidArchs, hasNative, True)
+            JarInfos = None
+            if JarKey is not None:
+                JarInfos = Common_RestoreArtifact(JarKey, InstallDir)
+                if JarInfos is not None:
+                    ARLog('Restored %(libPrefix)s%(lib)s jar from cache entry %(JarKey)s' % locals())
+            if JarInfos is None:
+                Common_ForgetInstalledArtifact(lib, JarsDir, debug)
+                # Copy files from JNI Dirs to Build Dir
+                if not os.path.exists(ActualJavaBuildDir):
+                    os.makedirs(ActualJavaBuildDir)
+                ARCopyAndReplace(JniJavaDir, BuildSrcDir, deletePrevious=True)
+                if os.path.exists(JniJavaGenDir):
+                    ARCopyAndReplace(JniJavaGenDir, BuildSrcDir, deletePrevious=False)
+                ARCopyAndReplace(JniCDir, BuildJniDir, deletePrevious=True, ignoreRegexpsForDeletion=[r'.*mk'])
+                if os.path.exists(JniCGenDir):
+                    ARCopyAndReplace(JniCGenDir, BuildJniDir, deletePrevious=False)
+                # Create Android.mk / Application.mk / AndroidManifest.xml
+                Android_CreateApplicationMk(ActualJavaBuildDir, [arch['eabi'] for arch in ValidArchs])
+                Android_CreateAndroidManifest(ActualJavaBuildDir, lib)
+                Android_CreateAndroidMk(target, ActualJavaBuildDir, ARPathFromHere('Targets/%(target)s/Install' % locals()), lib, debug, hasNative, inhouse=inhouse)
+                # Call ndk-build
+                buildDir = Chdir(ActualJavaBuildDir)
+                ndk_debug = []
+                if debug:
+                    ndk_debug = ['NDK_DEBUG=1']
+                timer = ARStepTimer(target, lib, '', 'ndk-build', debug=debug)
+                res = ARExecute([os.environ.get('ANDROID_NDK_PATH') + '/ndk-build'] + ARMakeJobsArgs().split() + ndk_debug)
+                buildDir.exit()
+                if not res:
+                    timer.stop(False)
+                    ARLog('Error while running ndk-build')
+                    return False
+                timer.stop()
+                # Call java build (+ make jar)
+                classpath = os.environ.get('ANDROID_SDK_PATH') + '/platforms/android-%(ANDROID_SDK_VERSION)s/android.jar' % locals()
+                if lib.deps or lib.pbdeps:
+                    # Wildcard expanded by javac itself
+                    classpath += ':%(ActualOutputJarDir)s/*' % locals()
+
+                JavaFilesDir = '%(BuildSrcDir)s/com/parrot/arsdk/%(libLower)s/' % locals()
+                JavaFiles = [ f for f in ARExecuteGetStdout(['find', JavaFilesDir, '-name', '*.java']).split('\n') if f ]
+                timer = ARStepTimer(target, lib, '', 'javac', debug=debug)
+                if not ARExecute(['javac', '-source', '1.6', '-target', '1.6', '-sourcepath', BuildSrcDir] + JavaFiles + ['-cp', classpath]):
+                    timer.stop(False)
+                    ARLog('Error while building java sources')
+                    return False
+                timer.stop()
+                if not os.path.exists(ActualOutputJarDir):
+                    os.makedirs(ActualOutputJarDir)
+                # Move good files in a ./lib directory (instead of ./libs)
+                for archInfos in ValidArchs:
+                    eabi = archInfos['eabi']
+                    JarLibDir = '%(ActualJavaBuildDir)s/lib/%(eabi)s' % locals()
+                    if not os.path.exists(JarLibDir):
+                        os.makedirs(JarLibDir)
+                    for baseDir, directories, files in os.walk('%(ActualJavaBuildDir)s/libs/%(eabi)s' % locals()):
+                        for _file in files:
+                            if _file == '%(libPrefix)s%(libLower)s%(suffix)s.' % locals() + target.soext or _file == ActualAndroidSoLib:
+                                shutil.copy2(os.path.join(baseDir, _file), os.path.join(JarLibDir, _file))
+                # Create JAR File
+                timer = ARStepTimer(target, lib, '', 'jar', debug=debug)
+                if not ARExecute(['jar', 'cf', ActualOutputJar, '-C', ActualJavaBuildDir, './lib', '-C', BuildSrcDir, '.']):
+                    timer.stop(False)
+                    ARLog('Error while creating jar file')
+                    return False
+                timer.stop()
+                # Copy output so libraries into target dir
+                for archInfos in ValidArchs:
+                    eabi = archInfos['eabi']
+                    shutil.copy2('%(ActualJavaBuildDir)s/libs/%(eabi)s/%(ActualAndroidSoLib)s' % locals(),
+                                 ARPathFromHere('Targets/%(target)s/Install/%(eabi)s/lib/%(ActualAndroidSoLib)s' % locals()))
+                if JarKey is not None:
+                    JarOutputs = [ os.path.relpath(ActualOutputJar, InstallDir) ]
+                    for archInfos in ValidArchs:
+                        JarOutputs.append('%s/lib/%s' % (archInfos['eabi'], ActualAndroidSoLib))
+                    JarInfos = Common_StoreArtifactFiles(JarKey, InstallDir, JarOutputs, { 'lib' : lib.name })
+            if JarInfos is not None:
+                Common_SaveInstalledArtifact(lib, JarsDir, debug, JarInfos)
         else:
+            Common_ForgetInstalledArtifact(lib, JarsDir, False)
+            Common_ForgetInstalledArtifact(lib, JarsDir, True)
             ARDeleteIfExists(OutputJarDbg, OutputJar, JavaBuildDir, JavaBuildDirDbg)
             for archInfos in ValidArchs:
                 eabi = archInfos['eabi']
@@ -325,14 +395,24 @@ def Android_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, in
                     os.makedirs(eabiDir)
                 for soname in lib.soLibs:
                     shutil.copy2(ARPathFromHere('Targets/%(target)s/Install/%(eabi)s/lib/%(soname)s' % locals()), '%(eabiDir)s/%(soname)s' % locals())
-            if not ARExecute('jar cf %(ActualOutputJar)s -C %(ActualJavaBuildDir)s ./lib' % locals()):
+            if not ARExecute(['jar', 'cf', ActualOutputJar, '-C', ActualJavaBuildDir, './lib']):
                 ARLog('Error while creating jar file')
-                return EndDumpArgs(res=False, **args)
+                return False
+            # This jar is cheap to rebuild, only record its key for the dependent libraries
+            JarKey = Android_ComputeJarArtifactKey(target, lib, debug, inhouse, ValidArchs, True, False)
+            if JarKey is not None:
+                Common_SaveInstalledArtifact(lib, JarsDir, debug, { 'key' : JarKey })
+            else:
+                Common_ForgetInstalledArtifact(lib, JarsDir, debug)
         else:
+            Common_ForgetInstalledArtifact(lib, JarsDir, False)
+            Common_ForgetInstalledArtifact(lib, JarsDir, True)
             ARDeleteIfExists(OutputJarDbg, OutputJar)
 
     # Mark library as built if all went good
     if res:
         target.addBuiltLibrary(lib)
+        if not clean:
+            Common_RecordLibraryState(target, lib, archs, variant, [ ActualOutputJar ] if os.path.exists(ActualOutputJar) else [])
 
-    return EndDumpArgs(res, **args)
+    return res
@@ -31,19 +31,17 @@
 from ARFuncs import *
 from Java_GenLibraryDoc import *
 
+@ARTraced
 def Android_GenLibraryDoc(target, lib, clean=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     ANDROID_SDK_VERSION = os.environ.get('AR_ANDROID_API_VERSION')
 
     if not os.environ.get('ANDROID_SDK_PATH'):
         ARLog ('You need to export ANDROID_SDK_PATH to generate android documentation')
-        return EndDumpArgs(res=True, **args)
+        return True
 
     extraJavadocArgs = ['-linkoffline http://developer.android.com/reference ' + os.environ.get('ANDROID_SDK_PATH') + '/docs/reference']
     extraClasspath   = [os.environ.get('ANDROID_SDK_PATH')+'/platforms/android-' + ANDROID_SDK_VERSION + '/android.jar']
 
     res = Java_GenLibraryDoc(target, lib, clean, extraSrcDirs=['Android/src'], extraJavadocArgs=extraJavadocArgs, extraClasspath=extraClasspath)
 
-    return EndDumpArgs(res, **args)
+    return res
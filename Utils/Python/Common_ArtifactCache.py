@@ -0,0 +1,454 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import hashlib
+import json
+import socket
+import tarfile
+import time
+try:
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from urllib2 import urlopen, Request, HTTPError, URLError
+
+# Bump this value when a change in the build scripts changes the installed files
+ARTIFACT_CACHE_VERSION = 1
+
+# Environment variables which may change the result of a configure/make run
+ARTIFACT_CACHE_ENV_VARS = [ 'CC', 'CXX', 'CPP', 'CFLAGS', 'CXXFLAGS', 'CPPFLAGS', 'LDFLAGS', 'LIBS',
+                            'OBJC', 'OBJCFLAGS', 'AR', 'RANLIB', 'STRIP', 'PKG_CONFIG_PATH',
+                            'AR_ANDROID_MIN_VERSION', 'AR_ANDROID_API_VERSION' ]
+
+# Identity of the compilers already queried by this process
+ArtifactCacheToolchains = {}
+
+#
+# The artifact cache stores the files installed by a configure/make library
+# (or the jar/.so outputs of an Android JNI library), keyed by a hash of
+# everything which may change them: sources, configure args, toolchain,
+# environment and the keys of the dependencies.
+# Each library installed in Targets/<t>/Install[/<abi>] leaves its key (and the
+# list of its shared objects) in the .arsdk_cache directory of the install dir,
+# so that the libraries depending on it can compute their own key.
+#
+# Entries are stored locally, and optionally shared through a remote HTTP
+# server (ARSDK_REMOTE_CACHE_URL) :
+#  - GET <url>/<key>.tar.gz and GET <url>/<key>.json to fetch an entry
+#  - PUT <url>/<key>.tar.gz then PUT <url>/<key>.json to publish it
+# The remote cache is disabled for the rest of the build on the first error,
+# in all the build processes (through a marker file next to the log file)
+#
+
+# Return the cache directory, or None if the cache is disabled
+def Common_GetArtifactCacheDir():
+    if os.environ.get('ARSDK_NO_CACHE'):
+        return None
+    cacheDir = os.environ.get('ARSDK_CACHE_DIR')
+    if not cacheDir:
+        cacheDir = os.path.join(os.path.expanduser('~'), '.cache', 'ARSDKBuildUtils')
+    return cacheDir
+
+def Common_HashFileContent(path, hasher):
+    if os.path.islink(path):
+        hasher.update(os.readlink(path).encode('utf-8'))
+        return
+    hfile = open(path, 'rb')
+    while True:
+        data = hfile.read(65536)
+        if not data:
+            break
+        hasher.update(data)
+    hfile.close()
+
+# Hash a file or a directory
+# Git trees use the index hashes, plus the content of locally modified files
+# and of untracked (not ignored) files, other trees are walked, ignoring
+# hidden files
+def Common_HashSourceTree(path):
+    hasher = hashlib.sha1()
+    if os.path.isfile(path):
+        Common_HashFileContent(path, hasher)
+        return hasher.hexdigest()
+    if not os.path.isdir(path):
+        hasher.update(b'<missing>')
+        return hasher.hexdigest()
+    sdir = Chdir(path, verbose=False)
+    tracked = ARExecuteGetStdout(['git', 'ls-files', '-s', '.'], failOnError=False, printErrorMessage=False)
+    if tracked:
+        hasher.update(tracked.encode('utf-8'))
+        modified = ARExecuteGetStdout(['git', 'ls-files', '-m', '.'], failOnError=False, printErrorMessage=False)
+        for name in sorted(modified.splitlines()):
+            hasher.update(name.encode('utf-8'))
+            if os.path.lexists(name):
+                Common_HashFileContent(name, hasher)
+        untracked = ARExecuteGetStdout(['git', 'ls-files', '-o', '--exclude-standard', '.'], failOnError=False, printErrorMessage=False)
+        for name in sorted(untracked.splitlines()):
+            # Nested repositories are listed as directories
+            if os.path.isdir(name) and not os.path.islink(name):
+                continue
+            hasher.update(('untracked:' + name).encode('utf-8'))
+            Common_HashFileContent(name, hasher)
+    else:
+        for baseDir, directories, files in os.walk('.'):
+            directories[:] = sorted([ d for d in directories if not d.startswith('.') ])
+            for _file in sorted(files):
+                if _file.startswith('.'):
+                    continue
+                name = os.path.join(baseDir, _file)
+                hasher.update(name.encode('utf-8'))
+                Common_HashFileContent(name, hasher)
+    sdir.exit()
+    return hasher.hexdigest()
+
+# Identify the compiler used by a configure run : command and version
+def Common_GetToolchainIdentity(ConfigureArgs):
+    compiler = None
+    host = None
+    for arg in ConfigureArgs:
+        if arg.startswith('CC='):
+            compiler = arg[len('CC='):].strip('"')
+        elif arg.startswith('--host='):
+            host = arg[len('--host='):]
+    if compiler is None and host is not None:
+        compiler = '%(host)s-gcc' % locals()
+    if compiler is None:
+        compiler = os.environ.get('CC', 'cc')
+    if compiler not in ArtifactCacheToolchains:
+        version = ARExecuteGetStdout(compiler + ' --version', isShell=True, failOnError=False, printErrorMessage=False)
+        ArtifactCacheToolchains[compiler] = compiler + '\n' + version
+    return ArtifactCacheToolchains[compiler]
+
+def Common_GetInstalledKeyFile(lib, InstallDir, debug):
+    suffix = '_dbg' if debug else ''
+    return '%s/.arsdk_cache/%s%s.json' % (InstallDir, lib.name, suffix)
+
+# Return the cache infos (key, soLibs) of a library installed in InstallDir, or None
+def Common_GetInstalledArtifact(lib, InstallDir, debug):
+    keyFile = Common_GetInstalledKeyFile(lib, InstallDir, debug)
+    if not os.path.exists(keyFile):
+        return None
+    kfile = open(keyFile, 'r')
+    try:
+        infos = json.load(kfile)
+    except ValueError:
+        infos = None
+    kfile.close()
+    return infos
+
+def Common_SaveInstalledArtifact(lib, InstallDir, debug, infos):
+    keyFile = Common_GetInstalledKeyFile(lib, InstallDir, debug)
+    if not os.path.exists(os.path.dirname(keyFile)):
+        os.makedirs(os.path.dirname(keyFile))
+    kfile = open(keyFile + '.tmp', 'w')
+    json.dump(infos, kfile, sort_keys=True)
+    kfile.close()
+    os.rename(keyFile + '.tmp', keyFile)
+
+# Called before any real build : the installed files will not match the saved key anymore
+def Common_ForgetInstalledArtifact(lib, InstallDir, debug):
+    ARDeleteIfExists(Common_GetInstalledKeyFile(lib, InstallDir, debug))
+
+# Helper to hash the inputs of an artifact
+class ARArtifactKey:
+    def __init__(self, kind):
+        self.hasher = hashlib.sha1()
+        self.add('version', ARTIFACT_CACHE_VERSION)
+        self.add('kind', kind)
+    def add(self, name, value):
+        self.hasher.update(('%s=%s\n' % (name, value)).encode('utf-8'))
+    def addTree(self, name, path):
+        self.add(name, Common_HashSourceTree(path))
+    def addEnv(self, variables):
+        for var in variables:
+            self.add('env:' + var, os.environ.get(var, ''))
+    # Add the key of an already installed library, return False if there is none
+    def addInstalled(self, name, lib, InstallDir, debug):
+        infos = Common_GetInstalledArtifact(lib, InstallDir, debug)
+        if infos is None:
+            return False
+        self.add(name + ':' + lib.name, infos['key'])
+        return True
+    def digest(self):
+        return self.hasher.hexdigest()
+
+# Compute the cache key of a configure/make library, or None if it can't be cached
+def Common_ComputeArtifactKey(target, lib, ConfigureArgs, InstallDir, debug):
+    if Common_GetArtifactCacheDir() is None or lib.customBuild is not None:
+        return None
+    key = ARArtifactKey('configure')
+    key.add('target', target.name)
+    key.add('lib', lib.name)
+    key.add('debug', debug)
+    key.add('prefix', InstallDir)
+    for arg in ConfigureArgs:
+        key.add('arg', arg)
+    key.add('toolchain', Common_GetToolchainIdentity(ConfigureArgs))
+    key.addEnv(ARTIFACT_CACHE_ENV_VARS)
+    key.addEnv(sorted([ var for var in os.environ if var.startswith('ac_cv_') ]))
+    # Build scripts (code generators are called from the configure scripts)
+    key.addTree('utils', ARPathFromHere('Utils'))
+    key.addTree('sources', lib.path)
+    for confdep in lib.confdeps:
+        if '*' in confdep:
+            key.addTree('confdep', os.path.dirname(confdep))
+        else:
+            key.addTree('confdep', confdep)
+    for pb in lib.pbdeps:
+        key.add('prebuilt', '%s:%s' % (pb.name, pb.type))
+        key.addTree('prebuilt', pb.path)
+    for dep in lib.deps:
+        if lib.isDepAvailableForTarget(dep, target) and not key.addInstalled('dep', dep, InstallDir, debug):
+            ARLog('No cache key for %s (dependancy of %s), %s can not be cached' % (dep.name, lib.name, lib.name))
+            return None
+    return key.digest()
+
+def Common_GetArtifactPaths(key):
+    entryDir = os.path.join(Common_GetArtifactCacheDir(), key[:2])
+    return (os.path.join(entryDir, key + '.tar.gz'), os.path.join(entryDir, key + '.json'))
+
+# Marker file of a remote cache disabled for the current build
+def Common_GetRemoteCacheDisabledFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.nocache')
+
+# Start a build with the remote cache enabled again
+def Common_ResetRemoteCache():
+    ARDeleteIfExists(Common_GetRemoteCacheDisabledFile())
+
+# Return the remote cache base url, or None if there is no (working) remote cache
+def Common_GetRemoteCacheUrl():
+    if os.environ.get('ARSDK_REMOTE_CACHE_DISABLED'):
+        return None
+    if os.path.exists(Common_GetRemoteCacheDisabledFile()):
+        return None
+    url = os.environ.get('ARSDK_REMOTE_CACHE_URL')
+    if not url:
+        return None
+    return url.rstrip('/')
+
+def Common_GetRemoteCacheTimeout():
+    try:
+        return float(os.environ.get('ARSDK_REMOTE_CACHE_TIMEOUT', '10'))
+    except ValueError:
+        return 10.0
+
+# Disable the remote cache for all the processes of the build
+# (the environment only reaches the processes started from now)
+def Common_DisableRemoteCache(url, error):
+    ARLog('Remote cache %s is not usable (%s), disabling it' % (url, str(error)))
+    ARSetEnv('ARSDK_REMOTE_CACHE_DISABLED', '1')
+    try:
+        open(Common_GetRemoteCacheDisabledFile(), 'w').close()
+    except (IOError, OSError):
+        pass
+
+# Close an http response (or error) of the remote cache
+def Common_CloseRemoteCacheResponse(response):
+    if response is None:
+        return
+    try:
+        response.close()
+    except Exception:
+        pass
+
+# Download <url>/<name> into path
+# Return False if the remote cache is disabled, or does not have this file
+def Common_RemoteCacheGet(name, path):
+    url = Common_GetRemoteCacheUrl()
+    if url is None:
+        return False
+    tmpPath = path + '.%d.tmp' % os.getpid()
+    response = None
+    dfile = None
+    try:
+        response = urlopen(url + '/' + name, timeout=Common_GetRemoteCacheTimeout())
+        dfile = open(tmpPath, 'wb')
+        while True:
+            data = response.read(65536)
+            if not data:
+                break
+            dfile.write(data)
+    except HTTPError as e:
+        Common_CloseRemoteCacheResponse(e)
+        ARDeleteIfExists(tmpPath)
+        if e.code != 404:
+            Common_DisableRemoteCache(url, e)
+        return False
+    except (URLError, socket.error, IOError, OSError) as e:
+        if dfile is not None:
+            dfile.close()
+        ARDeleteIfExists(tmpPath)
+        Common_DisableRemoteCache(url, e)
+        return False
+    finally:
+        Common_CloseRemoteCacheResponse(response)
+    dfile.close()
+    os.rename(tmpPath, path)
+    return True
+
+# Upload path as <url>/<name>
+def Common_RemoteCachePut(path, name):
+    url = Common_GetRemoteCacheUrl()
+    if url is None:
+        return False
+    pfile = open(path, 'rb')
+    data = pfile.read()
+    pfile.close()
+    request = Request(url + '/' + name, data=data)
+    request.add_header('Content-Type', 'application/octet-stream')
+    request.get_method = lambda: 'PUT'
+    try:
+        urlopen(request, timeout=Common_GetRemoteCacheTimeout()).close()
+    except (URLError, socket.error, IOError, OSError) as e:
+        if isinstance(e, HTTPError):
+            Common_CloseRemoteCacheResponse(e)
+        Common_DisableRemoteCache(url, e)
+        return False
+    return True
+
+# Make sure that an entry is in the local cache, fetching it from the remote cache if needed
+def Common_FetchArtifact(key):
+    (archive, metadata) = Common_GetArtifactPaths(key)
+    if os.path.exists(metadata) and os.path.exists(archive):
+        return True
+    if Common_GetRemoteCacheUrl() is None:
+        return False
+    if not os.path.exists(os.path.dirname(archive)):
+        os.makedirs(os.path.dirname(archive))
+    if Common_RemoteCacheGet(key + '.tar.gz', archive) and Common_RemoteCacheGet(key + '.json', metadata):
+        ARLog('Fetched cache entry %(key)s from remote cache' % locals())
+        return True
+    ARDeleteIfExists(archive)
+    return False
+
+# Remove an entry from the local cache
+def Common_DeleteArtifact(key):
+    (archive, metadata) = Common_GetArtifactPaths(key)
+    ARDeleteIfExists(metadata, archive)
+
+# Is path (a real path) rootDir or inside it
+def Common_IsPathInside(path, rootDir):
+    return path == rootDir or path.startswith(rootDir + os.sep)
+
+# Check that extracting the members of an archive only writes inside rootDir
+# (archives may come from the remote cache)
+# Return an error message, or None if the archive is safe
+def Common_CheckArchiveMembers(tar, rootDir):
+    root = os.path.realpath(rootDir)
+    for member in tar.getmembers():
+        path = os.path.realpath(os.path.join(root, member.name))
+        if not Common_IsPathInside(path, root):
+            return 'member %s is outside of the install dir' % member.name
+        if member.issym():
+            link = os.path.realpath(os.path.join(os.path.dirname(path), member.linkname))
+        elif member.islnk():
+            link = os.path.realpath(os.path.join(root, member.linkname))
+        elif member.isfile() or member.isdir():
+            continue
+        else:
+            return 'member %s is not a file, a directory or a link' % member.name
+        if not Common_IsPathInside(link, root):
+            return 'link %s points outside of the install dir' % member.name
+    return None
+
+# Restore the files of an artifact into rootDir
+# Return the artifact infos (key, soLibs), or None if the key is not in the cache
+# An invalid entry is removed from the local cache, so that the library is built
+def Common_RestoreArtifact(key, rootDir):
+    if not Common_FetchArtifact(key):
+        return None
+    (archive, metadata) = Common_GetArtifactPaths(key)
+    try:
+        mfile = open(metadata, 'r')
+        try:
+            infos = json.load(mfile)
+        finally:
+            mfile.close()
+        if not isinstance(infos, dict):
+            raise ValueError('metadata is not an object')
+    except (ValueError, IOError, OSError) as e:
+        ARLog('Invalid cache entry %s : %s' % (key, str(e)))
+        Common_DeleteArtifact(key)
+        return None
+    if not os.path.exists(rootDir):
+        os.makedirs(rootDir)
+    try:
+        tar = tarfile.open(archive, 'r:gz')
+        try:
+            error = Common_CheckArchiveMembers(tar, rootDir)
+            if error is not None:
+                ARLog('Invalid cache entry %s : %s' % (key, error))
+                Common_DeleteArtifact(key)
+                return None
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(rootDir, filter='data')
+            else:
+                tar.extractall(rootDir)
+        finally:
+            tar.close()
+    except (tarfile.TarError, IOError, OSError) as e:
+        ARLog('Unable to restore cache entry %s : %s' % (key, str(e)))
+        return None
+    return infos
+
+# Store files (paths relative to rootDir) as an artifact, and publish it to the remote cache
+def Common_StoreArtifactFiles(key, rootDir, names, infos):
+    (archive, metadata) = Common_GetArtifactPaths(key)
+    if not os.path.exists(os.path.dirname(archive)):
+        os.makedirs(os.path.dirname(archive))
+    tmpSuffix = '.%d.tmp' % os.getpid()
+    tar = tarfile.open(archive + tmpSuffix, 'w:gz')
+    for name in names:
+        tar.add(os.path.join(rootDir, name), arcname=name)
+    tar.close()
+    os.rename(archive + tmpSuffix, archive)
+    infos = dict(infos)
+    infos['key'] = key
+    infos['time'] = time.time()
+    mfile = open(metadata + tmpSuffix, 'w')
+    json.dump(infos, mfile, sort_keys=True)
+    mfile.close()
+    # Metadata is written last : an entry is complete once its metadata exists
+    os.rename(metadata + tmpSuffix, metadata)
+    if Common_RemoteCachePut(archive, key + '.tar.gz'):
+        Common_RemoteCachePut(metadata, key + '.json')
+    return infos
+
+# Store the staged install of a library (InstallDir content as installed with DESTDIR)
+def Common_StoreArtifact(key, lib, StagedInstallDir, soLibs):
+    files = []
+    for baseDir, directories, _files in os.walk(StagedInstallDir):
+        for name in _files + [ d for d in directories if os.path.islink(os.path.join(baseDir, d)) ]:
+            files.append(os.path.relpath(os.path.join(baseDir, name), StagedInstallDir))
+    return Common_StoreArtifactFiles(key, StagedInstallDir, ['.'], { 'lib' : lib.name, 'soLibs' : list(soLibs), 'files' : sorted(files) })
@@ -32,7 +32,35 @@ from ARFuncs import *
 from Common_CheckBootstrap import *
 from Common_CheckConfigure import *
 from Common_RemoveVersionsFromSo import *
+from Common_BuildDurations import *
+from Common_ArtifactCache import *
+from Common_InstallManifest import *
 from multiprocessing import Lock
+import multiprocessing
+import multiprocessing.util
+import contextlib
+import signal
+
+# Hold one of the (optional) bootstrap/configure/make locks of the jobs
+# It is released even when the job is cancelled while holding it. A job
+# cancelled while waiting for it stops once it got it : the lock manager
+# would otherwise give it to a job that is no longer there.
+@contextlib.contextmanager
+def Common_HoldLock(lock):
+    if lock is None:
+        yield
+        return
+    Common_BuildJobWorkerState['locking'] = True
+    try:
+        lock.acquire()
+    finally:
+        Common_BuildJobWorkerState['locking'] = False
+    try:
+        if Common_BuildJobWorkerState['interrupted'] or Common_BuildJobWorkerState['cancelled'].is_set():
+            raise Common_BuildJobCancelled()
+        yield
+    finally:
+        lock.release()
 
 def Common_GetConfigureDir(lib):
     # Find library configure dir
@@ -72,9 +100,16 @@ def Common_MergeConfigureArgs(args):
             
             
 
-def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=False, inhouse=False, confdirSuffix='', installSubDir='', isLib=True, stripVersionNumber=False, noSharedObjects=False, bootstrapLock=None, configureLock=None, makeLock=None, isMp=False):
-    args = dict(locals())
+# Return the (release, debug) build directories of a configure library
+def Common_GetConfigureLibraryDirs(target, lib, isLib=True, confdirSuffix=''):
+    prefix = 'lib' if (isLib and (not lib.name.startswith('lib')) ) else ''
+    ConfigureDir = ARPathFromHere('Targets/%(target)s/Build/%(prefix)s%(lib)s' % locals())
+    if confdirSuffix:
+        ConfigureDir += '_%(confdirSuffix)s' % locals()
+    return (ConfigureDir, '%(ConfigureDir)s_dbg' % locals())
 
+@ARTraced
+def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=False, inhouse=False, confdirSuffix='', installSubDir='', isLib=True, stripVersionNumber=False, noSharedObjects=False, bootstrapLock=None, configureLock=None, makeLock=None, isMp=False):
     prefix = 'lib' if (isLib and (not lib.name.startswith('lib')) ) else ''
     suffix = '_dbg' if debug else ''
 
@@ -82,28 +117,22 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
         ARLog('Skipping %(prefix)s%(lib)s build : already built for target %(target)s' % locals())
         return (True, lib) if isMp else True
 
-    StartDumpArgs(**args)
-
     # Build actual library
 
     # Sanity checks
     if not os.path.exists(lib.path):
         ARLog('Unable to build ' + lib.name + ' : directory ' + lib.path + ' does not exists')
-        ret = EndDumpArgs(res=False, **args)
-        return (ret, lib) if isMp else ret
+        return (False, lib) if isMp else False
 
     # Generate directory names
     TargetDir       = ARPathFromHere('Targets/%(target)s' % locals())
-    ConfigureDir    = '%(TargetDir)s/Build/%(prefix)s%(lib)s' % locals()
-    if confdirSuffix:
-        ConfigureDir += '_%(confdirSuffix)s' % locals()
-    ConfigureDirDbg = '%(ConfigureDir)s_dbg' % locals()
+    (ConfigureDir, ConfigureDirDbg) = Common_GetConfigureLibraryDirs(target, lib, isLib, confdirSuffix)
     InstallDir      = '%(TargetDir)s/Install' % locals()
     if installSubDir:
         InstallDir += '/%(installSubDir)s' % locals()
 
     # Generate configure args
-    ConfigureArgs = ['--prefix=%(InstallDir)s' % locals()]
+    ConfigureArgs = ['--prefix=' + ARQuoteArg(InstallDir)]
     ConfigureArgs.extend(extraArgs)
     ConfigureArgs.extend(lib.extraConfFlags)
 
@@ -125,7 +154,7 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
     
 
     # Get path for install program
-    InstallBinPath  = os.popen('which install').read().strip()
+    InstallBinPath  = ARWhich('install')
     if InstallBinPath is not None:
         ConfigureArgs.append('INSTALL="%(InstallBinPath)s -C"' % locals())
         ConfigureArgsDbg.append('INSTALL="%(InstallBinPath)s -C"' % locals())
@@ -134,8 +163,7 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
     LibConfigureDir = Common_GetConfigureDir(lib)
     if LibConfigureDir is None:
         ARLog('Don\'t know how to build %(prefix)s%(lib)s for %(target)s' % locals())
-        ret = EndDumpArgs(res=False, **args)
-        return (ret, lib) if isMp else ret
+        return (False, lib) if isMp else False
     
     # Find library custom script
     if lib.customBuild is not None:        
@@ -144,20 +172,7 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
         ARLog('Custom build %(CustomBuildScript)s' % locals())
         if not os.path.exists(CustomBuildScript):
             ARLog('Failed to customBuild check %(prefix)s%(lib)s' % locals())
-            ret = EndDumpArgs(res=False, **args)
-            return (ret, lib) if isMp else ret
-
-    # Check bootstrap status of the directory
-    if lib.customBuild is None:
-        if bootstrapLock is not None:
-            bootstrapLock.acquire()
-        res = Common_CheckBootstrap(LibConfigureDir) or not os.path.exists('%(LibConfigureDir)s/configure' % locals())
-        if bootstrapLock is not None:
-            bootstrapLock.release()
-        if not res:
-            ARLog('Failed to bootstrap %(prefix)s%(lib)s' % locals())
-            ret = EndDumpArgs(res=False, **args)
-            return (ret, lib) if isMp else ret
+            return (False, lib) if isMp else False
 
     # Replace %{ARSDK_INSTALL_DIR}%
     Argn = len(ConfigureArgs)
@@ -177,6 +192,33 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
             ConfigureArgsDbg[index] = re.sub('%\{[a-zA-Z_]*\}%', InstallDir, arg)
         index = index + 1
 
+    # Look for the library outputs in the artifact cache
+    CacheKey = None
+    CacheInfos = None
+    if not clean:
+        CacheKey = Common_ComputeArtifactKey(target, lib, ConfigureArgsDbg if debug else ConfigureArgs, InstallDir, debug)
+        if CacheKey is not None:
+            CacheInfos = Common_GetInstalledArtifact(lib, InstallDir, debug)
+            if CacheInfos is not None and CacheInfos['key'] == CacheKey:
+                ARLog('%(prefix)s%(lib)s is already installed from cache entry %(CacheKey)s' % locals())
+            else:
+                CacheInfos = Common_RestoreArtifact(CacheKey, InstallDir)
+                if CacheInfos is not None:
+                    ARLog('Restored %(prefix)s%(lib)s from cache entry %(CacheKey)s' % locals())
+        if CacheInfos is None:
+            Common_ForgetInstalledArtifact(lib, InstallDir, debug)
+
+    # Check bootstrap status of the directory
+    if lib.customBuild is None and CacheInfos is None:
+        with Common_HoldLock(bootstrapLock):
+            timer = ARStepTimer(target, lib, confdirSuffix, 'bootstrap', debug=debug)
+            res = Common_CheckBootstrap(LibConfigureDir) or not os.path.exists('%(LibConfigureDir)s/configure' % locals())
+        if not res:
+            timer.stop(False)
+            ARLog('Failed to bootstrap %(prefix)s%(lib)s' % locals())
+            return (False, lib) if isMp else False
+        timer.stop()
+
     if not clean:
         mdir = None
         #Custom Build
@@ -184,71 +226,96 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
             CustomBuildArg = ConfigureArgs
             if debug:
                 CustomBuildArg = ConfigureArgsDbg
-            if makeLock is not None:
-                makeLock.acquire()
-            res = ARExecute(CustomBuildScript + ' ' + ARListAsBashArg(CustomBuildArg), failOnError=False)
-            if makeLock is not None:
-                makeLock.release()
+            with Common_HoldLock(makeLock):
+                timer = ARStepTimer(target, lib, confdirSuffix, 'custom', debug=debug)
+                res = ARExecute(ARMakeCommand([CustomBuildScript], CustomBuildArg), failOnError=False)
             if not res:
+                timer.stop(False)
                 ARLog('Failed to build %(prefix)s%(lib)s' % locals())
-                ret = EndDumpArgs(res=False, **args)
-                return (ret, lib) if isMp else ret
+                return (False, lib) if isMp else False
             else:
-                ret = EndDumpArgs(res=True, **args)
-                return (ret, lib) if isMp else ret
-        
-        if not debug:
-            # Check configure(release)
-            if configureLock is not None:
-                configureLock.acquire()
-            res = Common_CheckConfigure(lib, LibConfigureDir, ConfigureDir, ConfigureArgs, lib.confdeps)
-            if configureLock is not None:
-                configureLock.release()
-            if not res:
-                ret = EndDumpArgs(res=False, **args)
-                return (ret, lib) if isMp else ret
-            mdir = Chdir(ConfigureDir)
-        else:
-            if configureLock is not None:
-                configureLock.acquire()
-            res = Common_CheckConfigure(lib, LibConfigureDir, ConfigureDirDbg, ConfigureArgsDbg, lib.confdeps)
-            if configureLock is not None:
-                configureLock.release()
-            if not res:
-                ret = EndDumpArgs(res=False, **args)
-                return (ret, lib) if isMp else ret
-            mdir = Chdir(ConfigureDirDbg)
-        # Make
-        if makeLock is not None:
-            makeLock.acquire()
-        res = ARExecute(os.environ.get('ARMAKE') + ' install', failOnError=False)
-        if not res:
-            if makeLock is not None:
-                makeLock.release()
-            ARLog('Failed to build %(prefix)s%(lib)s' % locals())
-            mdir.exit()
-            ret = EndDumpArgs(res=False, **args)
-            return (ret, lib) if isMp else ret
-
-        # Strip version number if requested
-        if not noSharedObjects:
-            # Get all .so name
-            InstallOut = ARExecuteGetStdout(['make', 'install']).replace('\n', ' ')
-            soregex = r'lib[a-z]*' + suffix + '\.' + target.soext + r'\ '
+                timer.stop()
+                return (True, lib) if isMp else True
+
+        if CacheInfos is None:
+            if not debug:
+                # Check configure(release)
+                with Common_HoldLock(configureLock):
+                    timer = ARStepTimer(target, lib, confdirSuffix, 'configure', debug=debug)
+                    res = Common_CheckConfigure(lib, LibConfigureDir, ConfigureDir, ConfigureArgs, lib.confdeps)
+                if not res:
+                    timer.stop(False)
+                    return (False, lib) if isMp else False
+                timer.stop()
+                mdir = Chdir(ConfigureDir)
+            else:
+                with Common_HoldLock(configureLock):
+                    timer = ARStepTimer(target, lib, confdirSuffix, 'configure', debug=debug)
+                    res = Common_CheckConfigure(lib, LibConfigureDir, ConfigureDirDbg, ConfigureArgsDbg, lib.confdeps)
+                if not res:
+                    timer.stop(False)
+                    return (False, lib) if isMp else False
+                timer.stop()
+                mdir = Chdir(ConfigureDirDbg)
+            # Make (single install, into a staging directory)
+            with Common_HoldLock(makeLock):
+                StageDir = Common_GetInstallStageDir(os.getcwd())
+                StagedInstallDir = StageDir + InstallDir
+                ARDeleteIfExists(StageDir)
+                timer = ARStepTimer(target, lib, confdirSuffix, 'make', debug=debug)
+                res = ARExecute(ARMakeArgv() + ['install', 'DESTDIR=' + StageDir], failOnError=False)
+                if not res:
+                    timer.stop(False)
+                    ARLog('Failed to build %(prefix)s%(lib)s' % locals())
+                    mdir.exit()
+                    return (False, lib) if isMp else False
+                timer.stop()
 
-            for somatch in re.finditer(soregex, InstallOut):
-                soname = somatch.group().strip()
+                # Merge the staged files into the install dir, and keep their list
+                timer = ARStepTimer(target, lib, confdirSuffix, 'install', debug=debug)
+                if os.path.isdir(StagedInstallDir):
+                    InstalledFiles = Common_MergeStagedInstall(StagedInstallDir, InstallDir)
+                    Common_WriteInstallManifest(os.getcwd(), InstalledFiles)
+                    if not noSharedObjects:
+                        for soname in Common_GetSoLibsFromManifest(InstalledFiles, suffix, target.soext):
+                            if soname not in lib.soLibs:
+                                lib.soLibs.append(soname)
+                    # Store the installed files (before any post-processing) in the cache
+                    if CacheKey is not None:
+                        CacheInfos = Common_StoreArtifact(CacheKey, lib, StagedInstallDir, lib.soLibs)
+                else:
+                    # Makefile without DESTDIR support : files went straight to the install dir
+                    ARLog('%(prefix)s%(lib)s does not support DESTDIR installs' % locals())
+                    if not noSharedObjects:
+                        InstallOut = ARExecuteGetStdout(['make', 'install']).replace('\n', ' ')
+                        soregex = r'lib[a-z]*' + suffix + '\.' + target.soext + r'\ '
+                        for somatch in re.finditer(soregex, InstallOut):
+                            soname = somatch.group().strip()
+                            if soname not in lib.soLibs:
+                                lib.soLibs.append(soname)
+                timer.stop()
+                ARDeleteIfExists(StageDir)
+                mdir.exit()
+        else:
+            for soname in CacheInfos['soLibs']:
                 if soname not in lib.soLibs:
                     lib.soLibs.append(soname)
-            
+            # Files restored from the cache are uninstalled like the built ones
+            if 'files' in CacheInfos:
+                Common_WriteInstallManifest(ConfigureDirDbg if debug else ConfigureDir, [ os.path.normpath(os.path.join(InstallDir, f)) for f in CacheInfos['files'] ])
+
+        if CacheInfos is not None:
+            Common_SaveInstalledArtifact(lib, InstallDir, debug, CacheInfos)
+
+        if not noSharedObjects:
+            # Strip version number if requested
             if stripVersionNumber:
                 extLibDir='%(InstallDir)s/lib' % locals()
                 for soname in lib.soLibs:
                     sopath = '%(extLibDir)s/%(soname)s' % locals()
                     if not Common_RemoveVersionsFromSo(sopath, target.soext, lib.soLibs):
                         ARLog('Error while removing versioning informations of %(sopath)s' % locals())
-                        ret = EndDumpArgs(res=False, **args)
-                        return (ret, lib) if isMp else ret
+                        return (False, lib) if isMp else False
             # Rename lib to _dbg if not already done (ext libraries in debug mode)
             if lib.ext and debug:
                 extLibDir='%(InstallDir)s/lib' % locals()
@@ -258,26 +325,180 @@ def Common_BuildConfigureLibrary(target, lib, extraArgs=[], clean=False, debug=F
                         extLibDbg='%(extLibDir)s/%(soname_dbg)s' % locals()
                         extLibNDbg='%(extLibDir)s/%(soname)s' % locals()
                         ARCopyAndReplaceFile(extLibNDbg, extLibDbg)
-        mdir.exit()
-        if makeLock is not None:
-            makeLock.release()
 
     else:
-        if makeLock is not None:
-            makeLock.acquire()
-        if os.path.exists ('%(ConfigureDirDbg)s/Makefile' % locals()):
-            cdir = Chdir(ConfigureDirDbg)
-            ARExecute(os.environ.get('ARMAKE') + ' uninstall')
-            ARExecute(os.environ.get('ARMAKE') + ' clean')
-            cdir.exit ()
-        if os.path.exists ('%(ConfigureDir)s/Makefile' % locals()):
-            cdir = Chdir(ConfigureDir)
-            ARExecute(os.environ.get('ARMAKE') + ' uninstall')
-            ARExecute(os.environ.get('ARMAKE') + ' clean')
-            cdir.exit ()
-        if makeLock is not None:
-            makeLock.release()
+        Common_ForgetInstalledArtifact(lib, InstallDir, False)
+        Common_ForgetInstalledArtifact(lib, InstallDir, True)
+        with Common_HoldLock(makeLock):
+            # Uninstall through the install manifest when there is one
+            for BuildDir in [ ConfigureDirDbg, ConfigureDir ]:
+                uninstalled = Common_UninstallFromManifest(BuildDir)
+                if os.path.exists ('%(BuildDir)s/Makefile' % locals()):
+                    cdir = Chdir(BuildDir)
+                    if not uninstalled:
+                        ARExecute(ARMakeArgv() + ['uninstall'])
+                    ARExecute(ARMakeArgv() + ['clean'])
+                    cdir.exit ()
             
 
-    ret = EndDumpArgs(res=True, **args)
-    return (ret, lib) if isMp else ret
+    return (True, lib) if isMp else True
+
+# Pool entry point of Common_BuildConfigureLibrary
+# Each pool worker holds its own jobserver token while building, and has
+# its own log file (per library and arch) when task logs are enabled
+# Return (res, lib, cancelled), cancelled being None, or one of
+# Common_BuildJobSkipped/Common_BuildJobInterrupted
+def Common_BuildConfigureLibraryJob(target, lib, *args, **kwargs):
+    # Busy before checking the pool state : a cancellation sent after the
+    # check interrupts the job
+    Common_BuildJobWorkerState['interrupted'] = False
+    Common_BuildJobWorkerState['busy'] = True
+    if Common_BuildJobWorkerState['cancelled'].is_set():
+        Common_BuildJobWorkerState['busy'] = False
+        return (False, lib, Common_BuildJobSkipped)
+    taskLog = None
+    try:
+        if ARTaskLogsEnabled():
+            name = 'lib%s' % lib
+            if kwargs.get('confdirSuffix'):
+                name += '-' + kwargs['confdirSuffix']
+            taskLog = ARTaskLog(ARGetTaskLogFile(target, name), '%s:%s' % (target, name))
+        ARJobServerAcquire()
+        (res, lib) = Common_BuildConfigureLibrary(target, lib, *args, **kwargs)
+        return (res, lib, None)
+    except Common_BuildJobCancelled:
+        return (False, lib, Common_BuildJobInterrupted)
+    finally:
+        Common_BuildJobWorkerState['busy'] = False
+        ARJobServerRelease()
+        if taskLog is not None:
+            taskLog.exit()
+
+#
+# Per-arch jobs cancellation
+#
+# Each pool worker runs in its own process group : when a job fails, the
+# groups of the other workers are sent a SIGTERM, which stops all the
+# configure/make processes they started, and makes the jobs themselves
+# raise Common_BuildJobCancelled instead of waiting for them to finish.
+# The jobs still queued are skipped, through the cancelled event of the pool.
+# As the workers are not in the foreground process group, they do not get
+# the SIGINT of a Ctrl-C : the jobs of the pools still running when the
+# build process exits are cancelled the same way.
+#
+
+Common_BuildJobWorkerState = { 'busy' : False, 'locking' : False, 'interrupted' : False, 'cancelled' : None }
+
+# Worker pids, cancelled event and exit finalizer of the running pools,
+# by pool id
+Common_BuildJobPools = {}
+
+# Cancelled states of the jobs
+Common_BuildJobSkipped = 'skipped'
+Common_BuildJobInterrupted = 'interrupted'
+
+class Common_BuildJobCancelled(Exception):
+    pass
+
+# Pool initializer of the Common_BuildConfigureLibraryJob workers
+def Common_InitBuildConfigureLibraryWorker(cancelled):
+    os.setpgrp()
+    Common_BuildJobWorkerState['cancelled'] = cancelled
+    signal.signal(signal.SIGTERM, Common_BuildJobWorkerCancelled)
+
+# SIGTERM handler of the pool workers
+# An idle worker may be reading the pool queue : only stop running jobs
+# The handler may only run some time after the signal (python2 does not
+# always see it during blocking calls) : the processes the job started in
+# the meantime are stopped as well.
+def Common_BuildJobWorkerCancelled(signum, frame):
+    if not Common_BuildJobWorkerState['busy']:
+        return
+    Common_BuildJobWorkerState['busy'] = False
+    Common_BuildJobWorkerState['interrupted'] = True
+    os.killpg(os.getpgrp(), signal.SIGTERM)
+    if not Common_BuildJobWorkerState['locking']:
+        raise Common_BuildJobCancelled()
+
+# Start a pool running Common_BuildConfigureLibraryJob
+# It must be closed with Common_CloseBuildConfigureLibraryPool
+def Common_StartBuildConfigureLibraryPool(processes):
+    cancelled = multiprocessing.Event()
+    # python2 has no fork hook to write the log first
+    ARFlushLog()
+    pool = multiprocessing.Pool(processes=processes, initializer=Common_InitBuildConfigureLibraryWorker, initargs=(cancelled,))
+    # Pool does not give its workers otherwise (they are never replaced, as
+    # there is no maxtasksperchild)
+    pids = [ proc.pid for proc in pool._pool ]
+    # Run on exit before the finalizer of the pool (exitpriority 15), which
+    # would only send a SIGTERM to the workers themselves
+    finalizer = multiprocessing.util.Finalize(None, Common_AbortBuildConfigureLibraryPool, args=(pool,), exitpriority=20)
+    Common_BuildJobPools[id(pool)] = (pids, cancelled, finalizer)
+    return pool
+
+# Wait for the jobs of a pool, and stop its workers
+def Common_CloseBuildConfigureLibraryPool(pool):
+    pool.close()
+    pool.join()
+    (pids, cancelled, finalizer) = Common_BuildJobPools.pop(id(pool))
+    finalizer.cancel()
+
+# Exit finalizer of a running pool : cancel its jobs before stopping it
+def Common_AbortBuildConfigureLibraryPool(pool):
+    Common_CancelBuildConfigureLibraryJobs(pool)
+    pool.close()
+    pool.join()
+    Common_BuildJobPools.pop(id(pool), None)
+
+# Stop the jobs running in the workers of a pool, and skip the queued ones
+def Common_CancelBuildConfigureLibraryJobs(pool):
+    (pids, cancelled, finalizer) = Common_BuildJobPools[id(pool)]
+    cancelled.set()
+    for pid in pids:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+# Remove what a cancelled job may have left half-written in its build dir
+# (staged install, configure stamp so that configure runs again)
+def Common_CleanBuildConfigureLibraryJob(target, lib, confdirSuffix, debug, isLib=True):
+    (ConfigureDir, ConfigureDirDbg) = Common_GetConfigureLibraryDirs(target, lib, isLib, confdirSuffix)
+    BuildDir = ConfigureDirDbg if debug else ConfigureDir
+    ARLog('Cleaning %(BuildDir)s after cancellation' % locals())
+    ARDeleteIfExists(Common_GetInstallStageDir(BuildDir), Common_GetConfigureStampFile(BuildDir))
+
+# Wait for the jobs (a list of (confdirSuffix, AsyncResult)) sent to a pool
+# Unless keepGoing, the first failure cancels all the other jobs
+# Return (res, list of the libraries returned by the successful jobs)
+def Common_WaitBuildConfigureLibraryJobs(pool, jobs, target, lib, debug, keepGoing=None, isLib=True):
+    if keepGoing is None:
+        keepGoing = os.environ.get('ARSDK_KEEP_GOING') == '1'
+    res = True
+    updatedLibs = []
+    pending = list(jobs)
+    while pending:
+        for job in list(pending):
+            (confdirSuffix, poolRes) = job
+            if not poolRes.ready():
+                continue
+            pending.remove(job)
+            (p_res, p_updatedlib, p_cancelled) = poolRes.get()
+            if p_res:
+                updatedLibs.append(p_updatedlib)
+                continue
+            res = False
+            if not keepGoing and pending:
+                ARLog('Build of %s for %s failed : cancelling the other archs' % (lib, confdirSuffix))
+                Common_CancelBuildConfigureLibraryJobs(pool)
+                # Jobs may also have ended by themselves in the meantime
+                for (cancelledSuffix, cancelledRes) in pending:
+                    (c_res, c_updatedlib, c_cancelled) = cancelledRes.get()
+                    if c_res:
+                        updatedLibs.append(c_updatedlib)
+                    elif c_cancelled == Common_BuildJobInterrupted:
+                        Common_CleanBuildConfigureLibraryJob(target, lib, cancelledSuffix, debug, isLib)
+                return (False, updatedLibs)
+        if pending:
+            pending[0][1].wait(0.2)
+    return (res, updatedLibs)
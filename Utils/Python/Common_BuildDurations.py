@@ -0,0 +1,154 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import json
+import time
+
+# Number of samples kept for each (target, library, arch, phase) step
+DURATIONS_MAX_SAMPLES = 5
+
+# The durations history is kept next to the log file, one json record per line
+# Records are appended by every build process, and compacted by the driver
+def Common_GetDurationsFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.durations')
+
+# Record the duration (in seconds) of a build step
+def Common_RecordDuration(target, lib, arch, phase, duration):
+    record = { 'target' : str(target),
+               'lib'    : str(lib),
+               'arch'   : arch,
+               'phase'  : phase,
+               'time'   : time.time(),
+               'duration' : round(duration, 3) }
+    line = json.dumps(record, sort_keys=True) + '\n'
+    # A single write on an O_APPEND descriptor keeps concurrent records on separate lines
+    fd = os.open(Common_GetDurationsFile(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+# Record a build step of the current run, with its result, for the build history
+# (only when the history is enabled, see Common_StartBuildHistory)
+def Common_RecordStep(target, lib, arch, phase, start, duration, res):
+    STEPSFILE = os.environ.get('ARSDK_STEPS_FILE')
+    if not STEPSFILE:
+        return
+    record = { 'target' : str(target),
+               'lib'    : str(lib),
+               'arch'   : arch,
+               'phase'  : phase,
+               'time'   : round(start, 3),
+               'duration' : round(duration, 3),
+               'result' : bool(res) }
+    ARLogWriteLines(STEPSFILE, [ json.dumps(record, sort_keys=True) + '\n' ])
+
+def Common_ReadDurationRecords():
+    records = []
+    path = Common_GetDurationsFile()
+    if not os.path.exists(path):
+        return records
+    dfile = open(path, 'r')
+    for line in dfile.readlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Ignore truncated lines
+            pass
+    dfile.close()
+    return records
+
+# Load the durations history as a (target, lib, arch, phase) -> mean duration dictionnary
+def Common_LoadDurations():
+    samples = {}
+    for record in Common_ReadDurationRecords():
+        key = (record['target'], record['lib'], record['arch'], record['phase'])
+        samples.setdefault(key, []).append(record['duration'])
+    durations = {}
+    for key, values in samples.items():
+        values = values[-DURATIONS_MAX_SAMPLES:]
+        durations[key] = sum(values) / len(values)
+    return durations
+
+# Keep only the last samples of each step in the history file
+def Common_CompactDurations():
+    kept = {}
+    order = []
+    for record in Common_ReadDurationRecords():
+        key = (record['target'], record['lib'], record['arch'], record['phase'])
+        if not key in kept:
+            kept[key] = []
+            order.append(key)
+        kept[key].append(record)
+    path = Common_GetDurationsFile()
+    tmpPath = path + '.new'
+    dfile = open(tmpPath, 'w')
+    for key in order:
+        for record in kept[key][-DURATIONS_MAX_SAMPLES:]:
+            dfile.write(json.dumps(record, sort_keys=True) + '\n')
+    dfile.close()
+    os.rename(tmpPath, path)
+
+# Expected duration of a whole library/binary task for a target, or None if never built
+# When the task never ran in parallel mode, use the sum of its recorded steps
+def Common_GetTaskDuration(durations, target, lib):
+    target = str(target)
+    lib = str(lib)
+    duration = durations.get((target, lib, '', 'task'))
+    if duration is None:
+        steps = [ value for (dtarget, dlib, darch, dphase), value in durations.items() if dtarget == target and dlib == lib ]
+        if steps:
+            duration = sum(steps)
+    return duration
+
+# Class to measure a build step and record its duration
+# The step is also a trace span, with its arch and variant as arguments, and
+# the resources used by the commands run meanwhile are accounted to it
+# (use 'timer.stop()' on success, 'timer.stop(False)' on failure)
+class ARStepTimer:
+    def __init__(self, target, lib, arch, phase, debug=False):
+        self.target = target
+        self.lib = lib
+        self.arch = arch
+        self.phase = phase
+        self.span = ARTraceSpan(phase, target=target, lib=lib, arch=arch, variant='debug' if debug else 'release')
+        self.previousStep = ARSetRusageStep(target, lib, arch, phase)
+        self.start = time.time()
+    def stop(self, res=True):
+        duration = time.time() - self.start
+        if res:
+            Common_RecordDuration(self.target, self.lib, self.arch, self.phase, duration)
+        Common_RecordStep(self.target, self.lib, self.arch, self.phase, self.start, duration, res)
+        self.span.stop(res)
+        ARRestoreRusageStep(self.previousStep)
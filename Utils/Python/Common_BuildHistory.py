@@ -0,0 +1,160 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import gzip
+import json
+import time
+
+# Number of runs kept in the build history (ARSDK_HISTORY_RUNS overrides it)
+BUILD_HISTORY_RUNS = 20
+
+#
+# Build history
+#
+# At the end of each run, build.log is compressed into build.history/<run>.log.gz
+# and the run, with the duration and result of all its steps, is appended to
+# build.history/index (one json record per line). Only the last runs are kept.
+#
+
+# The history is kept next to the log file
+def Common_GetHistoryDir():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.history')
+
+# Steps of the current run are recorded next to the log file, one json record per step
+def Common_GetStepsFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.steps')
+
+def Common_GetHistoryIndexFile(historyDir):
+    return os.path.join(historyDir, 'index')
+
+def Common_GetHistoryLogFile(historyDir, run):
+    return os.path.join(historyDir, '%s.log.gz' % run)
+
+def Common_GetHistoryRuns():
+    try:
+        return max(1, int(os.environ.get('ARSDK_HISTORY_RUNS', BUILD_HISTORY_RUNS)))
+    except ValueError:
+        return BUILD_HISTORY_RUNS
+
+# Start recording the steps of this run
+def Common_StartBuildHistory():
+    STEPSFILE = Common_GetStepsFile()
+    ARDeleteIfExists(STEPSFILE)
+    ARSetEnv('ARSDK_STEPS_FILE', STEPSFILE)
+
+# Read the json records of a file, ignoring truncated lines
+def Common_ReadHistoryRecords(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    hfile = open(path)
+    for line in hfile:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    hfile.close()
+    return records
+
+# Archive the log and the steps of this run, and forget the oldest runs
+def Common_ArchiveBuild(start, res, args):
+    ARFlushLog()
+    historyDir = Common_GetHistoryDir()
+    if not os.path.exists(historyDir):
+        os.makedirs(historyDir)
+    run = time.strftime('%Y%m%d-%H%M%S', time.localtime(start)) + '-%d' % os.getpid()
+
+    LOGFILE = os.environ.get('ARLOGF')
+    if LOGFILE and os.path.exists(LOGFILE):
+        archive = Common_GetHistoryLogFile(historyDir, run)
+        lfile = open(LOGFILE, 'rb')
+        gfile = gzip.open(archive + '.new', 'wb')
+        shutil.copyfileobj(lfile, gfile)
+        gfile.close()
+        lfile.close()
+        os.rename(archive + '.new', archive)
+
+    records = Common_ReadHistoryRecords(Common_GetHistoryIndexFile(historyDir))
+    records.append({ 'kind' : 'run',
+                     'run' : run,
+                     'time' : round(start, 3),
+                     'duration' : round(time.time() - start, 3),
+                     'result' : bool(res),
+                     'args' : args })
+    for step in Common_ReadHistoryRecords(Common_GetStepsFile()):
+        step['kind'] = 'step'
+        step['run'] = run
+        records.append(step)
+
+    runs = []
+    for record in records:
+        if record['kind'] == 'run':
+            runs.append(record['run'])
+    kept = set(runs[-Common_GetHistoryRuns():])
+    for oldRun in runs:
+        if not oldRun in kept:
+            ARDeleteIfExists(Common_GetHistoryLogFile(historyDir, oldRun))
+
+    path = Common_GetHistoryIndexFile(historyDir)
+    hfile = open(path + '.new', 'w')
+    for record in records:
+        if record['run'] in kept:
+            hfile.write(json.dumps(record, sort_keys=True) + '\n')
+    hfile.close()
+    os.rename(path + '.new', path)
+
+# Select the steps of the history, slowest first
+def Common_QueryHistorySteps(records, target=None, lib=None, arch=None, phase=None, since=None, failed=False):
+    steps = []
+    for record in records:
+        if record['kind'] != 'step':
+            continue
+        if target is not None and record['target'] != target:
+            continue
+        if lib is not None and record['lib'] != lib:
+            continue
+        if arch is not None and record['arch'] != arch:
+            continue
+        if phase is not None and record['phase'] != phase:
+            continue
+        if since is not None and record['time'] < since:
+            continue
+        if failed and record['result']:
+            continue
+        steps.append(record)
+    steps.sort(key=lambda record: -record['duration'])
+    return steps
@@ -0,0 +1,101 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import json
+
+# Number of rows of the summary table
+RUSAGE_SUMMARY_ROWS = 25
+
+# Resources used by the commands of the build are recorded next to the log file,
+# one json record per command
+def Common_GetRusageFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.rusage')
+
+# Start recording the resources used by the commands of this build
+def Common_StartRusageRecording():
+    RUSAGEFILE = Common_GetRusageFile()
+    ARDeleteIfExists(RUSAGEFILE)
+    ARSetEnv('ARSDK_RUSAGE_FILE', RUSAGEFILE)
+
+# Read all the records of a rusage file
+def Common_ReadRusageRecords(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    rfile = open(path)
+    for line in rfile:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    rfile.close()
+    return records
+
+# Sum the records per (target, lib, arch, phase)
+# Return a dict of [ count, wall, utime, stime, maxrss ]
+def Common_AggregateRusage(records):
+    totals = {}
+    for record in records:
+        key = (record['target'], record['lib'], record['arch'], record['phase'])
+        total = totals.setdefault(key, [ 0, 0.0, 0.0, 0.0, 0 ])
+        total[0] += 1
+        total[1] += record['wall']
+        total[2] += record['utime']
+        total[3] += record['stime']
+        total[4] = max(total[4], record['maxrss'])
+    return totals
+
+# Print the steps which used the most CPU time, and the totals of the build
+def Common_PrintRusageSummary(path=None, rows=RUSAGE_SUMMARY_ROWS):
+    if path is None:
+        path = Common_GetRusageFile()
+    totals = Common_AggregateRusage(Common_ReadRusageRecords(path))
+    if not totals:
+        return
+    lineFormat = '%-10s %-24s %-14s %-10s %5s %9s %9s %9s %5s %9s'
+    ARPrint('Resources used by the build commands (top %d steps by CPU time) :' % rows)
+    ARPrint(lineFormat % ('TARGET', 'LIBRARY', 'ARCH', 'PHASE', 'CMDS', 'WALL(s)', 'USER(s)', 'SYS(s)', 'CPU%', 'RSS(MB)'))
+    keys = sorted(totals, key=lambda key: totals[key][2] + totals[key][3], reverse=True)
+    for key in keys[:rows]:
+        (target, lib, arch, phase) = key
+        (count, wall, utime, stime, maxrss) = totals[key]
+        cpu = int(100 * (utime + stime) / wall) if wall > 0 else 0
+        ARPrint(lineFormat % (target or '-', (lib or '-')[:24], arch or '-', phase or 'other', count, '%.1f' % wall, '%.1f' % utime, '%.1f' % stime, cpu, '%.1f' % (maxrss / 1024.0)))
+    count = sum([ total[0] for total in totals.values() ])
+    wall = sum([ total[1] for total in totals.values() ])
+    utime = sum([ total[2] for total in totals.values() ])
+    stime = sum([ total[3] for total in totals.values() ])
+    maxrss = max([ total[4] for total in totals.values() ])
+    ARPrint(lineFormat % ('TOTAL', '', '', '', count, '%.1f' % wall, '%.1f' % utime, '%.1f' % stime, '', '%.1f' % (maxrss / 1024.0)))
+    ARPrint('')
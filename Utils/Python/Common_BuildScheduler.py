@@ -0,0 +1,472 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+from Common_BuildDurations import *
+import os
+import multiprocessing
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+#
+# Build task object definition
+#
+
+class ARBuildTaskState:
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+    SKIPPED = 4
+    @staticmethod
+    def toString(val):
+        if val == ARBuildTaskState.PENDING:
+            return 'PENDING'
+        elif val == ARBuildTaskState.RUNNING:
+            return 'RUNNING'
+        elif val == ARBuildTaskState.DONE:
+            return 'DONE'
+        elif val == ARBuildTaskState.FAILED:
+            return 'FAILED'
+        elif val == ARBuildTaskState.SKIPPED:
+            return 'SKIPPED'
+        else:
+            return 'Unknown'
+
+class ARBuildTask:
+    "Represent a node of the build graph"
+    def __init__(self, name, func, args=(), kwargs=None, onDone=None, weight=None, durationKey=None):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs if kwargs is not None else {}
+        # onDone(res, payload) is called in the scheduler process with the result of func
+        self.onDone = onDone
+        # Expected duration of the task (None if unknown), and (target, lib, arch, phase)
+        # key used to record its actual duration in the history
+        self.weight = weight
+        self.durationKey = durationKey
+        self.priority = 0
+        self.deps = []
+        self.rdeps = []
+        self.state = ARBuildTaskState.PENDING
+    def addDep(self, task):
+        if task is self:
+            ARPrint('Cyclical dependancy in task ' + self.name)
+            EXIT(1)
+        if not task in self.deps:
+            self.deps.append(task)
+            task.rdeps.append(self)
+    def isReady(self):
+        if self.state != ARBuildTaskState.PENDING:
+            return False
+        for dep in self.deps:
+            if dep.state != ARBuildTaskState.DONE:
+                return False
+        return True
+    def __str__(self):
+        return self.name
+
+# Entry point of the process running a task
+# func must return a (res, payload) tuple, payload being sent back to the scheduler
+# The task itself stays in the scheduler (its onDone callback is only called there)
+def Common_RunBuildTask(taskName, func, args, kwargs, queue):
+    res = False
+    payload = None
+    taskLog = None
+    if ARTaskLogsEnabled() and ':' in taskName:
+        (target, name) = taskName.split(':', 1)
+        taskLog = ARTaskLog(ARGetTaskLogFile(target, name), taskName)
+    ARJobServerAcquire()
+    try:
+        (res, payload) = func(*args, **kwargs)
+    except Exception as e:
+        ARLog('Unexpected error while running task %s : %s' % (taskName, str(e)))
+        res = False
+        payload = None
+    finally:
+        ARJobServerRelease()
+        if taskLog is not None:
+            taskLog.exit()
+        queue.put((taskName, res, payload))
+
+# Get the multiprocessing context used to run the tasks, or None if the
+# platform can not fork : the task processes must inherit the state of the
+# build script (spawn would run SDK3Build.py again, and pickle every task)
+def Common_GetBuildTaskContext():
+    if not hasattr(os, 'fork'):
+        return None
+    if not hasattr(multiprocessing, 'get_context'):
+        # Python 2 always forks
+        return multiprocessing
+    try:
+        return multiprocessing.get_context('fork')
+    except ValueError:
+        return None
+
+# Can the build tasks be run by an ARBuildScheduler on this platform
+def Common_CanRunBuildTasks():
+    return Common_GetBuildTaskContext() is not None
+
+#
+# Scheduler
+#
+
+class ARBuildScheduler:
+    "Run a graph of build tasks, starting every ready task up to a job budget"
+    # Each task runs in its own process : changes made to os.environ by a task
+    # (e.g. AR_ANDROID_* or ac_cv_func_malloc_0_nonnull) never leak to the others
+    def __init__(self, jobs):
+        self.jobs = max(1, jobs)
+        self.tasks = []
+        self.tasksByName = {}
+        # soLibs found by the library tasks, per (target, library)
+        self.soLibs = {}
+        # Durations of the previous builds, used to prioritise the tasks
+        self.durations = Common_LoadDurations()
+    def addTask(self, task):
+        if task.name in self.tasksByName:
+            ARPrint('Task %(task)s is already in scheduler' % locals())
+            EXIT(1)
+        self.tasks.append(task)
+        self.tasksByName[task.name] = task
+    def getTask(self, name):
+        return self.tasksByName.get(name)
+    # Return the tasks in a topological order (deps first), keeping insertion order
+    # for independent tasks. Return None if the graph contains a cycle
+    def getTopologicalOrder(self):
+        inDegree = {}
+        for task in self.tasks:
+            inDegree[task.name] = len(task.deps)
+        ready = [ task for task in self.tasks if inDegree[task.name] == 0 ]
+        order = []
+        while ready:
+            task = ready.pop(0)
+            order.append(task)
+            for rdep in task.rdeps:
+                inDegree[rdep.name] -= 1
+                if inDegree[rdep.name] == 0:
+                    ready.append(rdep)
+        if len(order) != len(self.tasks):
+            cycle = [ task.name for task in self.tasks if inDegree[task.name] > 0 ]
+            ARLog('Cyclical dependancy between tasks : ' + ARListAsBashArg(cycle))
+            return None
+        return order
+    # Priority of a task is the length of the longest path from this task to the end
+    # of the graph, so that critical chains are started first
+    # Tasks which never ran are assumed to last as long as the average known task
+    def computePriorities(self, order):
+        known = [ task.weight for task in order if task.weight is not None ]
+        default = 1.0
+        if known:
+            default = sum(known) / len(known)
+        for task in reversed(order):
+            longest = 0
+            for rdep in task.rdeps:
+                longest = max(longest, rdep.priority)
+            task.priority = longest + (task.weight if task.weight is not None else default)
+    def skipDependents(self, task):
+        for rdep in task.rdeps:
+            if rdep.state == ARBuildTaskState.PENDING:
+                ARLog('Skipping %(rdep)s : dependancy %(task)s was not built' % locals())
+                rdep.state = ARBuildTaskState.SKIPPED
+                self.skipDependents(rdep)
+    def taskFinished(self, task, res, payload):
+        if task.onDone is not None:
+            res = task.onDone(res, payload) and res
+        if res:
+            task.state = ARBuildTaskState.DONE
+            ARLog('Task %(task)s done' % locals())
+        else:
+            task.state = ARBuildTaskState.FAILED
+            ARLog('Task %(task)s failed' % locals())
+            self.skipDependents(task)
+    def taskEnded(self, task, proc, res, payload, startTime):
+        proc.join()
+        self.taskFinished(task, res, payload)
+        if task.durationKey is not None:
+            (dtarget, dlib, darch, dphase) = task.durationKey
+            duration = time.time() - startTime
+            taskOk = task.state == ARBuildTaskState.DONE
+            if taskOk:
+                Common_RecordDuration(dtarget, dlib, darch, dphase, duration)
+            Common_RecordStep(dtarget, dlib, darch, dphase, startTime, duration, taskOk)
+    def run(self):
+        order = self.getTopologicalOrder()
+        if order is None:
+            return False
+        context = Common_GetBuildTaskContext()
+        if context is None:
+            ARLog('Unable to run build tasks : this platform can not fork')
+            return False
+        self.computePriorities(order)
+        # Stable sort : equal priorities keep the topological order
+        readyOrder = sorted(order, key=lambda task: -task.priority)
+        startTimes = {}
+        queue = context.Queue()
+        running = {}
+        # Tasks take their own jobserver token : give back ours while waiting for them
+        ARJobServerRelease()
+        while True:
+            # Nothing runs : give back the tokens of killed tasks
+            if not running:
+                ARJobServerResync()
+            # Start every ready task, in topological order, up to the job budget
+            for task in readyOrder:
+                if len(running) >= self.jobs:
+                    break
+                if task.isReady():
+                    ARLog('Starting task %s (priority %.1f)' % (task.name, task.priority))
+                    task.state = ARBuildTaskState.RUNNING
+                    startTimes[task.name] = time.time()
+                    proc = context.Process(target=Common_RunBuildTask, args=(task.name, task.func, task.args, task.kwargs, queue))
+                    # python2 has no fork hook to write the log first
+                    ARFlushLog()
+                    proc.start()
+                    running[task.name] = (task, proc)
+            if not running:
+                break
+            # Wait for a task to finish, then take all the results already sent :
+            # a task may send its result and still exit with an error (EXIT)
+            results = []
+            try:
+                results.append(queue.get(timeout=1))
+                while True:
+                    results.append(queue.get_nowait())
+            except Empty:
+                pass
+            for (name, res, payload) in results:
+                # Result of a task already found dead
+                if not name in running:
+                    continue
+                (task, proc) = running.pop(name)
+                self.taskEnded(task, proc, res, payload, startTimes[name])
+            # Check for tasks that died without sending a result
+            for name, (task, proc) in list(running.items()):
+                if not proc.is_alive() and proc.exitcode != 0:
+                    del running[name]
+                    ARLog('Task %s exited with code %s' % (name, str(proc.exitcode)))
+                    self.taskEnded(task, proc, False, None, startTimes[name])
+        ARJobServerAcquire()
+        allOk = True
+        for task in order:
+            if task.state != ARBuildTaskState.DONE:
+                allOk = False
+        return allOk
+    def dump(self):
+        ARLog('Build graph : {')
+        for task in self.tasks:
+            deps = [ dep.name for dep in task.deps ]
+            ARLog(' - %s [%s, priority %.1f] -> %s' % (task.name, ARBuildTaskState.toString(task.state), task.priority, ARListAsBashArg(deps)))
+        ARLog('}')
+
+#
+# Library / Binary tasks
+#
+
+# Snapshot of the target bookkeeping done by a task, sent back to the scheduler
+def Common_GetTargetState(target, lib):
+    return { 'triedLibs' : target.triedToBuildLibraries[:],
+             'builtLibs' : target.alreadyBuiltLibraries[:],
+             'triedBins' : target.triedToBuildBinaries[:],
+             'builtBins' : target.alreadyBuiltBinaries[:],
+             'failed'    : target.failed,
+             'soLibs'    : lib.soLibs[:] }
+
+def Common_MergeTargetState(scheduler, target, lib, state):
+    for name in state['triedLibs']:
+        if not name in target.triedToBuildLibraries:
+            target.triedToBuildLibraries.append(name)
+    for name in state['builtLibs']:
+        if not name in target.alreadyBuiltLibraries:
+            target.alreadyBuiltLibraries.append(name)
+    for name in state['triedBins']:
+        if not name in target.triedToBuildBinaries:
+            target.triedToBuildBinaries.append(name)
+    for name in state['builtBins']:
+        if not name in target.alreadyBuiltBinaries:
+            target.alreadyBuiltBinaries.append(name)
+    if state['failed']:
+        target.failed = True
+    # soLibs are kept per target, as several targets may be built by the same scheduler
+    soLibs = scheduler.soLibs.setdefault((target.name, lib.name), [])
+    for soname in state['soLibs']:
+        if not soname in soLibs:
+            soLibs.append(soname)
+
+# Give each library the soLibs found for target by the previous tasks
+# (the libraries objects are shared by all targets)
+def Common_RestoreTargetSoLibs(target, libraries, soLibs):
+    libraries.clearCache()
+    for lib in libraries.list:
+        for soname in soLibs.get((target.name, lib.name), []):
+            if not soname in lib.soLibs:
+                lib.soLibs.append(soname)
+
+# Clean runs are not recorded, as they say nothing about build durations
+def Common_GetTaskDurationKey(target, lib, kwargs):
+    if kwargs.get('clean'):
+        return None
+    return (target.name, lib.name, '', 'task')
+
+def Common_BuildLibraryTask(buildFunc, target, lib, kwargs, libraries, soLibs):
+    Common_RestoreTargetSoLibs(target, libraries, soLibs)
+    res = buildFunc(target, lib, **kwargs)
+    return (res, Common_GetTargetState(target, lib))
+
+def Common_MakeMergeCb(scheduler, target, lib, isBin=False):
+    def Common_MergeCb(res, state):
+        if state is not None:
+            Common_MergeTargetState(scheduler, target, lib, state)
+        if isBin and not res:
+            target.failed = True
+        return True
+    return Common_MergeCb
+
+# Add the task building lib for target (and the tasks building its deps) to the scheduler
+# Return the task
+def Common_AddLibraryTask(scheduler, target, lib, libraries, buildFunc, kwargs, nodeps=False):
+    name = '%(target)s:lib%(lib)s' % locals()
+    task = scheduler.getTask(name)
+    if task is not None:
+        return task
+    depTasks = []
+    if not nodeps:
+        for dep in lib.deps:
+            if lib.isDepAvailableForTarget(dep, target):
+                depTasks.append(Common_AddLibraryTask(scheduler, target, dep, libraries, buildFunc, kwargs, nodeps))
+    task = ARBuildTask(name, Common_BuildLibraryTask, args=(buildFunc, target, lib, kwargs, libraries, scheduler.soLibs), onDone=Common_MakeMergeCb(scheduler, target, lib),
+                       weight=Common_GetTaskDuration(scheduler.durations, target, lib), durationKey=Common_GetTaskDurationKey(target, lib, kwargs))
+    for depTask in depTasks:
+        task.addDep(depTask)
+    scheduler.addTask(task)
+    return task
+
+def Common_AddBinaryTask(scheduler, target, bin, libraries, buildLibFunc, buildBinFunc, libKwargs, binKwargs, nodeps=False):
+    name = '%(target)s:%(bin)s' % locals()
+    task = scheduler.getTask(name)
+    if task is not None:
+        return task
+    depTasks = []
+    if not nodeps and buildLibFunc is not None:
+        for dep in bin.deps:
+            if bin.isDepAvailableForTarget(dep, target):
+                depTasks.append(Common_AddLibraryTask(scheduler, target, dep, libraries, buildLibFunc, libKwargs, nodeps))
+    task = ARBuildTask(name, Common_BuildLibraryTask, args=(buildBinFunc, target, bin, binKwargs, libraries, scheduler.soLibs), onDone=Common_MakeMergeCb(scheduler, target, bin, isBin=True),
+                       weight=Common_GetTaskDuration(scheduler.durations, target, bin), durationKey=Common_GetTaskDurationKey(target, bin, binKwargs))
+    for depTask in depTasks:
+        task.addDep(depTask)
+    scheduler.addTask(task)
+    return task
+
+#
+# Documentation / Postbuild tasks
+#
+
+def Common_GenTargetDocTask(genDocFunc, target, libs):
+    for lib in libs:
+        genDocFunc(target, lib)
+    TargetDocIndexScript = ARPathFromHere('Utils/generateDocIndex.bash')
+    TargetDocIndexPath   = ARPathFromHere('Targets/%(target)s/Build/Doc' % locals())
+    ARExecute('%(TargetDocIndexScript)s %(TargetDocIndexPath)s %(target)s' % locals())
+    return (True, None)
+
+# Run a postbuild script of target
+def Common_RunPostbuildScript(target, scr):
+    span = ARTraceSpan('postbuild', target=target, script=os.path.basename(scr))
+    # Shell needed for the redirections
+    res = ARExecute(ARQuoteArg(scr) + ' >/dev/null 2>&1', failOnError=False)
+    span.stop(res)
+    if not res:
+        ARPrint('Error while running ' + scr + '. Run manually to see the output')
+    return res
+
+# Run the postbuild scripts of target, stopping at the first failure
+def Common_RunPostbuildScriptsTask(target):
+    res = True
+    done = []
+    for scrinfo in target.postbuildScripts:
+        scr = scrinfo['path']
+        if not res:
+            done.append(None)
+        elif not Common_RunPostbuildScript(target, scr):
+            done.append(False)
+            res = False
+        else:
+            done.append(True)
+    return (res, done)
+
+def Common_MakePostbuildCb(target):
+    def Common_PostbuildCb(res, done):
+        if done is not None:
+            for (scrinfo, scrdone) in zip(target.postbuildScripts, done):
+                scrinfo['done'] = scrdone
+        if not res:
+            target.failed = True
+        return True
+    return Common_PostbuildCb
+
+# Add the whole pipeline of a target to the scheduler :
+#  - Requested libraries and binaries (with their deps)
+#  - Documentation generation, after all libraries are built
+#  - Postbuild scripts, after everything else succeeded
+def Common_AddTargetTasks(scheduler, target, libs, bins, libraries, buildLibFunc, buildBinFunc, genDocFunc, genDoc=False, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None, isMp=False):
+    libKwargs = { 'clean':clean, 'debug':debug, 'nodeps':nodeps, 'inhouse':inhouse, 'requestedArchs':requestedArchs, 'isMp':isMp }
+    binKwargs = { 'clean':clean, 'debug':debug, 'nodeps':nodeps, 'inhouse':inhouse, 'requestedArchs':requestedArchs }
+    firstTask = len(scheduler.tasks)
+    if libs:
+        if buildLibFunc is not None:
+            for lib in libs:
+                Common_AddLibraryTask(scheduler, target, lib, libraries, buildLibFunc, libKwargs, nodeps)
+        else:
+            ARLog('Unable to build libraries for target %(target)s' % locals())
+        if genDoc and not clean:
+            if genDocFunc is not None:
+                docTask = ARBuildTask('%(target)s:doc' % locals(), Common_GenTargetDocTask, args=(genDocFunc, target, libs),
+                                      weight=Common_GetTaskDuration(scheduler.durations, target, 'doc'), durationKey=(target.name, 'doc', '', 'task'))
+                for task in scheduler.tasks[firstTask:]:
+                    docTask.addDep(task)
+                scheduler.addTask(docTask)
+            else:
+                ARLog('Unable to generate documentation for target %(target)s' % locals())
+    if bins:
+        if buildBinFunc is not None:
+            for bin in bins:
+                Common_AddBinaryTask(scheduler, target, bin, libraries, buildLibFunc, buildBinFunc, libKwargs, binKwargs, nodeps)
+        else:
+            ARLog('Unable to build binaries for target %(target)s' % locals())
+    if target.postbuildScripts:
+        postbuildTask = ARBuildTask('%(target)s:postbuild' % locals(), Common_RunPostbuildScriptsTask, args=(target,), onDone=Common_MakePostbuildCb(target))
+        for task in scheduler.tasks[firstTask:]:
+            postbuildTask.addDep(task)
+        scheduler.addTask(postbuildTask)
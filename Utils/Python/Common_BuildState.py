@@ -0,0 +1,218 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+from Common_ArtifactCache import ARTIFACT_CACHE_ENV_VARS
+import hashlib
+import json
+import sqlite3
+import time
+
+# Bump this value to invalidate all the stored build states
+BUILD_STATE_VERSION = 2
+
+# Environment variables which change the result of a library build
+BUILD_STATE_ENV_VARS = ARTIFACT_CACHE_ENV_VARS + [ 'ANDROID_NDK_PATH', 'ANDROID_SDK_PATH' ]
+
+#
+# Persistent build state of a target
+# One row per (library, archs, variant) successfully built, with the fingerprint
+# of its inputs at the end of the build, the soLibs it produced and the output
+# files which must still exist for the library to be considered as built.
+# Fingerprints only use stat() results, so checking a library spawns no process.
+#
+class ARBuildState:
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.pid = None
+    # sqlite connections can't cross a fork, so each process opens its own
+    def db(self):
+        if self.conn is None or self.pid != os.getpid():
+            if not os.path.exists(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            self.conn = sqlite3.connect(self.path, timeout=60)
+            self.pid = os.getpid()
+            self.conn.execute('CREATE TABLE IF NOT EXISTS libraries (lib TEXT, arch TEXT, variant TEXT, fingerprint TEXT, soLibs TEXT, outputs TEXT, time REAL, PRIMARY KEY (lib, arch, variant))')
+            self.conn.commit()
+        return self.conn
+    def __getstate__(self):
+        return { 'path' : self.path }
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+    # Return (fingerprint, soLibs, outputs) of a library, or None if it was never built
+    def get(self, lib, arch, variant):
+        row = self.db().execute('SELECT fingerprint, soLibs, outputs FROM libraries WHERE lib=? AND arch=? AND variant=?', (lib, arch, variant)).fetchone()
+        if row is None:
+            return None
+        return (row[0], json.loads(row[1]), json.loads(row[2]))
+    def isUpToDate(self, lib, arch, variant, fingerprint):
+        row = self.get(lib, arch, variant)
+        if row is None or row[0] != fingerprint:
+            return False
+        for output in row[2]:
+            if not os.path.exists(output):
+                return False
+        return True
+    def record(self, lib, arch, variant, fingerprint, soLibs, outputs):
+        conn = self.db()
+        conn.execute('INSERT OR REPLACE INTO libraries VALUES (?, ?, ?, ?, ?, ?, ?)', (lib, arch, variant, fingerprint, json.dumps(list(soLibs)), json.dumps(list(outputs)), time.time()))
+        conn.commit()
+    def forget(self, lib):
+        conn = self.db()
+        conn.execute('DELETE FROM libraries WHERE lib=?', (lib,))
+        conn.commit()
+
+# Binaries are stored next to the libraries, with a 'bin:' prefix
+def Common_GetStateName(lib, isBin=False):
+    return ('bin:' + lib.name) if isBin else lib.name
+
+def Common_GetBuildState(target):
+    if target.buildState is None:
+        target.buildState = ARBuildState(ARPathFromHere('Targets/%(target)s/.arsdk_state.db' % locals()))
+    return target.buildState
+
+def Common_GetBuildVariant(debug, inhouse):
+    variant = 'debug' if debug else 'release'
+    if inhouse:
+        variant += '+inhouse'
+    return variant
+
+def Common_GetBuildArchs(requestedArchs):
+    if not requestedArchs:
+        return ''
+    return ','.join(sorted(requestedArchs))
+
+def Common_StatPath(path, hasher):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        hasher.update(('%s:<missing>\n' % path).encode('utf-8'))
+        return
+    hasher.update(('%s:%d:%d\n' % (path, int(st.st_mtime * 1000000), st.st_size)).encode('utf-8'))
+
+# Fingerprint a file or directory tree with stat() only
+# Hidden files and python bytecode are ignored
+def Common_StatTree(path, hasher):
+    if not os.path.isdir(path):
+        Common_StatPath(path, hasher)
+        return
+    for baseDir, directories, files in os.walk(path):
+        directories[:] = sorted([ d for d in directories if not d.startswith('.') and d != '__pycache__' ])
+        for _file in sorted(files):
+            if _file.startswith('.') or _file.endswith('.pyc'):
+                continue
+            Common_StatPath(os.path.join(baseDir, _file), hasher)
+
+# Tree fingerprints already computed by this process, by path
+# Each library is checked for several archs/variants, and all of them depend
+# on the build scripts : the trees are only walked once, until a build may
+# have changed them
+Common_TreeFingerprints = {}
+
+def Common_GetTreeFingerprint(path):
+    fingerprint = Common_TreeFingerprints.get(path)
+    if fingerprint is None:
+        hasher = hashlib.sha1()
+        Common_StatTree(path, hasher)
+        fingerprint = hasher.hexdigest()
+        Common_TreeFingerprints[path] = fingerprint
+    return fingerprint
+
+def Common_AddTreeFingerprint(path, hasher):
+    hasher.update(('%s:%s\n' % (path, Common_GetTreeFingerprint(path))).encode('utf-8'))
+
+# Forget the fingerprints of the trees of a library (its build may have
+# changed them, e.g. bootstrap, prebuilts extraction)
+def Common_ForgetTreeFingerprints(lib):
+    Common_TreeFingerprints.pop(lib.path, None)
+    for confdep in lib.confdeps:
+        if '*' in confdep:
+            Common_TreeFingerprints.pop(os.path.dirname(confdep), None)
+    for pb in lib.pbdeps:
+        Common_TreeFingerprints.pop(pb.path, None)
+
+# Fingerprint the inputs of a library build, or None if a dependancy has no known state
+def Common_ComputeLibraryFingerprint(target, lib, arch, variant):
+    state = Common_GetBuildState(target)
+    hasher = hashlib.sha1()
+    hasher.update(('%s:%s:%s:%s:%s:%s\n' % (BUILD_STATE_VERSION, target.name, lib.name, lib.__class__.__name__, arch, variant)).encode('utf-8'))
+    for var in BUILD_STATE_ENV_VARS:
+        hasher.update(('%s=%s\n' % (var, os.environ.get(var, ''))).encode('utf-8'))
+    Common_AddTreeFingerprint(ARPathFromHere('Utils'), hasher)
+    Common_AddTreeFingerprint(lib.path, hasher)
+    for confdep in lib.confdeps:
+        if '*' in confdep:
+            Common_AddTreeFingerprint(os.path.dirname(confdep), hasher)
+        else:
+            Common_StatPath(confdep, hasher)
+    for pb in lib.pbdeps:
+        Common_AddTreeFingerprint(pb.path, hasher)
+    for dep in lib.deps:
+        if not lib.isDepAvailableForTarget(dep, target):
+            continue
+        row = state.get(dep.name, arch, variant)
+        if row is None:
+            return None
+        hasher.update(('dep:%s:%s\n' % (dep.name, row[0])).encode('utf-8'))
+    return hasher.hexdigest()
+
+# Return True if a library (or binary) must be built
+# If its stored state is up to date, restore its soLibs and mark it as built
+def Common_LibraryNeedsToBuild(target, lib, arch, variant, isBin=False):
+    fingerprint = Common_ComputeLibraryFingerprint(target, lib, arch, variant)
+    name = Common_GetStateName(lib, isBin)
+    if isBin:
+        if target.hasAlreadyBuiltBinary(lib):
+            return False
+        if fingerprint is None or not target.buildState.isUpToDate(name, arch, variant, fingerprint):
+            return True
+    elif target.needsToBuild(lib, arch, variant, fingerprint):
+        return True
+    (fingerprint, soLibs, outputs) = target.buildState.get(name, arch, variant)
+    for soname in soLibs:
+        if soname not in lib.soLibs:
+            lib.soLibs.append(soname)
+    if isBin:
+        target.addBuiltBinary(lib)
+    else:
+        target.addBuiltLibrary(lib)
+    ARLog('%(name)s is up to date for %(target)s' % locals())
+    return False
+
+# Record the state of a library (or binary) after a successful build
+def Common_RecordLibraryState(target, lib, arch, variant, outputs, isBin=False):
+    Common_ForgetTreeFingerprints(lib)
+    fingerprint = Common_ComputeLibraryFingerprint(target, lib, arch, variant)
+    if fingerprint is not None:
+        target.buildState.record(Common_GetStateName(lib, isBin), arch, variant, fingerprint, lib.soLibs, outputs)
+
+def Common_ForgetLibraryState(target, lib, isBin=False):
+    Common_GetBuildState(target).forget(Common_GetStateName(lib, isBin))
@@ -0,0 +1,114 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import json
+
+# Spans of the build are recorded next to the log file, one json record per line
+def Common_GetTraceSpansFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.spans')
+
+# Read all the spans recorded in a spans file
+def Common_ReadTraceSpans(path):
+    spans = []
+    if not os.path.exists(path):
+        return spans
+    tfile = open(path)
+    for line in tfile:
+        try:
+            span = json.loads(line)
+        except ValueError:
+            continue
+        if 'start' in span and 'end' in span:
+            spans.append(span)
+    tfile.close()
+    return spans
+
+# Give each process a track : a process reuses the track of a previous one
+# when their lifetimes do not overlap, so that there is one track per
+# concurrent worker instead of one per forked process
+# The main process (mainPid) always gets track 0
+def Common_AssignTraceTracks(spans, mainPid):
+    lifetimes = {}
+    for span in spans:
+        pid = span['pid']
+        (start, end) = lifetimes.get(pid, (span['start'], span['end']))
+        lifetimes[pid] = (min(start, span['start']), max(end, span['end']))
+    tracks = { mainPid : 0 }
+    tracksEnd = [ None ]
+    for pid in sorted(lifetimes, key=lambda pid: lifetimes[pid][0]):
+        if pid == mainPid:
+            continue
+        (start, end) = lifetimes[pid]
+        for index in range(1, len(tracksEnd)):
+            if tracksEnd[index] <= start:
+                break
+        else:
+            index = len(tracksEnd)
+            tracksEnd.append(None)
+        tracks[pid] = index
+        tracksEnd[index] = end
+    return tracks
+
+# Convert the recorded spans to a Chrome trace-event file
+# (open it in chrome://tracing or https://ui.perfetto.dev)
+def Common_ExportChromeTrace(spansFile, traceFile, mainPid=None):
+    spans = Common_ReadTraceSpans(spansFile)
+    if mainPid is None:
+        mainPid = os.getpid()
+    tracks = Common_AssignTraceTracks(spans, mainPid)
+    base = min([ span['start'] for span in spans ] or [ 0 ])
+    events = [ { 'name' : 'process_name', 'ph' : 'M', 'pid' : 1, 'tid' : 0, 'args' : { 'name' : 'SDK3Build' } } ]
+    for index in sorted(set(tracks.values())):
+        trackName = 'main' if index == 0 else 'worker %d' % index
+        events.append({ 'name' : 'thread_name', 'ph' : 'M', 'pid' : 1, 'tid' : index, 'args' : { 'name' : trackName } })
+        events.append({ 'name' : 'thread_sort_index', 'ph' : 'M', 'pid' : 1, 'tid' : index, 'args' : { 'sort_index' : index } })
+    # Parents first, so that spans starting at the same time nest properly
+    for span in sorted(spans, key=lambda span: (span['start'], -span['end'])):
+        args = dict(span.get('args', {}))
+        args['pid'] = span['pid']
+        args['result'] = span.get('result')
+        events.append({ 'name' : span['name'],
+                        'cat'  : 'build',
+                        'ph'   : 'X',
+                        'ts'   : round((span['start'] - base) * 1000000, 1),
+                        'dur'  : round((span['end'] - span['start']) * 1000000, 1),
+                        'pid'  : 1,
+                        'tid'  : tracks[span['pid']],
+                        'args' : args })
+    tfile = open(traceFile + '.tmp', 'w')
+    json.dump({ 'traceEvents' : events, 'displayTimeUnit' : 'ms' }, tfile)
+    tfile.close()
+    os.rename(traceFile + '.tmp', traceFile)
+    ARLog('Build trace written to %s (%d spans)' % (traceFile, len(spans)))
+    return True
@@ -40,16 +40,28 @@ def Common_ValidAutotoolsDirectory(path):
             return True
     return False
 
-def Common_CheckBootstrap(path):
-    args = dict(locals())
+# Return why the bootstrap script of a directory must be run, or None if it is up to date
+# Only uses filesystem metadata
+def Common_BootstrapStaleReason(path):
+    CONFIGURE    = '%(path)s/configure' % locals()
+    MAKEFILE_AM  = '%(path)s/Makefile.am' % locals()
+    CONFIGURE_AC = '%(path)s/configure.ac' % locals()
+    CONFIGURE_IN = '%(path)s/configure.in' % locals()
+    ARSDK_M4     = ARPathFromHere('Utils/m4/ARSDK.m4')
 
-    StartDumpArgs(**args)
+    if not os.path.exists(CONFIGURE):
+        return 'No configure script'
+    for _file in [ MAKEFILE_AM, CONFIGURE_AC, CONFIGURE_IN, ARSDK_M4 ]:
+        if ARFileIsNewerThan(_file, CONFIGURE):
+            return '%(_file)s is newer than %(CONFIGURE)s' % locals()
+    return None
 
+@ARTraced
+def Common_CheckBootstrap(path):
     CONFIGURE    = '%(path)s/configure' % locals()
     MAKEFILE_AM  = '%(path)s/Makefile.am' % locals()
     CONFIGURE_AC = '%(path)s/configure.ac' % locals()
     CONFIGURE_IN = '%(path)s/configure.in' % locals()
-    ARSDK_M4     = ARPathFromHere('Utils/m4/ARSDK.m4')
 
     BSTRAP = ''
 
@@ -65,25 +77,14 @@ def Common_CheckBootstrap(path):
     # Check for needed files for bootstrapping
     if (not os.path.exists(MAKEFILE_AM) or not os.path.exists(CONFIGURE_AC)) and not os.path.exists(CONFIGURE):
         ARLog('Given directory must contains Makefile.am and configure.ac')
-        return EndDumpArgs(res=False, **args)
+        return False
 
     # Check if we need to rerun the bootstrapping script
     # + rerun if needed
     mustRerun = False
-    if not os.path.exists(CONFIGURE):
-        ARLog('No configure script : must run %(BSTRAP)s' % locals())
-        mustRerun = True
-    elif ARFileIsNewerThan(MAKEFILE_AM, CONFIGURE):
-        ARLog('%(MAKEFILE_AM)s is newer than %(CONFIGURE)s : rerun %(BSTRAP)s' % locals())
-        mustRerun = True
-    elif ARFileIsNewerThan(CONFIGURE_AC, CONFIGURE):
-        ARLog('%(CONFIGURE_AC)s is newer than %(CONFIGURE)s : rerun %(BSTRAP)s' % locals())
-        mustRerun = True
-    elif ARFileIsNewerThan(CONFIGURE_IN, CONFIGURE):
-        ARLog('%(CONFIGURE_IN)s is newer than %(CONFIGURE)s : rerun %(BSTRAP)s' % locals())
-        mustRerun = True
-    elif ARFileIsNewerThan(ARSDK_M4, CONFIGURE):
-        ARLog('%(ARSDK_M4)s is newer than %(CONFIGURE)s : rerun %(BSTRAP)s' % locals())
+    reason = Common_BootstrapStaleReason(path)
+    if reason is not None:
+        ARLog('%(reason)s : must run %(BSTRAP)s' % locals())
         mustRerun = True
 
 
@@ -91,11 +92,11 @@ def Common_CheckBootstrap(path):
     if mustRerun:
         cdir = Chdir(path)
         if found:
-            res = ARExecute(BSTRAP)
+            res = ARExecute([BSTRAP])
         elif os.path.exists(CONFIGURE_AC) or os.path.exists(CONFIGURE_IN) or os.path.exists(MAKEFILE_AM):
-            res = ARExecute('autoreconf -fiv')
+            res = ARExecute(['autoreconf', '-fiv'])
         else:
             res = True
         cdir.exit()
 
-    return EndDumpArgs(res, **args)
+    return res
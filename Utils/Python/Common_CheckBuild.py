@@ -0,0 +1,140 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+from Common_BuildState import *
+from Common_CheckBootstrap import *
+from Common_CheckConfigure import *
+from Common_BuildConfigureLibrary import Common_GetConfigureDir
+
+#
+# Staleness check of the build graph (--check)
+# Everything here only reads filesystem metadata and the stored build states :
+# no process is spawned, so that the check answers immediately.
+#
+
+CHECK_UP_TO_DATE      = 'up-to-date'
+CHECK_NEEDS_MAKE      = 'needs-make'
+CHECK_NEEDS_CONFIGURE = 'needs-configure'
+CHECK_NEEDS_BOOTSTRAP = 'needs-bootstrap'
+
+# Return the configure build directories of a library/binary for the given variant
+# (Targets/<t>/Build/<lib>[_<arch>][_dbg])
+def Common_GetConfigureBuildDirs(target, lib, isLib, debug):
+    prefix = 'lib' if (isLib and (not lib.name.startswith('lib')) ) else ''
+    BuildDir = ARPathFromHere('Targets/%(target)s/Build' % locals())
+    baseName = prefix + lib.name
+    buildDirs = []
+    if not os.path.isdir(BuildDir):
+        return buildDirs
+    for name in sorted(os.listdir(BuildDir)):
+        if name != baseName and not name.startswith(baseName + '_'):
+            continue
+        suffix = name[len(baseName):]
+        if suffix.endswith('_dbg') != debug:
+            continue
+        if suffix.startswith('_Java'):
+            continue
+        buildDirs.append(os.path.join(BuildDir, name))
+    return buildDirs
+
+# Return (status, reason) for a library or binary
+def Common_GetBuildStatus(target, lib, archs, variant, debug, isBin=False, depsUpToDate=True):
+    fingerprint = Common_ComputeLibraryFingerprint(target, lib, archs, variant)
+    state = Common_GetBuildState(target)
+    name = Common_GetStateName(lib, isBin)
+    if depsUpToDate and fingerprint is not None and state.isUpToDate(name, archs, variant, fingerprint):
+        return (CHECK_UP_TO_DATE, None)
+
+    if not depsUpToDate:
+        reason = 'A dependancy is not up to date'
+    elif state.get(name, archs, variant) is None:
+        reason = 'Never built'
+    else:
+        reason = 'Inputs changed since last build'
+
+    if lib.customBuild is not None:
+        return (CHECK_NEEDS_MAKE, reason)
+    LibConfigureDir = Common_GetConfigureDir(lib)
+    if LibConfigureDir is None:
+        return (CHECK_NEEDS_MAKE, reason)
+
+    bootstrapReason = Common_BootstrapStaleReason(LibConfigureDir)
+    if bootstrapReason is not None:
+        return (CHECK_NEEDS_BOOTSTRAP, bootstrapReason)
+
+    buildDirs = Common_GetConfigureBuildDirs(target, lib, not isBin, debug)
+    if not buildDirs:
+        return (CHECK_NEEDS_CONFIGURE, 'Never configured')
+    for buildDir in buildDirs:
+        configureReason = Common_ConfigureStaleReason(lib, LibConfigureDir, buildDir, None, lib.confdeps)
+        if configureReason is not None:
+            return (CHECK_NEEDS_CONFIGURE, '%s (%s)' % (configureReason, os.path.basename(buildDir)))
+
+    return (CHECK_NEEDS_MAKE, reason)
+
+# Check a node after all its dependencies, and print its status
+# statuses is a (isBin, name) -> status dictionnary of the already checked nodes
+def Common_CheckNode(target, lib, archs, variant, debug, nodeps, statuses, isBin=False):
+    key = (isBin, lib.name)
+    if key in statuses:
+        return statuses[key]
+    depsUpToDate = True
+    if not nodeps:
+        for dep in lib.deps:
+            if lib.isDepAvailableForTarget(dep, target):
+                if Common_CheckNode(target, dep, archs, variant, debug, nodeps, statuses) != CHECK_UP_TO_DATE:
+                    depsUpToDate = False
+    (status, reason) = Common_GetBuildStatus(target, lib, archs, variant, debug, isBin=isBin, depsUpToDate=depsUpToDate)
+    statuses[key] = status
+    line = '%-10s %-30s %-16s' % (target.name, lib.name if not isBin else lib.name + ' (bin)', status)
+    if reason is not None:
+        line += ' ' + reason.replace('\n', ' ')
+    ARPrint(line)
+    return status
+
+# Report the status of all the selected libraries and binaries
+# Return True if everything is up to date
+def Common_CheckTargets(targets, libs, bins, debug=False, inhouse=False, nodeps=False, requestedArchs=None):
+    variant = Common_GetBuildVariant(debug, inhouse)
+    archs = Common_GetBuildArchs(requestedArchs)
+    allUpToDate = True
+    for target in targets:
+        statuses = {}
+        for lib in libs:
+            if lib.isAvailableForTarget(target):
+                Common_CheckNode(target, lib, archs, variant, debug, nodeps, statuses)
+        for bin in bins:
+            if bin.isAvailableForTarget(target):
+                Common_CheckNode(target, bin, archs, variant, debug, nodeps, statuses, isBin=True)
+        for status in statuses.values():
+            if status != CHECK_UP_TO_DATE:
+                allUpToDate = False
+    return allUpToDate
@@ -29,40 +29,17 @@
     SUCH DAMAGE.
 '''
 from ARFuncs import *
+import hashlib
+import json
 import re
 
-def Common_CheckConfigure(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles):
-    args = dict(locals())
-
-    StartDumpArgs(**args)
+# Bump this value to force a configure run in all build dirs
+CONFIGURE_STAMP_VERSION = 1
 
-    # Files used in this part
+# Return the list of files (or '*' patterns) which trigger a configure run when modified
+def Common_GetConfigureInputSpecs(lib, confdir, extraConfigureFiles):
     CONFIGURE  = '%(confdir)s/configure' % locals()
-    FAILFILE   = '%(makedir)s/.configure.failed' % locals()
-    CONFIG_LOG = '%(makedir)s/config.log' % locals()
-    MAKEFILE   = '%(makedir)s/Makefile' % locals()
-
-    # Sanity check
-    if not os.path.exists(CONFIGURE):
-        ARLog('No configure script in %(confdir)s' % locals())
-        return EndDumpArgs(res=False, **args)
-
-    mustRunConfigure = False
-
-    # Check if a previous configure run failed
-    if os.path.exists(FAILFILE):
-        ARLog('Previous configure run failed, rerun it')
-        mustRunConfigure = True
-    # Check if config.log does exist
-    elif not os.path.exists(CONFIG_LOG):
-        ARLog('Config.log does not exists, run configure')
-        mustRunConfigure = True
-    # Check if Makefile does exist
-    elif not os.path.exists(MAKEFILE):
-        ARLog('Makefile does not exists, run configure')
-        mustRunConfigure = True
-
-    confCheckFiles = [ CONFIGURE, ARPathFromHere('Utils/Python/ARSDK_PrebuildActions.py') ]
+    specs = [ CONFIGURE, ARPathFromHere('Utils/Python/ARSDK_PrebuildActions.py') ]
 
     # For non external lib, add all public headers as deps for configure run
     # This allow proper update of enum tostrings and java enum files
@@ -71,6 +48,7 @@ def Common_CheckConfigure(lib, confdir, makedir, ConfigureArgs, extraConfigureFi
     #      regardless of real changes.
     #      To find these libraries, we check for deps on xml files.
     HeadersDir = lib.path + '/Includes/lib' + lib.name + '/*.h'
+    extraConfigureFiles = list(extraConfigureFiles) if extraConfigureFiles is not None else []
     if not lib.ext:
         hasXmlDeps = False
         for ecf in extraConfigureFiles:
@@ -78,69 +56,154 @@ def Common_CheckConfigure(lib, confdir, makedir, ConfigureArgs, extraConfigureFi
                 hasXmlDeps = True
                 break
         if not hasXmlDeps:
-            if extraConfigureFiles is not None:
-                extraConfigureFiles.append(HeadersDir)
-            else:
-                extraConfigureFiles = [HeadersDir]
-
-    for extraFile in extraConfigureFiles:
-        if '*' in extraFile:
-            extraBasedir = os.path.dirname(extraFile)
-            pattern = os.path.basename(extraFile).replace('*', '.*')
-            for basedir, directories, files in os.walk(extraBasedir):
-                for _file in files:
+            extraConfigureFiles.append(HeadersDir)
+    specs.extend(extraConfigureFiles)
+    return specs
+
+# Expand the input specs into ([path, mtime, size] files, [path, mtime] scanned dirs)
+# Recording the scanned dirs catches files added to (or removed from) a pattern
+def Common_ScanConfigureInputs(specs):
+    files = []
+    dirs = []
+    for spec in specs:
+        if '*' in spec:
+            extraBasedir = os.path.dirname(spec)
+            pattern = os.path.basename(spec).replace('*', '.*')
+            for basedir, directories, _files in os.walk(extraBasedir):
+                dirs.append([basedir, os.stat(basedir).st_mtime])
+                for _file in sorted(_files):
                     match = re.search(pattern, _file)
                     if match is not None:
-                        confCheckFiles.append(os.path.join(basedir, _file))
+                        path = os.path.join(basedir, _file)
+                        st = os.stat(path)
+                        files.append([path, st.st_mtime, st.st_size])
+        elif os.path.exists(spec):
+            st = os.stat(spec)
+            files.append([spec, st.st_mtime, st.st_size])
         else:
-            confCheckFiles.append(extraFile)
+            files.append([spec, None, None])
+    return (files, dirs)
+
+# Canonical form of the (merged) configure args : unquoted, whitespace collapsed, sorted
+# so that quoting or ordering differences do not trigger a configure run
+def Common_CanonicalConfigureArg(arg):
+    arg = arg.replace('"', '').replace('\'', '')
+    if '=' in arg:
+        (name, value) = arg.split('=', 1)
+        return name.strip() + '=' + ' '.join(value.split())
+    return ' '.join(arg.split())
+
+def Common_HashConfigureArgs(ConfigureArgs):
+    canonArgs = sorted([ Common_CanonicalConfigureArg(arg) for arg in ConfigureArgs ])
+    return hashlib.sha1('\n'.join(canonArgs).encode('utf-8')).hexdigest()
+
+def Common_GetConfigureStampFile(makedir):
+    return '%(makedir)s/.configure.stamp' % locals()
+
+def Common_ReadConfigureStamp(makedir):
+    STAMP = Common_GetConfigureStampFile(makedir)
+    if not os.path.exists(STAMP):
+        return None
+    sfile = open(STAMP, 'r')
+    try:
+        stamp = json.load(sfile)
+    except ValueError:
+        stamp = None
+    sfile.close()
+    return stamp
+
+# Record the configure args and inputs state after a successful configure run
+def Common_WriteConfigureStamp(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles):
+    specs = Common_GetConfigureInputSpecs(lib, confdir, extraConfigureFiles)
+    (files, dirs) = Common_ScanConfigureInputs(specs)
+    stamp = { 'version' : CONFIGURE_STAMP_VERSION,
+              'args'    : Common_HashConfigureArgs(ConfigureArgs),
+              'specs'   : specs,
+              'files'   : files,
+              'dirs'    : dirs }
+    STAMP = Common_GetConfigureStampFile(makedir)
+    sfile = open(STAMP + '.tmp', 'w')
+    json.dump(stamp, sfile)
+    sfile.close()
+    os.rename(STAMP + '.tmp', STAMP)
+
+# Return why configure must be run in makedir, or None if it is up to date
+# Only reads the configure stamp and stats the recorded inputs
+# If ConfigureArgs is None, the configure args are not checked
+def Common_ConfigureStaleReason(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles):
+    # Files used in this part
+    FAILFILE   = '%(makedir)s/.configure.failed' % locals()
+    MAKEFILE   = '%(makedir)s/Makefile' % locals()
 
-    if not mustRunConfigure:
-        for _file in confCheckFiles:
-            if ARFileIsNewerThan(_file, CONFIG_LOG):
-                ARLog(os.path.basename(_file) + ' is newer than config.log, rerun configure')
-                mustRunConfigure = True
-                break
+    # Check if a previous configure run failed
+    if os.path.exists(FAILFILE):
+        return 'Previous configure run failed'
+    # Check if Makefile does exist
+    if not os.path.exists(MAKEFILE):
+        return 'Makefile does not exists'
+
+    stamp = Common_ReadConfigureStamp(makedir)
+    if stamp is None:
+        return 'No configure stamp'
+    if stamp.get('version') != CONFIGURE_STAMP_VERSION:
+        return 'Configure stamp is outdated'
+    if stamp['specs'] != Common_GetConfigureInputSpecs(lib, confdir, extraConfigureFiles):
+        return 'Configure inputs list changed'
+    if ConfigureArgs is not None and stamp['args'] != Common_HashConfigureArgs(ConfigureArgs):
+        return 'ConfigureArgs changed'
+
+    for (path, mtime, size) in stamp['files']:
+        try:
+            st = os.stat(path)
+        except OSError:
+            if mtime is not None:
+                return os.path.basename(path) + ' was removed'
+            continue
+        if st.st_mtime != mtime or st.st_size != size:
+            return os.path.basename(path) + ' changed'
+    for (path, mtime) in stamp['dirs']:
+        if not os.path.isdir(path) or os.stat(path).st_mtime != mtime:
+            return 'Content of ' + path + ' changed'
+
+    return None
+
+@ARTraced
+def Common_CheckConfigure(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles):
+    # Files used in this part
+    CONFIGURE  = '%(confdir)s/configure' % locals()
+    FAILFILE   = '%(makedir)s/.configure.failed' % locals()
 
+    # Sanity check
+    if not os.path.exists(CONFIGURE):
+        ARLog('No configure script in %(confdir)s' % locals())
+        return False
 
-    # Check config.log args against our args
-    if not mustRunConfigure:
-        # Write current args as a string (same format as in config.log)
-        STR_ARGS = ARListAsBashArg(ConfigureArgs).replace('\'','').replace('"','')
-        # Retrieve config.log args list
-        LOG_ARGS = None
-        clogfile = open(CONFIG_LOG, 'r')
-        for line in clogfile.readlines():
-            match = re.search(r'^[\ \t]*\$.*configure.*', line)
-            if match:
-                LOG_ARGS = re.sub(r'.*configure\ ', '', line).strip()
-                break
-        clogfile.close()
-        if LOG_ARGS != STR_ARGS:
-            ARLog('Rerun configure because ConfigureArgs are differents :')
-            ARLog(' OLD args -> %(LOG_ARGS)s' % locals())
-            ARLog(' NEW args -> %(STR_ARGS)s' % locals())
-            mustRunConfigure = True
+    mustRunConfigure = False
+    reason = Common_ConfigureStaleReason(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles)
+    if reason is not None:
+        ARLog('%(reason)s, rerun configure' % locals())
+        mustRunConfigure = True
 
     res = True
     if mustRunConfigure:
-        # Remove fail info file if it exists
-        ARDeleteIfExists(FAILFILE)
+        # Remove fail info file and stamp if they exist
+        ARDeleteIfExists(FAILFILE, Common_GetConfigureStampFile(makedir))
 
         # Go to makedir
         mdir = Chdir(makedir)
 
         # Run configure
-        if not ARExecute(CONFIGURE + ' ' + ARListAsBashArg(ConfigureArgs), failOnError=False):
+        if not ARExecute(ARMakeCommand([CONFIGURE], ConfigureArgs), failOnError=False):
             # Error
             # Create FAILFILE
             open(FAILFILE, 'a').close()
             res = False
 
         if res:
-            ARExecute(os.environ.get('ARMAKE') + ' clean')
+            ARExecute(ARMakeArgv() + ['clean'])
+            Common_WriteConfigureStamp(lib, confdir, makedir, ConfigureArgs, extraConfigureFiles)
 
         # Return to previous directory
         mdir.exit()
 
-    return EndDumpArgs(res, **args)
+    return res
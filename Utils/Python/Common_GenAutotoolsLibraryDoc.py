@@ -37,22 +37,20 @@ def Common_WriteValuesToDoxyCfgFile(DFile, **kwargs):
     for key, value in kwargs.items():
         os.write(DFile, '%(key)s = %(value)s\n' % locals())
 
+@ARTraced
 def Common_GenAutotoolsLibraryDoc(target, lib, clean=False, subdirsToInclude=[], onlyC=True):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     res = False
 
     # Do not generate doc for external lib
     if lib.ext:
         ARLog('Documentation will not be generated for external libraries')
-        return EndDumpArgs(res=True, **args)
+        return True
     OutputDir = ARPathFromHere('Targets/%(target)s/Build/Doc/lib%(lib)s' % locals())
 
     # Clean handle
     if clean:
         ARDeleteIfExists(OutputDir)
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # Create output directory
     if not os.path.exists(OutputDir):
@@ -63,7 +61,7 @@ def Common_GenAutotoolsLibraryDoc(target, lib, clean=False, subdirsToInclude=[],
     Makefile = '%(BuildDir)s/Makefile' % locals()
     if os.path.exists(Makefile):
         bdir = Chdir(BuildDir)
-        res = ARExecute(os.environ.get('ARMAKE') + ' doxygen-doc')
+        res = ARExecute(ARMakeArgv() + ['doxygen-doc'])
         bdir.exit()
     # If make doxygen-doc failed, or if the Makefile does not exists, run doxygen manually
     if not res:
@@ -75,7 +73,7 @@ def Common_GenAutotoolsLibraryDoc(target, lib, clean=False, subdirsToInclude=[],
         if not os.path.exists(ConfigureAc):
             ARLog('Unable to generate lib%(lib)s documentation')
             ARLog('lib%(lib)s does not contains a configure.ac file, and was not previously built')
-            return EndDumpArgs(res=False, **args)
+            return False
         # Create Doxygen Extra Args
         SRCDIR = lib.path + '/Build'
         PROJECT = 'lib%(lib)s' % locals()
@@ -90,8 +88,8 @@ def Common_GenAutotoolsLibraryDoc(target, lib, clean=False, subdirsToInclude=[],
         confacfile.close()
         if not Version:
             ARLog('Unable to read version from configure.ac file')
-            return EndDumpArgs(res=False, **args)
-        PERL_PATH = os.popen('which perl').read().strip()
+            return False
+        PERL_PATH = ARWhich('perl') or ''
         HAVE_DOT = 'NO'
         if ARExistsInPath('dot'):
             HAVE_DOT = 'YES'
@@ -141,4 +139,4 @@ def Common_GenAutotoolsLibraryDoc(target, lib, clean=False, subdirsToInclude=[],
 
         os.remove (DoxyCfgFinalName)
 
-    return EndDumpArgs(res, **args)
+    return res
@@ -33,6 +33,7 @@ import os
 
 def checkAllReposUpToDate(repos, MYDIR, baseRepoUrl, defaultBaseRepoUrl, nonInteractive=False, extraScripts=[]):
     for repo in repos.list:
+        span = ARTraceSpan('git', repo=repo.name, rev=repo.rev)
         if not repo.ext:
             if not repo.forceBaseUrl:
                 repoURL = baseRepoUrl + repo.name + '.git'
@@ -70,11 +71,13 @@ def checkAllReposUpToDate(repos, MYDIR, baseRepoUrl, defaultBaseRepoUrl, nonInte
             repoDir.exit()
         for cmd in repo.additionnalCommands:
             ARExecute(cmd)
+        span.stop()
     for webfile in repos.webfilesList:
         if not os.path.exists(webfile.storePath):
             os.makedirs(webfile.storePath)
         Url = webfile.url
         Dst = os.path.join(webfile.storePath, webfile.name)
+        span = ARTraceSpan('download', url=Url)
         if not os.path.exists(Dst):
             downloadOk = False
             if ARExistsInPath('wget'):
@@ -98,4 +101,5 @@ def checkAllReposUpToDate(repos, MYDIR, baseRepoUrl, defaultBaseRepoUrl, nonInte
             repoDir = Chdir(webfile.storePath)
             ARExecute('patch -tsN -p0 < %(patchPath)s' % locals(), failOnError=False)
             repoDir.exit()
+        span.stop()
 
@@ -34,13 +34,17 @@ import re
 from ARFuncs import *
 
 
-def Common_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=None):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
+@ARTraced
+def Common_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=None, lib=None):
     res = True
 
-    if not pb.isAvailableForTarget(target):
+    # When given, lib is the library depending on pb : its dependancy may be
+    # restricted to some targets
+    if lib is not None:
+        available = lib.isPrebuiltDepAvailableForTarget(pb, target)
+    else:
+        available = pb.isAvailableForTarget(target)
+    if not available:
         ARLog('Prebuilt library %(pb)s does not exists for target %(target)s' % locals())
     else:
         Type = pb.type
@@ -56,7 +60,7 @@ def Common_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=No
                 Path = pb.path
                 Path = ARReplaceEnvVars(Path)
                 if Path is None:
-                    return EndDumpArgs(res=False, **args)
+                    return False
                 OutputFile = os.path.join(OutputDir, os.path.basename(Path))
                 if not os.path.exists(OutputFile):
                     shutil.copy2(Path, OutputFile)
@@ -76,7 +80,7 @@ def Common_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=No
                 Path = pb.path
                 Path = ARReplaceEnvVars(Path)
                 if Path is None:
-                    return EndDumpArgs(res=False, **args)
+                    return False
                 ARCopyAndReplace(Path, OutputDir, deletePrevious=True)
         elif Type == 'external_project':
             if not forcedOutputDir:
@@ -87,11 +91,11 @@ def Common_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=No
                 Path = pb.path
                 Path = ARReplaceEnvVars(Path)
                 if Path is None:
-                    return EndDumpArgs(res=False, **args)
+                    return False
                 if not os.path.islink(OutputDir):
                     os.symlink(Path,OutputDir)
         else:
             ARLog('Do not know how to handle prebuilts of type %(Type)s' % locals())
             res = False
 
-    return EndDumpArgs(res, **args)
+    return res
@@ -0,0 +1,121 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import filecmp
+import re
+import shutil
+
+#
+# Libraries are installed once, into a staging directory (make install DESTDIR=...),
+# then merged into the real install directory. The list of installed files is kept
+# in a manifest in the build directory, and used to find the shared objects and
+# to uninstall the library.
+#
+
+def Common_GetInstallManifestFile(builddir):
+    return '%(builddir)s/.arsdk_install.manifest' % locals()
+
+def Common_GetInstallStageDir(builddir):
+    return '%(builddir)s/.arsdk_stage' % locals()
+
+def Common_ReadInstallManifest(builddir):
+    MANIFEST = Common_GetInstallManifestFile(builddir)
+    if not os.path.exists(MANIFEST):
+        return None
+    mfile = open(MANIFEST, 'r')
+    files = [ line.rstrip('\n') for line in mfile.readlines() if line.strip() ]
+    mfile.close()
+    return files
+
+def Common_WriteInstallManifest(builddir, files):
+    if not os.path.exists(builddir):
+        os.makedirs(builddir)
+    MANIFEST = Common_GetInstallManifestFile(builddir)
+    mfile = open(MANIFEST + '.tmp', 'w')
+    for _file in files:
+        mfile.write(_file + '\n')
+    mfile.close()
+    os.rename(MANIFEST + '.tmp', MANIFEST)
+
+# Copy the staged files into InstallDir, and return the list of installed paths
+# Files which did not change are left untouched (as 'install -C' does), so that
+# their mtime does not trigger useless rebuilds of the dependent libraries
+def Common_MergeStagedInstall(StagedInstallDir, InstallDir):
+    files = []
+    for baseDir, directories, _files in os.walk(StagedInstallDir):
+        relDir = os.path.relpath(baseDir, StagedInstallDir)
+        dstDir = os.path.normpath(os.path.join(InstallDir, relDir))
+        if not os.path.exists(dstDir):
+            os.makedirs(dstDir)
+        # os.walk lists symlinks to directories as directories
+        for name in sorted(_files + [ d for d in directories if os.path.islink(os.path.join(baseDir, d)) ]):
+            src = os.path.join(baseDir, name)
+            dst = os.path.join(dstDir, name)
+            files.append(dst)
+            if os.path.islink(src):
+                linkto = os.readlink(src)
+                if os.path.islink(dst) and os.readlink(dst) == linkto:
+                    continue
+                if os.path.isdir(dst) and not os.path.islink(dst):
+                    shutil.rmtree(dst)
+                elif os.path.lexists(dst):
+                    os.remove(dst)
+                os.symlink(linkto, dst)
+            else:
+                if os.path.isfile(dst) and not os.path.islink(dst) and filecmp.cmp(src, dst, shallow=False):
+                    continue
+                if os.path.lexists(dst):
+                    os.remove(dst)
+                shutil.copy2(src, dst)
+    return files
+
+# Return the shared objects found in the installed files
+def Common_GetSoLibsFromManifest(files, suffix, soext):
+    soLibs = []
+    soregex = r'lib[a-z]*' + suffix + '\.' + soext + r'\ '
+    for _file in files:
+        for somatch in re.finditer(soregex, os.path.basename(_file) + ' '):
+            soname = somatch.group().strip()
+            if soname not in soLibs:
+                soLibs.append(soname)
+    return soLibs
+
+# Remove the files listed in the manifest of a build directory
+# Return False if there is no manifest
+def Common_UninstallFromManifest(builddir):
+    files = Common_ReadInstallManifest(builddir)
+    if files is None:
+        return False
+    for _file in files:
+        if os.path.islink(_file) or os.path.isfile(_file):
+            os.remove(_file)
+    ARDeleteIfExists(Common_GetInstallManifestFile(builddir))
+    return True
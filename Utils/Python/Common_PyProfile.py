@@ -0,0 +1,167 @@
+'''
+    Copyright (C) 2014 Parrot SA
+
+    Redistribution and use in source and binary forms, with or without
+    modification, are permitted provided that the following conditions
+    are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in
+      the documentation and/or other materials provided with the 
+      distribution.
+    * Neither the name of Parrot nor the names
+      of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written
+      permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+    FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+    COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+    INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+    BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+    OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED 
+    AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+    OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
+    SUCH DAMAGE.
+'''
+from ARFuncs import *
+import atexit
+import cProfile
+import pstats
+import signal
+import multiprocessing.util
+
+# Interval of the stack sampler, in seconds of CPU time
+PYPROFILE_SAMPLE_INTERVAL = 0.005
+
+#
+# Profiling of the build scripts themselves
+#
+# Each process (main one, scheduler tasks, pool workers) runs under its own
+# cProfile profiler and stack sampler, and writes <pid>.pstats and
+# <pid>.collapsed when it exits. The main process then merges them into
+# build.pstats (for pstats/snakeviz) and build.collapsed (for flamegraph.pl)
+#
+
+Common_PyProfileState = { 'dir' : None, 'owner' : None, 'pid' : None, 'profiler' : None, 'samples' : {} }
+
+# Profiles of the build are written next to the log file
+def Common_GetPyProfileDir():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.pyprofile')
+
+# SIGPROF handler : count the current stack of the main thread
+def Common_PyProfileSample(signum, frame):
+    stack = []
+    while frame is not None:
+        stack.append(frame.f_code)
+        frame = frame.f_back
+    stack = tuple(stack)
+    samples = Common_PyProfileState['samples']
+    samples[stack] = samples.get(stack, 0) + 1
+
+# Start the profiler and the sampler of the calling process
+def Common_StartProcessPyProfile():
+    if Common_PyProfileState['profiler'] is not None:
+        # Inherited from the parent process : its data is not ours
+        Common_PyProfileState['profiler'].disable()
+    Common_PyProfileState['pid'] = os.getpid()
+    Common_PyProfileState['samples'] = {}
+    Common_PyProfileState['profiler'] = cProfile.Profile()
+    # Timers are not inherited by forked processes
+    signal.signal(signal.SIGPROF, Common_PyProfileSample)
+    signal.siginterrupt(signal.SIGPROF, False)
+    signal.setitimer(signal.ITIMER_PROF, PYPROFILE_SAMPLE_INTERVAL, PYPROFILE_SAMPLE_INTERVAL)
+    Common_PyProfileState['profiler'].enable()
+
+# Name of a stack frame in the collapsed stacks
+def Common_PyProfileFrameName(code):
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+# Stop the profiler and the sampler of the calling process, and write its data
+def Common_StopProcessPyProfile():
+    profiler = Common_PyProfileState['profiler']
+    if profiler is None or Common_PyProfileState['pid'] != os.getpid():
+        return
+    signal.setitimer(signal.ITIMER_PROF, 0, 0)
+    profiler.disable()
+    Common_PyProfileState['profiler'] = None
+    pid = os.getpid()
+    PROFDIR = Common_PyProfileState['dir']
+    profiler.dump_stats(os.path.join(PROFDIR, '%d.pstats' % pid))
+    cfile = open(os.path.join(PROFDIR, '%d.collapsed' % pid), 'w')
+    for stack, count in Common_PyProfileState['samples'].items():
+        names = [ Common_PyProfileFrameName(code) for code in reversed(stack) ]
+        cfile.write('%s %d\n' % (';'.join(names), count))
+    cfile.close()
+
+# Run in every process started by multiprocessing, before its target
+def Common_PyProfileAfterFork(state):
+    Common_StartProcessPyProfile()
+    # Pool workers and Process exit with os._exit : atexit is not run, but
+    # the multiprocessing finalizers are
+    multiprocessing.util.Finalize(None, Common_StopProcessPyProfile, exitpriority=100)
+
+class Common_PyProfileForkHook(object):
+    pass
+
+Common_PyProfileForkHookObj = Common_PyProfileForkHook()
+
+# Profile the build scripts, in this process and all the processes it starts
+# The merged profiles are written when the calling process exits
+def Common_StartPyProfile():
+    PROFDIR = Common_GetPyProfileDir()
+    ARDeleteIfExists(PROFDIR)
+    os.makedirs(PROFDIR)
+    Common_PyProfileState['dir'] = PROFDIR
+    Common_PyProfileState['owner'] = os.getpid()
+    multiprocessing.util.register_after_fork(Common_PyProfileForkHookObj, Common_PyProfileAfterFork)
+    Common_StartProcessPyProfile()
+    atexit.register(Common_FinishPyProfile)
+
+# Merge the files written by all the processes into build.pstats and build.collapsed
+def Common_MergePyProfiles(PROFDIR):
+    stats = None
+    stacks = {}
+    count = 0
+    for name in sorted(os.listdir(PROFDIR)):
+        path = os.path.join(PROFDIR, name)
+        if name.startswith('build.'):
+            continue
+        if name.endswith('.pstats'):
+            count += 1
+            if stats is None:
+                stats = pstats.Stats(path)
+            else:
+                stats.add(path)
+        elif name.endswith('.collapsed'):
+            cfile = open(path)
+            for line in cfile:
+                (stack, _, samples) = line.rstrip('\n').rpartition(' ')
+                try:
+                    stacks[stack] = stacks.get(stack, 0) + int(samples)
+                except ValueError:
+                    continue
+            cfile.close()
+    if stats is not None:
+        stats.dump_stats(os.path.join(PROFDIR, 'build.pstats'))
+    cfile = open(os.path.join(PROFDIR, 'build.collapsed'), 'w')
+    for stack in sorted(stacks):
+        cfile.write('%s %d\n' % (stack, stacks[stack]))
+    cfile.close()
+    return count
+
+# Stop profiling the calling process and merge the profiles of the build
+def Common_FinishPyProfile():
+    if Common_PyProfileState['owner'] != os.getpid():
+        return
+    Common_StopProcessPyProfile()
+    PROFDIR = Common_PyProfileState['dir']
+    count = Common_MergePyProfiles(PROFDIR)
+    ARLog('Python profile of %d processes written to %s (build.pstats, build.collapsed)' % (count, PROFDIR))
@@ -30,7 +30,6 @@
 '''
 from ARFuncs import *
 
+@ARTraced
 def Common_RunAntScript(RootDir, SrcDir, Script, depLibs=[], debug=False, clean=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-    return EndDumpArgs(res=True, **args)
+    return True
@@ -31,15 +31,13 @@
 from ARFuncs import *
 import shutil
 
+@ARTraced
 def Darwin_RunXcodeBuild(target, lib, xcprojPath, archs, debug=False, clean=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     res = True
 
     if not os.path.exists(xcprojPath):
         ARLog('%(xcprojPath)s does not exists' % locals())
-        return EndDumpArgs(res=False, **args)
+        return False
 
     FrameworksDir = ARPathFromHere('Targets/%(target)s/Install/Frameworks' % locals())
 
@@ -66,17 +64,17 @@ def Darwin_RunXcodeBuild(target, lib, xcprojPath, archs, debug=False, clean=Fals
         if clean:
             if not ARExecute('xcodebuild -project %(xcprojPath)s -configuration Release -sdk %(SDK)s -arch %(arch)s clean' % locals()):
                 ARLog('Unable to clean Release project')
-                return EndDumpArgs(res=False, **args)
+                return False
             if not ARExecute('xcodebuild -project %(xcprojPath)s -configuration Debug -sdk %(SDK)s -arch %(arch)s clean' % locals()):
                 ARLog('Unable to clean Debug project')
-                return EndDumpArgs(res=False, **args)
+                return False
         else:
             CONFIGURATION = 'Release'
             if debug:
                 CONFIGURATION = 'Debug'
             if not ARExecute('xcodebuild -project %(xcprojPath)s -configuration %(CONFIGURATION)s -sdk %(SDK)s -arch %(arch)s' % locals()):
                 ARLog('Unable to build %(CONFIGURATION)s project' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
 
             BuildFramework = '%(xcprojDir)s/Products/%(arch)s/%(libPrefix)s%(lib)s.framework' % locals()
             BuildFrameworkDbg = '%(xcprojDir)s/Products/%(arch)s/%(libPrefix)s%(lib)s_dbg.framework' % locals()
@@ -99,8 +97,8 @@ def Darwin_RunXcodeBuild(target, lib, xcprojPath, archs, debug=False, clean=Fals
         if debug:
             FrameworkLib = '%(FrameworkDbg)s/%(libPrefix)s%(lib)s_dbg' % locals()
 
-        if not ARExecute('lipo ' + ARListAsBashArg(BuiltLibs) + ' -create -output ' + FrameworkLib):
+        if not ARExecute(['lipo'] + BuiltLibs + ['-create', '-output', FrameworkLib]):
             ARLog('Error while creating universal library')
-            return EndDumpArgs(res=False, **args)
+            return False
 
-    return EndDumpArgs(res=True, **args)
+    return True
@@ -33,10 +33,8 @@ from Common_HandlePrebuiltDep import *
 import os
 import shutil
 
+@ARTraced
 def Java_GenLibraryDoc(target, lib, clean=False, extraSrcDirs=[], extraJavadocArgs=[], extraClasspath=[]):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     OutputDir = ARPathFromHere('Targets/%(target)s/Build/Doc' % locals())
     JavadocRootDir = ARPathFromHere('Targets/%(target)s/Build/.srcdir' % locals())
     JavadocSrcDir = '%(JavadocRootDir)s/sources' % locals()
@@ -45,7 +43,7 @@ def Java_GenLibraryDoc(target, lib, clean=False, extraSrcDirs=[], extraJavadocAr
     # Clean : remove ALL docs (not just the one of the library)
     if clean:
         ARDeleteIfExists (OutputDir, JavadocSrcDir)
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # Create a directory to hold all java sources to generate doc
     if not os.path.exists(JavadocSrcDir):
@@ -66,9 +64,9 @@ def Java_GenLibraryDoc(target, lib, clean=False, extraSrcDirs=[], extraJavadocAr
     # Copy prebuilts
     classpath = []
     for prebuilt in lib.pbdeps:
-        if not Common_HandlePrebuiltDep(target, prebuilt, forcedOutputDir=JavadocPrebuiltDir):
+        if not Common_HandlePrebuiltDep(target, prebuilt, forcedOutputDir=JavadocPrebuiltDir, lib=lib):
             ARLog('Error while handling prebuilt library %(prebuilt)s' % locals())
-            return EndDumpArgs(res=False, **args)
+            return False
 
     # Run javadoc
     # -- Find list of .java / .jar (prebuilts) files
@@ -85,7 +83,7 @@ def Java_GenLibraryDoc(target, lib, clean=False, extraSrcDirs=[], extraJavadocAr
 
     # -- Do nothing if no input files are found
     if not JavaFiles:
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # -- Convert list as strings
     ExtraArgsString = ARListAsBashArg(extraJavadocArgs)
@@ -100,4 +98,4 @@ def Java_GenLibraryDoc(target, lib, clean=False, extraSrcDirs=[], extraJavadocAr
     # -- Actual run
     res = ARExecute('javadoc -d %(OutputDir)s %(JavaFilesString)s %(ExtraArgsString)s %(classPathString)s' % locals())
 
-    return EndDumpArgs(res, **args)
+    return res
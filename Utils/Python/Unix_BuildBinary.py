@@ -31,14 +31,12 @@
 from ARFuncs import *
 from Unix_BuildLibrary import *
 
+@ARTraced
 def Unix_BuildBinary(target, bin, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     # Sanity check : is library valid for this target
     if not bin.isAvailableForTarget(target):
         ARLog('%(bin)s does not need to be built for %(target)s' % locals())
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # First thing : build deps 
     if not nodeps:
@@ -46,22 +44,32 @@ def Unix_BuildBinary(target, bin, clean=False, debug=False, nodeps=False, inhous
             ARLog('Building lib%(dep)s (dependancy of %(bin)s)' % locals())
             if target.hasAlreadyBuilt(dep):
                 ARLog('Dependancy lib%(dep)s already built for %(target)s' % locals())
-            elif not dep.isAvailableForTarget(target):
+            elif not bin.isDepAvailableForTarget(dep, target):
                 ARLog('Dependancy lib%(dep)s does not need to be built for %(target)s' % locals())
-            elif Unix_BuildLibrary(target, dep, clean, debug):
+            elif Unix_BuildLibrary(target, dep, clean, debug, nodeps, inhouse, requestedArchs):
                 ARLog('Dependancy lib%(dep)s built' % locals())
             else:
                 ARLog('Error while building dependancy lib%(dep)s' %locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     else:
         ARLog('Skipping deps building for %(bin)s' % locals())
 
     target.addTriedBinary(bin)
 
+    # Nothing to do if the binary did not change since its last build
+    variant = Common_GetBuildVariant(debug, inhouse)
+    archs = Common_GetBuildArchs(requestedArchs)
+    if clean:
+        Common_ForgetLibraryState(target, bin, isBin=True)
+    elif not Common_LibraryNeedsToBuild(target, bin, archs, variant, isBin=True):
+        return True
+
     # Next : build binary as if it was a library
     res = Common_BuildConfigureLibrary(target, bin, clean=clean, debug=debug, isLib=False, inhouse=inhouse)
 
     if res:
         target.addBuiltBinary(bin)
+        if not clean:
+            Common_RecordLibraryState(target, bin, archs, variant, [], isBin=True)
 
-    return EndDumpArgs(res=res, **args)
+    return res
@@ -31,39 +31,47 @@
 from ARFuncs import *
 from Common_BuildConfigureLibrary import *
 from Common_HandlePrebuiltDep import *
+from Common_BuildState import *
 
+@ARTraced
 def Unix_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None, isMp=False):
     # Unix libraries are only configure libraries, with no extra args
-    args = dict(locals())
-    StartDumpArgs(**args)
 
     # Sanity check : is library valid for this target
     if not lib.isAvailableForTarget(target):
         ARLog('lib%(lib)s does not need to be built for %(target)s' % locals())
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # First thing : build deps
     if not nodeps:
         for pb in lib.pbdeps:
-            if not Common_HandlePrebuiltDep(target, pb):
+            if not Common_HandlePrebuiltDep(target, pb, lib=lib):
                 ARLog('Error while handling prebuilt library %(pb)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
         for dep in lib.deps:
             ARLog('Building lib%(dep)s (dependancy of lib%(lib)s)' % locals())
             if target.hasAlreadyBuilt(dep):
                 ARLog('Dependancy lib%(dep)s already built for %(target)s' % locals())
-            elif not dep.isAvailableForTarget(target):
+            elif not lib.isDepAvailableForTarget(dep, target):
                 ARLog('Dependancy lib%(dep)s does not need to be built for %(target)s' % locals())
-            elif Unix_BuildLibrary(target, dep, clean, debug):
+            elif Unix_BuildLibrary(target, dep, clean, debug, nodeps, inhouse, requestedArchs):
                 ARLog('Dependancy lib%(dep)s built' % locals())
             else:
                 ARLog('Error while building dependancy lib%(dep)s' %locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     else:
         ARLog('Skipping deps building for %(lib)s' % locals())
 
     target.addTriedLibrary(lib)
 
+    # Nothing to do if the library did not change since its last build
+    variant = Common_GetBuildVariant(debug, inhouse)
+    archs = Common_GetBuildArchs(requestedArchs)
+    if clean:
+        Common_ForgetLibraryState(target, lib)
+    elif not Common_LibraryNeedsToBuild(target, lib, archs, variant):
+        return True
+
     # Then : build this library
     ExtraConfFlags = [ 'CFLAGS="-fPIC"']
     res = Common_BuildConfigureLibrary(target, lib, extraArgs=ExtraConfFlags, clean=clean, debug=debug, inhouse=inhouse, isMp=False)
@@ -71,5 +79,8 @@ def Unix_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhou
     # If all went well, mark the library as built for current target
     if res:
         target.addBuiltLibrary(lib)
+        if not clean:
+            InstallLibDir = ARPathFromHere('Targets/%(target)s/Install/lib' % locals())
+            Common_RecordLibraryState(target, lib, archs, variant, [ os.path.join(InstallLibDir, soname) for soname in lib.soLibs ])
 
-    return EndDumpArgs(res, **args)
+    return res
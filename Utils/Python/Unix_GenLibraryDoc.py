@@ -31,10 +31,8 @@
 from ARFuncs import *
 from Common_GenAutotoolsLibraryDoc import *
 
+@ARTraced
 def Unix_GenLibraryDoc(target, lib, clean=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     res = Common_GenAutotoolsLibraryDoc(target, lib, clean)
 
-    return EndDumpArgs(res, **args)
+    return res
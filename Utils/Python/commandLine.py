@@ -51,9 +51,21 @@ class CommandLineParser:
         self.genDoc = False
         self.installDoc = False
         self.doNothing = False
+        self.checkOnly = False
         self.noGit = False
         self.noDeps = False
         self.multiProcess = False
+        self.parallelBuild = False
+        self.parallelTargets = False
+        self.useCache = True
+        self.cacheDir = None
+        self.remoteCacheUrl = None
+        self.logLevel = None
+        self.logJsonFile = None
+        self.traceFile = None
+        self.taskLogs = False
+        self.keepGoing = False
+        self.pyProfile = False
         self.threads = -1
         self.defaultBaseRepoUrl = defaultBaseRepoUrl
         self.repoBaseUrl = defaultBaseRepoUrl
@@ -77,6 +89,7 @@ class CommandLineParser:
         self.parser.add_argument('--doc', action="store_true", help="Generate documentation after building")
         self.parser.add_argument('--install-doc', action="store_true", help="Implies `--doc` and copy the generated documentation to Docs repository")
         self.parser.add_argument('--none', action="store_true", help="Do only GIT Checks, do not build / clean anything")
+        self.parser.add_argument('--check', action="store_true", help="Only report which libraries/binaries are up-to-date or need bootstrap/configure/make, without running any command")
         self.parser.add_argument('--nogit', action="store_true", help="Do not run GIT checks")
         self.parser.add_argument('-j', type=int, help="The number of threads to use. Automatically set to the number of CPUs if not set")
         self.parser.add_argument('--nodep', action="store_true", help="Do not build deps. Use at your own risks.")
@@ -84,6 +97,17 @@ class CommandLineParser:
         self.parser.add_argument('--extra-git-script', action="append", help="Path (relative to ARSDKBuildUtils directory) to an extra script which will be run before updating git repo (with path as its first argument)")
         self.parser.add_argument('--arch', action="append", help="Architectures to be built. May be ignored depending of the target. May fail if an invalid arch name is provided. (Use only if you know what you're doing !)")
         self.parser.add_argument('--mp', action="store_true", help="Run in multiprocess mode (experimental !)")
+        self.parser.add_argument('--parallel', action="store_true", help="Build independent libraries/binaries concurrently, running up to -j build tasks at once")
+        self.parser.add_argument('--parallel-targets', action="store_true", help="Implies `--parallel` and build all selected targets side by side")
+        self.parser.add_argument('--cache-dir', action="store", help="Directory of the build artifact cache (default: $ARSDK_CACHE_DIR or ~/.cache/ARSDKBuildUtils)")
+        self.parser.add_argument('--no-cache', action="store_true", help="Do not use the build artifact cache")
+        self.parser.add_argument('--remote-cache', action="store", help="Base URL of a shared HTTP artifact cache (default: $ARSDK_REMOTE_CACHE_URL)")
+        self.parser.add_argument('--log-level', action="store", choices=['debug', 'info', 'warning', 'error'], help="Minimum level of the messages shown on the console (the log file always gets all of them)")
+        self.parser.add_argument('--log-json', action="store", help="Also write all log messages, as JSON lines, to the given file")
+        self.parser.add_argument('--task-logs', action="store_true", help="Write the output of each build task to Targets/<target>/Build/logs/<task>.log instead of the console (the end of the log is printed on failure)")
+        self.parser.add_argument('--keep-going', action="store_true", help="Do not cancel the other archs of a library when one of them fails to build")
+        self.parser.add_argument('--pyprofile', action="store_true", help="Profile the build scripts themselves (cProfile and stack sampling, in all build processes), written to build.pyprofile/ next to the log file")
+        self.parser.add_argument('--trace', action="store", metavar="FILE", help="Write a timeline of the build to FILE (trace-event JSON, to open in chrome://tracing or ui.perfetto.dev)")
 
 
     def parse(self, argv):
@@ -119,6 +143,8 @@ class CommandLineParser:
             self.installDoc = True
         if args.none:
             self.doNothing = True
+        if args.check:
+            self.checkOnly = True
         if args.nogit:
             self.noGit = True
         if args.nodep:
@@ -150,6 +176,29 @@ class CommandLineParser:
             self.archs = args.arch[:]
         if args.mp:
             self.multiProcess = True
+        if args.parallel:
+            self.parallelBuild = True
+        if args.parallel_targets:
+            self.parallelBuild = True
+            self.parallelTargets = True
+        if args.cache_dir:
+            self.cacheDir = os.path.abspath(args.cache_dir)
+        if args.no_cache:
+            self.useCache = False
+        if args.remote_cache:
+            self.remoteCacheUrl = args.remote_cache
+        if args.log_level:
+            self.logLevel = ARGetLogLevel(args.log_level)
+        if args.log_json:
+            self.logJsonFile = os.path.abspath(args.log_json)
+        if args.task_logs:
+            self.taskLogs = True
+        if args.keep_going:
+            self.keepGoing = True
+        if args.pyprofile:
+            self.pyProfile = True
+        if args.trace:
+            self.traceFile = os.path.abspath(args.trace)
 
         # Fill default values if needed
         if not self.activeTargets:
@@ -186,10 +235,22 @@ class CommandLineParser:
         ARLog(' - GENERATE DOC   = ' + str(self.genDoc))
         ARLog(' - INSTALL DOC    = ' + str(self.installDoc))
         ARLog(' - DO NOTHING     = ' + str(self.doNothing))
+        ARLog(' - CHECK ONLY     = ' + str(self.checkOnly))
         ARLog(' - NO GIT         = ' + str(self.noGit))
         ARLog(' - NO DEPS        = ' + str(self.noDeps))
         ARLog(' - NB THREADS     = ' + str(self.threads))
         ARLog(' - MULTIPROCESS   = ' + str(self.multiProcess))
+        ARLog(' - PARALLEL BUILD = ' + str(self.parallelBuild))
+        ARLog(' - PAR. TARGETS   = ' + str(self.parallelTargets))
+        ARLog(' - USE CACHE      = ' + str(self.useCache))
+        ARLog(' - CACHE DIR      = ' + str(self.cacheDir))
+        ARLog(' - REMOTE CACHE   = ' + str(self.remoteCacheUrl))
+        ARLog(' - LOG LEVEL      = ' + str(ARLogLevelNames.get(self.logLevel, 'info')))
+        ARLog(' - LOG JSON       = ' + str(self.logJsonFile))
+        ARLog(' - TRACE FILE     = ' + str(self.traceFile))
+        ARLog(' - TASK LOGS      = ' + str(self.taskLogs))
+        ARLog(' - KEEP GOING     = ' + str(self.keepGoing))
+        ARLog(' - PYPROFILE      = ' + str(self.pyProfile))
         ARLog('Active targets : {')
         for tar in self.activeTargets:
             ARLog(' - %(tar)s' % locals())
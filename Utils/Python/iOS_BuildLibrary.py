@@ -32,9 +32,10 @@ from ARFuncs import *
 from Common_BuildConfigureLibrary import *
 from Darwin_RunXcodeBuild import *
 from iOS_HandlePrebuiltDep import *
+from Common_BuildState import *
 import shutil
 import re
-from multiprocessing import Lock, Pool, Manager
+from multiprocessing import Lock, Manager
 
 XCRunCache = {}
 
@@ -88,44 +89,52 @@ def iOS_MakePostProcessCb(lib, BuiltLibs, sslLibs, cryptoLibs, Strip, ArchLibDir
         
     return iOS_PostProcessCb
 
+@ARTraced
 def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhouse=False, requestedArchs=None, isMp=False):
-    args = dict(locals())
-
-    StartDumpArgs(**args)
-
     # Sanity check : is library valid for this target
     if not lib.isAvailableForTarget(target):
         ARLog('lib%(lib)s does not need to be built for %(target)s' % locals())
-        return EndDumpArgs(res=True, **args)
+        return True
 
     # First thing : build deps
     if not nodeps:
         for pb in lib.pbdeps:
-            if not iOS_HandlePrebuiltDep(target, pb, clean=clean, debug=debug):
+            if not iOS_HandlePrebuiltDep(target, pb, clean=clean, debug=debug, lib=lib):
                 ARLog('Error while handling prebuilt library %(pb)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
         for dep in lib.deps:
             ARLog('Building lib%(dep)s (dependancy of lib%(lib)s)' % locals())
             if target.hasAlreadyBuilt(dep):
                 ARLog('Dependancy lib%(dep)s already built for %(target)s' % locals())
-            elif not dep.isAvailableForTarget(target):
+            elif not lib.isDepAvailableForTarget(dep, target):
                 ARLog('Dependancy lib%(dep)s does not need to be built for %(target)s' % locals())
             elif iOS_BuildLibrary(target, dep, clean, debug, nodeps, inhouse, requestedArchs):
                 ARLog('Dependancy lib%(dep)s built' % locals())
             else:
                 ARLog('Error while building dependancy lib%(dep)s' %locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     else:
         ARLog('Skipping deps building for %(lib)s' % locals())
 
     target.addTriedLibrary(lib)
 
+    # Nothing to do if the library did not change since its last build
+    variant = Common_GetBuildVariant(debug, inhouse)
+    archs = Common_GetBuildArchs(requestedArchs)
+    if clean:
+        Common_ForgetLibraryState(target, lib)
+    elif not Common_LibraryNeedsToBuild(target, lib, archs, variant):
+        return True
+
     # Check that we're building on Mac OSX
     if not ARExecute('test $(uname) = Darwin',
                      failOnError=False,
                      printErrorMessage=False):
         ARLog('Can\'t build an iOS library while not on Mac OSX (Darwin)')
-        return EndDumpArgs(res=True, **args)
+        return True
+
+    # Output files which must exist for the library to be up to date
+    Outputs = []
 
     # iOS libraries consists of two exclusive parts
     # 1> An autotools library
@@ -146,7 +155,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
             if ra not in KnownEabis:
                 ARLog('Error : requested arch %(ra)s is not available for target iOS' % locals())
                 ARLog('  Avaiable archs : %(KnownEabis)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
     if not ValidArchs:
         ValidArchs = KnownArchs
 
@@ -171,7 +180,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
         # This leads to link issues for programs.
         forcedMalloc = ARSetEnvIfEmpty('ac_cv_func_malloc_0_nonnull', 'yes')
         forcedRealloc = ARSetEnvIfEmpty('ac_cv_func_realloc_0_nonnull', 'yes')
-        pool = Pool(processes=len(ValidArchs))
+        pool = Common_StartBuildConfigureLibraryPool(len(ValidArchs))
         poolResults = []
         retStatus = True
         bLock = Manager().Lock()
@@ -190,13 +199,13 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
                 Sysroot = iOSSDKRoot + Subdirs[-1]
             else:
                 ARLog('Unable to find a suitable iOS SDK for %(platform)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
             SdkVersionMatch = re.search(r'[0-9]*\.[0-9]*', Subdirs[-1])
             if SdkVersionMatch:
                 SdkVersion = SdkVersionMatch.group(0)
             else:
                 ARLog('Unable to find a suitable iOS SDK for %(platform)s' % locals())
-                return EndDumpArgs(res=False, **args)
+                return False
             SdkLower = platform.lower()
             Compiler = iOS_getXCRunExec('clang', SdkLower)
             Ar = iOS_getXCRunExec('ar', SdkLower)
@@ -258,7 +267,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
             ASFLAGSString = ASFLAGSString + '"'
             ExtraConfFlags = ['--host=arm-apple',
                               '--disable-shared',
-                              '--libdir=%(ArchLibDir)s' % locals(),
+                              '--libdir=' + ARQuoteArg(ArchLibDir),
                               'CC=%(Compiler)s' % locals(),
                               'OBJC=%(Compiler)s' % locals(),
                               'CCAS=%(Compiler)s' % locals(),
@@ -272,7 +281,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
             block_MakePostProcess = iOS_MakePostProcessCb(lib, BuiltLibs, sslLibs, cryptoLibs, Strip, ArchLibDir)
             
             if isMp:
-                poolRes = pool.apply_async(Common_BuildConfigureLibrary,
+                poolRes = pool.apply_async(Common_BuildConfigureLibraryJob,
                                            args=(target, lib,),
                                            kwds={'extraArgs':ExtraConfFlags,
                                                  'clean':clean,
@@ -285,16 +294,19 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
                                                  'makeLock':mLock,
                                                  'isMp':isMp,},
                                            callback=block_MakePostProcess)
-                poolResults.append(poolRes)
+                poolResults.append((arch, poolRes))
             else:
                 retStatus = Common_BuildConfigureLibrary(target, lib, extraArgs=ExtraConfFlags, clean=clean, debug=debug, confdirSuffix=arch, noSharedObjects=True, inhouse=inhouse, bootstrapLock=bLock, configureLock=cLock, makeLock=mLock, isMp=False)
                 block_MakePostProcess((retStatus, lib))
 
         if isMp:
-            for p in poolResults:
-                (p_res, p_updatedlib) = p.get()
-                if not p_res:
-                    retStatus = False
+            # The pool workers take their own jobserver token
+            ARJobServerRelease()
+            (p_res, p_updatedlibs) = Common_WaitBuildConfigureLibraryJobs(pool, poolResults, target, lib, debug)
+            if not p_res:
+                retStatus = False
+            ARJobServerAcquire()
+        Common_CloseBuildConfigureLibraryPool(pool)
 
         # Remove any added export
         if forcedMalloc:
@@ -302,7 +314,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
         if forcedRealloc:
             ARUnsetEnv('ac_cv_func_realloc_0_nonnull')
         if not retStatus:
-            return EndDumpArgs(res=False, **args)
+            return False
         
         res = True
         if not clean:
@@ -314,15 +326,15 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
             if (lib.name == 'libressl'):
                 lipoSsl = '%(OutputDir)s/libssl.a' % locals()
                 cryptoSsl = '%(OutputDir)s/libcrypto.a' % locals()
-                ARExecute('lipo ' + ARListAsBashArg(sslLibs) + ' -create -output ' + lipoSsl)
-                ARExecute('lipo ' + ARListAsBashArg(cryptoLibs) + ' -create -output ' + cryptoSsl)
+                ARExecute(['lipo'] + sslLibs + ['-create', '-output', lipoSsl])
+                ARExecute(['lipo'] + cryptoLibs + ['-create', '-output', cryptoSsl])
 
             OutputLibrary = '%(OutputDir)s/%(libPrefix)s%(lib)s.a' % locals()
             if debug:
                 OutputLibrary = '%(OutputDir)s/%(libPrefix)s%(lib)s_dbg.a' % locals()
             if not os.path.exists(OutputDir):
                 os.makedirs(OutputDir)
-            res = ARExecute('lipo ' + ARListAsBashArg(BuiltLibs) + ' -create -output ' + OutputLibrary)
+            res = ARExecute(['lipo'] + BuiltLibs + ['-create', '-output', OutputLibrary])
             # Create framework
             FinalFramework = Framework
             if debug:
@@ -338,6 +350,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
             else:
                 shutil.copytree('%(InstallDir)s/include/%(libIncDirPrefix)s%(lib)s' % locals(), FrameworkHeaders)
             shutil.copyfile(OutputLibrary, FrameworkLib)
+            Outputs.append(OutputLibrary)
 
     elif iOS_HasXcodeProject(lib):
         res = Darwin_RunXcodeBuild(target, lib, iOS_GetXcodeProject(lib), ValidArchs, debug, clean)
@@ -348,5 +361,7 @@ def iOS_BuildLibrary(target, lib, clean=False, debug=False, nodeps=False, inhous
 
     if res:
         target.addBuiltLibrary(lib)
+        if not clean:
+            Common_RecordLibraryState(target, lib, archs, variant, Outputs)
 
-    return EndDumpArgs(res, **args)
+    return res
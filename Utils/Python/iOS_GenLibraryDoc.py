@@ -31,10 +31,8 @@
 from ARFuncs import *
 from Common_GenAutotoolsLibraryDoc import *
 
+@ARTraced
 def iOS_GenLibraryDoc(target, lib, clean=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
     onlyC = True
 
     subdirs = ['iOS', 'Darwin']
@@ -46,5 +44,5 @@ def iOS_GenLibraryDoc(target, lib, clean=False):
 
     res = Common_GenAutotoolsLibraryDoc(target, lib, clean, subdirsToInclude=subdirs, onlyC=onlyC)
 
-    return EndDumpArgs(res, **args)
+    return res
    
@@ -35,15 +35,17 @@ from Common_HandlePrebuiltDep import *
 from ARFuncs import *
 
 
-def iOS_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=None, clean=False, debug=False):
-    args = dict(locals())
-    StartDumpArgs(**args)
-
-    Common_HandlePrebuiltDep(target, pb, forcedOutputDir=forcedOutputDir, outputSuffixes=outputSuffixes)
+@ARTraced
+def iOS_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=None, clean=False, debug=False, lib=None):
+    Common_HandlePrebuiltDep(target, pb, forcedOutputDir=forcedOutputDir, outputSuffixes=outputSuffixes, lib=lib)
 
     res = True
 
-    if not pb.isAvailableForTarget(target):
+    if lib is not None:
+        available = lib.isPrebuiltDepAvailableForTarget(pb, target)
+    else:
+        available = pb.isAvailableForTarget(target)
+    if not available:
         ARLog('Prebuilt library %(pb)s does not exists for target %(target)s' % locals())
     else:
         Type = pb.type
@@ -87,4 +89,4 @@ def iOS_HandlePrebuiltDep(target, pb, forcedOutputDir=None, outputSuffixes=None,
             ARLog('Do not know how to handle prebuilts of type %(Type)s in iOS' % locals())
             res = False
 
-    return EndDumpArgs(res, **args)
+    return res
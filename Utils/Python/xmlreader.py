@@ -28,7 +28,11 @@
     OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
     SUCH DAMAGE.
 '''
-from xml.dom.minidom import parseString
+try:
+    # C implementation of python 2 (python 3 always uses it)
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
 import sys
 import re
 from ARFuncs import *
@@ -37,22 +41,68 @@ if sys.version_info < (3,):
 else:
     from urllib.parse import urlparse
 import posixpath
+import hashlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+#
+# Name indexed list storage
+#
+
+class ARNamedList:
+    "List of named objects, in insertion order, indexed by name"
+    def __init__(self):
+        self.list = []
+        self.byName = {}
+    def containsName(self, name):
+        return name in self.byName
+    def containsObject(self, obj):
+        return self.byName.get(obj.name) is obj
+    def append(self, obj):
+        self.list.append(obj)
+        # Lookups by name return the first object added with that name
+        if not obj.name in self.byName:
+            self.byName[obj.name] = obj
+    def getByName(self, name):
+        return self.byName.get(name)
+
+#
+# Model objects
+#
+# There is one object per repo, target, prebuilt, library and binary of the
+# manifests, all kept for the whole build and pickled into every worker
+# process : they use __slots__, interned names, and tuples for the
+# collections which are only filled while parsing (an empty tuple is shared
+# by all the objects).
+#
+
+class ARModelObject(object):
+    "Base of the model objects, pickled as the tuple of their slots"
+    __slots__ = ()
+    def __getstate__(self):
+        return tuple([ getattr(self, name) for name in self.__slots__ ])
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
 
 #
 # Repo object definition
 #
 
-class ARRepo:
+class ARRepo(ARModelObject):
     "Represent a repo of the ARSDK 3"
+    __slots__ = ('name', 'rev', 'ext', 'extra', 'forceBaseUrl', 'path', 'patches', 'additionnalCommands')
     def __init__(self, reponame, revision="master", isExternal=False, isExtraRepo=False):
-        self.name = reponame
+        self.name = ARIntern(reponame)
         self.rev = revision
         self.ext = isExternal
         self.extra = isExtraRepo
         self.forceBaseUrl = False
         self.path = None
-        self.patches = []
-        self.additionnalCommands = []
+        self.patches = ()
+        self.additionnalCommands = ()
     def setForceBaseUrl(self):
         self.forceBaseUrl = True
     def getDir(self):
@@ -66,9 +116,9 @@ class ARRepo:
             return ARPathFromHere('../%(foldername)s' % locals())
     def addPatchFile(self, patchFile):
         if not patchFile in self.patches:
-            self.patches.append(patchFile)
+            self.patches = self.patches + (patchFile,)
     def addCommand(self, command):
-        self.additionnalCommands.append (command)
+        self.additionnalCommands = self.additionnalCommands + (command,)
     def setPath(self, path):
         self.path = path
     def describe(self, level=0):
@@ -90,19 +140,20 @@ class ARRepo:
 # Webfile object definition
 #
 
-class ARWebfile:
+class ARWebfile(ARModelObject):
     "Represent a file that must be downloaded from the web"
+    __slots__ = ('name', 'url', 'storePath', 'additionnalCommands', 'patches')
     def __init__(self, url, storePath):
-        self.name = posixpath.basename(urlparse(url).path)
+        self.name = ARIntern(posixpath.basename(urlparse(url).path))
         self.url = url
         self.storePath = ARPathFromHere(storePath)
-        self.additionnalCommands = []
-        self.patches = []
+        self.additionnalCommands = ()
+        self.patches = ()
     def addPatchFile(self, patchFile):
         if not patchFile in self.patches:
-            self.patches.append(patchFile)
+            self.patches = self.patches + (patchFile,)
     def addCommand(self, command):
-        self.additionnalCommands.append (command)
+        self.additionnalCommands = self.additionnalCommands + (command,)
     def describe(self, level=0):
         prefix = ''
         for i in range(0, level):
@@ -117,48 +168,39 @@ class ARWebfile:
 # Repos list storage
 #
 
-class ARReposList:
+class ARReposList(ARNamedList):
     "List of repos for ARSDK 3"
     def __init__(self):
-        self.list = []
-        self.webfilesList = []
+        ARNamedList.__init__(self)
+        self.webfiles = ARNamedList()
+        self.webfilesList = self.webfiles.list
     def contains(self, repo):
-        res = False
-        for trep in self.list:
-            if trep == repo:
-                res = True
-                break
-        return res
+        return self.containsObject(repo)
     def addRepo(self, repo):
         if self.contains(repo):
             ARPrint('Repo %(repo)s is already in list' % locals())
             EXIT(1)
-        self.list.append(repo)
+        self.append(repo)
     def getRepo(self, name, silent=False):
-        for rep in self.list:
-            if rep.name == name:
-                return rep
+        rep = self.getByName(name)
+        if rep is not None:
+            return rep
         if not silent:
             ARPrint('Repo %(name)s does not exist in list' % locals())
             EXIT(1)
         else:
             raise Exception
     def containsWebfile(self, webfile):
-        res = False
-        for trep in self.webfilesList:
-            if trep == webfile:
-                res = True
-                break
-        return res
+        return self.webfiles.containsObject(webfile)
     def addWebfile(self, webfile):
         if self.containsWebfile(webfile):
             ARPrint('Webfile %(webfile)s is already in list' % locals())
             EXIT(1)
-        self.webfilesList.append(webfile)
+        self.webfiles.append(webfile)
     def getWebfile(self, name, silent=False):
-        for rep in self.webfilesList:
-            if rep.name == name:
-                return rep
+        rep = self.webfiles.getByName(name)
+        if rep is not None:
+            return rep
         if not silent:
             ARPrint('Webfile %(name)s does not exist in list' % locals())
             EXIT(1)
@@ -178,16 +220,20 @@ class ARReposList:
 # Target object definition
 #
 
-class ARTarget:
+class ARTarget(ARModelObject):
     "Represent a target of the ARSDK 3"
+    __slots__ = ('name', 'alreadyBuiltLibraries', 'triedToBuildLibraries', 'alreadyBuiltBinaries', 'triedToBuildBinaries',
+                 'postbuildScripts', 'failed', 'buildState', 'soext')
     def __init__(self, targetname, soext):
-        self.name = targetname
+        self.name = ARIntern(targetname)
         self.alreadyBuiltLibraries = []
         self.triedToBuildLibraries = []
         self.alreadyBuiltBinaries = []
         self.triedToBuildBinaries = []
         self.postbuildScripts = []
         self.failed = False
+        # Persistent build state (see Common_BuildState), opened on demand
+        self.buildState = None
         if soext == '__HOST__':
             platform = sys.platform
             plow = platform.lower()
@@ -209,8 +255,12 @@ class ARTarget:
     def addBuiltLibrary(self, lib):
         if not lib.name in self.alreadyBuiltLibraries:
             self.alreadyBuiltLibraries.append(lib.name)
-    def needsToBuild(self, lib):
-        return not self.hasAlreadyBuilt(lib)
+    def needsToBuild(self, lib, arch='', variant='', fingerprint=None):
+        if self.hasAlreadyBuilt(lib):
+            return False
+        if self.buildState is None or fingerprint is None:
+            return True
+        return not self.buildState.isUpToDate(lib.name, arch, variant, fingerprint)
     def hasAlreadyBuilt(self, lib):
         return lib.name in self.alreadyBuiltLibraries
     def addTriedBinary(self, lib):
@@ -241,26 +291,19 @@ class ARTarget:
 # Targets list storage
 #
 
-class ARTargetsList:
+class ARTargetsList(ARNamedList):
     "List of targets for ARSDK 3"
-    def __init__(self):
-        self.list = []
     def contains(self, target):
-        res = False
-        for ttar in self.list:
-            if ttar == target:
-                res = True
-                break
-        return res
+        return self.containsObject(target)
     def addTarget(self, target):
         if self.contains(target):
             ARPrint('Target %(target)s is already in list' % locals())
             raise Exception
-        self.list.append(target)
+        self.append(target)
     def getTarget(self, name, silent=False):
-        for tar in self.list:
-            if tar.name == name:
-                return tar
+        tar = self.getByName(name)
+        if tar is not None:
+            return tar
         if not silent:
             ARPrint('Target %(name)s does not exist in list' % locals())
             EXIT(1)
@@ -276,19 +319,20 @@ class ARTargetsList:
 # Prebuilt object definition
 #
 
-class ARPrebuilt:
+class ARPrebuilt(ARModelObject):
     "Represent a prebuilt library for the ARSDK 3"
+    __slots__ = ('name', 'path', 'type', 'targets')
     def __init__(self, name, fileType, path):
-        self.name = name
+        self.name = ARIntern(name)
         if path.startswith('/'):
             self.path = path
         else:
             self.path = ARPathFromHere(path)
-        self.type = fileType
-        self.targets = []
+        self.type = ARIntern(fileType)
+        self.targets = ()
     def addTarget(self, target):
         if not target in self.targets:
-            self.targets.append(target)
+            self.targets = self.targets + (target,)
     def isAvailableForTarget(self, target):
         ret = False
         if not self.targets:
@@ -299,19 +343,6 @@ class ARPrebuilt:
                     ret = True
                     break
         return ret
-    def ARCopy(self, newTargets):
-        ret = ARPrebuilt(self.name, self.type, self.path)
-        if not newTargets:
-            for t in self.targets:
-                ret.addTarget(t)
-        else:
-            for t in newTargets:
-                if self.isAvailableForTarget(t):
-                    ret.addTarget(t)
-                else:
-                    ARPrint('Target %(t)s is not a valid target for %(ret)s' % locals())
-                    EXIT(1)
-        return ret
     def describe(self, level=0):
         offset = len('ARPrebuilt > ')
         prefix = ''
@@ -331,30 +362,21 @@ class ARPrebuilt:
 # Prebuilt list storage
 #
 
-class ARPrebuiltList:
+class ARPrebuiltList(ARNamedList):
     "List of prebuilt libraries for ARSDK 3"
-    def __init__(self):
-        self.list = []
     def contains(self, pb):
         return self.containsName(pb.name)
-    def containsName(self, name):
-        res = False
-        for tpb in self.list:
-            if tpb.name == name:
-                res = True
-                break
-        return res
     def addPrebuilt(self, pb):
         if self.contains(pb):
             ARPrint('Prebuilt library %(pb)s is already in list' % locals())
             EXIT(1)
-        self.list.append(pb)
+        self.append(pb)
     def getPrebuilt(self, name, silent=False):
-        for pb in self.list:
-            if pb.name == name:
-                return pb
+        pb = self.getByName(name)
+        if pb is not None:
+            return pb
         if not silent:
-            ARPrint('Prebuilt library %(pb)s does not exists in list' % locals())
+            ARPrint('Prebuilt library %(name)s does not exists in list' % locals())
             EXIT(1)
         else:
             raise Exception
@@ -364,20 +386,86 @@ class ARPrebuiltList:
             pb.describe()
         ARPrint('}')
 
+#
+# Dependencies
+#
+# Libraries, binaries and prebuilts are single shared objects : a dependency
+# is an edge to one of them, which may be restricted to some targets
+# ('validdeptar' tags). The targets of the restricted edges are kept by the
+# depending object, in a name -> targets dict (None until there is one).
+#
+
+def isTargetInList(targets, target):
+    for tar in targets:
+        if tar.name == target.name:
+            return True
+    return False
+
+# Record the targets of an edge to the dependency name in depTargets, and
+# return the updated dict. An unrestricted edge to an already known
+# dependency wins over the restricted ones
+def addDepTargets(depTargets, name, targets, isNew):
+    if isNew:
+        if targets:
+            if depTargets is None:
+                depTargets = {}
+            depTargets[name] = tuple(targets)
+    elif depTargets is not None and name in depTargets:
+        if not targets:
+            del depTargets[name]
+        else:
+            known = depTargets[name]
+            depTargets[name] = known + tuple([ t for t in targets if not t in known ])
+    return depTargets
+
+# Is dep available for target through an edge of depTargets
+def isDepEdgeAvailableForTarget(depTargets, dep, target):
+    if depTargets is not None and dep.name in depTargets:
+        return isTargetInList(depTargets[dep.name], target)
+    return dep.isAvailableForTarget(target)
+
+# Check that targets are valid for a dependency restricted to them : they
+# must be valid for dep, and for all the dependencies below it
+def checkDepTargets(dep, targets, checked=None):
+    if checked is None:
+        checked = set()
+    for t in targets:
+        if not dep.isAvailableForTarget(t):
+            ARPrint('Target %(t)s is not a valid target for %(dep)s' % locals())
+            EXIT(1)
+    if dep.name in checked or isinstance(dep, ARPrebuilt):
+        return
+    checked.add(dep.name)
+    for subdep in dep.deps:
+        for t in targets:
+            if not dep.isDepAvailableForTarget(subdep, t):
+                ARPrint('Target %(t)s is not a valid target for %(subdep)s' % locals())
+                EXIT(1)
+        checkDepTargets(subdep, targets, checked)
+    for pb in dep.pbdeps:
+        for t in targets:
+            if not dep.isPrebuiltDepAvailableForTarget(pb, t):
+                ARPrint('Target %(t)s is not a valid target for %(pb)s' % locals())
+                EXIT(1)
+
 #
 # Library object definition
 #
 
-class ARLibrary:
+class ARLibrary(ARModelObject):
     "Represent a library of the ARSDK 3"
+    __slots__ = ('name', 'deps', 'depTargets', 'pbdeps', 'pbdepTargets', 'ext', 'extraConfFlags', 'confdeps', 'targets',
+                 'soLibs', 'hasBaseSoLibs', 'customBuild', 'relativePath', 'path')
     def __init__(self, libname, isExternal=False, extPath="", customBuild=None):
-        self.name = libname
-        self.deps = []
-        self.pbdeps = []
+        self.name = ARIntern(libname)
+        self.deps = ()
+        self.depTargets = None
+        self.pbdeps = ()
+        self.pbdepTargets = None
         self.ext = isExternal
-        self.extraConfFlags = []
-        self.confdeps = []
-        self.targets = []
+        self.extraConfFlags = ()
+        self.confdeps = ()
+        self.targets = ()
         self.soLibs = []
         self.hasBaseSoLibs = False
         self.customBuild = customBuild
@@ -388,21 +476,33 @@ class ARLibrary:
         self.path = ARPathFromHere(self.relativePath)
     def addConfDep(self, confdep):
         if not confdep in self.confdeps:
-            self.confdeps.append(os.path.join(self.path,confdep))
-    def addDep(self, dep):
+            self.confdeps = self.confdeps + (os.path.join(self.path,confdep),)
+    def addDep(self, dep, targets=()):
         if dep.name == self.name:
             ARPrint('Cyclical dependancy in lib' + self.name)
             EXIT(1)
-        if not dep in self.deps:
-            self.deps.append(dep)
-    def addPrebuiltDep(self, dep):
-        if not dep in self.pbdeps:
-            self.pbdeps.append(dep)
+        if targets:
+            checkDepTargets(dep, targets)
+        isNew = not dep in self.deps
+        if isNew:
+            self.deps = self.deps + (dep,)
+        self.depTargets = addDepTargets(self.depTargets, dep.name, targets, isNew)
+    def isDepAvailableForTarget(self, dep, target):
+        return isDepEdgeAvailableForTarget(self.depTargets, dep, target)
+    def addPrebuiltDep(self, dep, targets=()):
+        if targets:
+            checkDepTargets(dep, targets)
+        isNew = not dep in self.pbdeps
+        if isNew:
+            self.pbdeps = self.pbdeps + (dep,)
+        self.pbdepTargets = addDepTargets(self.pbdepTargets, dep.name, targets, isNew)
+    def isPrebuiltDepAvailableForTarget(self, pb, target):
+        return isDepEdgeAvailableForTarget(self.pbdepTargets, pb, target)
     def addExtraConfFlag(self, flag):
-        self.extraConfFlags.append(flag)
+        self.extraConfFlags = self.extraConfFlags + (flag,)
     def addTarget(self, target):
         if not target in self.targets:
-            self.targets.append(target)
+            self.targets = self.targets + (target,)
     def isAvailableForTarget(self, target):
         ret = False
         if not self.targets:
@@ -415,32 +515,10 @@ class ARLibrary:
         return ret
     def runOnAllDeps(self, target, func, firstLevel=True, **kwargs):
         for dep in self.deps:
-            if dep.isAvailableForTarget(target):
+            if self.isDepAvailableForTarget(dep, target):
                 dep.runOnAllDeps(target, func, False, **kwargs)
         if not firstLevel:
             func(target, self, **kwargs)
-    def ARCopy(self, newTargets):
-        ret = ARLibrary(self.name, self.ext, self.relativePath, self.customBuild)
-        for cd in self.confdeps:
-            ret.addConfDep(cd)
-        for d in self.deps:
-            ret.addDep(d.ARCopy(newTargets))
-        for pb in self.pbdeps:
-            ret.addPrebuiltDep(pb.ARCopy(newTargets))
-        for ecf in self.extraConfFlags:
-            ret.addExtraConfFlag(ecf)
-        ret.soLibs = self.soLibs
-        if not newTargets:
-            for t in self.targets:
-                ret.addTarget(t)
-        else:
-            for t in newTargets:
-                if self.isAvailableForTarget(t):
-                    ret.addTarget(t)
-                else:
-                    ARPrint('Target %(t)s is not a valid target for %(ret)s' % locals())
-                    EXIT(1)
-        return ret
     def describe(self, level=0):
         offset = len('ARLibrary > ')
         prefix = ''
@@ -479,28 +557,19 @@ class ARLibrary:
 # Libraries list storage
 #
 
-class ARLibrariesList:
+class ARLibrariesList(ARNamedList):
     "List of libraries for ARSDK 3"
-    def __init__(self):
-        self.list = []
     def contains(self, lib):
         return self.containsName(lib.name)
-    def containsName(self, name):
-        res = False
-        for tlib in self.list:
-            if tlib.name == name:
-                res = True
-                break
-        return res
     def addLib(self, lib):
         if self.contains(lib):
             ARPrint('Library lib%(lib)s is already in list' % locals())
             EXIT(1)
-        self.list.append(lib)
+        self.append(lib)
     def getLib(self, name, silent=False):
-        for lib in self.list:
-            if lib.name == name:
-                return lib
+        lib = self.getByName(name)
+        if lib is not None:
+            return lib
         if not silent:
             ARPrint('Library lib%(name)s does not exist in list' % locals())
             EXIT(1)
@@ -519,28 +588,38 @@ class ARLibrariesList:
 # Binary object definition
 #
 
-class ARBinary:
+class ARBinary(ARModelObject):
     "Represent a binary of the ARSDK 3"
+    __slots__ = ('name', 'deps', 'depTargets', 'pbdeps', 'targets', 'extraConfFlags', 'confdeps', 'relativePath', 'path',
+                 'ext', 'soLibs', 'customBuild')
     def __init__(self, binname, builddir):
-        self.name = binname
-        self.deps = []
-        self.targets = []
-        self.extraConfFlags = []
-        self.confdeps = []
+        self.name = ARIntern(binname)
+        self.deps = ()
+        self.depTargets = None
+        self.pbdeps = ()
+        self.targets = ()
+        self.extraConfFlags = ()
+        self.confdeps = ()
         self.relativePath = builddir
         self.path = ARPathFromHere(builddir)
         self.ext = False
         self.soLibs = []
         self.customBuild = None
         
-    def addDep(self, dep):
-        if not dep in self.deps:
-            self.deps.append(dep)
+    def addDep(self, dep, targets=()):
+        if targets:
+            checkDepTargets(dep, targets)
+        isNew = not dep in self.deps
+        if isNew:
+            self.deps = self.deps + (dep,)
+        self.depTargets = addDepTargets(self.depTargets, dep.name, targets, isNew)
+    def isDepAvailableForTarget(self, dep, target):
+        return isDepEdgeAvailableForTarget(self.depTargets, dep, target)
     def addExtraConfFlag(self, flag):
-        self.extraConfFlags.append(flag)
+        self.extraConfFlags = self.extraConfFlags + (flag,)
     def addTarget(self, target):
         if not target in self.targets:
-            self.targets.append(target)
+            self.targets = self.targets + (target,)
     def isAvailableForTarget(self, target):
         ret = False
         if not self.targets:
@@ -553,28 +632,10 @@ class ARBinary:
         return ret
     def runOnAllDeps(self, target, func, firstLevel=True, **kwargs):
         for dep in self.deps:
-            if dep.isAvailableForTarget(target):
+            if self.isDepAvailableForTarget(dep, target):
                 dep.runOnAllDeps(target, func, False, **kwargs)
         if not firstLevel:
             func(target, self, **kwargs)
-    def ARCopy(self, newTargets):
-        ret = ARBinary(self.name, self.relativePath)
-        for d in self.deps:
-            ret.addDep(d.ARCopy())
-        for ecf in self.extraConfFlags:
-            ret.addExtraConfFlag(ecf)
-        ret.soLibs = self.soLibs
-        if not newTargets:
-            for t in self.targets:
-                ret.addTarget(t)
-        else:
-            for t in newTargets:
-                if self.isAvailableForTarget(t):
-                    ret.addTarget(t)
-                else:
-                    ARPrint('Target %(t)s is not a valid target for %(ret)s' % locals())
-                    EXIT(1)
-        return ret
     def describe(self, level=0):
         offset = len('ARBinary > ')
         prefix = ''
@@ -608,28 +669,19 @@ class ARBinary:
 # Binaries list storage
 #
 
-class ARBinariesList:
+class ARBinariesList(ARNamedList):
     "List of binaries for ARSDK 3"
-    def __init__(self):
-        self.list = []
     def contains(self, bin):
         return self.containsName(bin.name)
-    def containsName(self, name):
-        res = False
-        for tbin in self.list:
-            if tbin.name == name:
-                res = True
-                break
-        return res
     def addBin(self, bin):
         if self.contains(bin):
             ARPrint('Binary %(bin)s is already in list' % locals())
             EXIT(1)
-        self.list.append(bin)
+        self.append(bin)
     def getBin(self, name, silent=False):
-        for bin in self.list:
-            if bin.name == name:
-                return bin
+        bin = self.getByName(name)
+        if bin is not None:
+            return bin
         if not silent:
             ARPrint('Binary %(name)s does not exist in list' % locals())
             EXIT(1)
@@ -648,6 +700,24 @@ class ARBinariesList:
 # Parsers
 #
 
+# Read a xml file in a single streaming pass, and return its elements with
+# the given tags (at any depth), in document order, as a tag -> list dict
+def parseXmlElements(path, tags):
+    elements = {}
+    for tag in tags:
+        elements[tag] = []
+    for event, elem in ElementTree.iterparse(path, events=('end',)):
+        if elem.tag in elements:
+            elements[elem.tag].append(elem)
+    return elements
+
+# Targets of the 'validdeptar' children of a dep element
+def parseDepTargets(xdep, targets):
+    ltargets = []
+    for xtar in xdep.iter('validdeptar'):
+        ltargets.append(targets.getTarget(xtar.attrib['name']))
+    return ltargets
+
 def parseRepoXmlFile(paths):
 
     repos = ARReposList()
@@ -655,67 +725,44 @@ def parseRepoXmlFile(paths):
     for root_path in paths:
         path = '%(root_path)s/repos.xml' % locals()
 
-        xfile=open(path, 'r')
-        xdata=xfile.read()
-        xfile.close()
-
-        xmldata = parseString(xdata)
-
-        xrepos = xmldata.getElementsByTagName('repo')
-        for xrepo in xrepos:
-            repo = ARRepo(xrepo.attributes['name'].nodeValue, xrepo.attributes['rev'].nodeValue)
-            try:
-                repo.setPath(xrepo.attributes['path'].nodeValue)
-            except:
-                pass
-            try:
-                if xrepo.attributes['forceBaseUrl'].nodeValue == 'TRUE':
-                    repo.setForceBaseUrl()
-            except:
-                pass
-            xpatches = xrepo.getElementsByTagName('patchFile')
-            for xpatch in xpatches:
-                repo.addPatchFile(xpatch.attributes['path'].nodeValue)
-            xcmds = xrepo.getElementsByTagName('postDownloadAction')
-            for xcmd in xcmds:
-                repo.addCommand(xcmd.attributes['command'].nodeValue)
+        xmldata = parseXmlElements(path, ('repo', 'extrarepo', 'extrepo', 'webfile'))
+
+        for xrepo in xmldata['repo']:
+            repo = ARRepo(xrepo.attrib['name'], xrepo.attrib['rev'])
+            if xrepo.get('path') is not None:
+                repo.setPath(xrepo.get('path'))
+            if xrepo.get('forceBaseUrl') == 'TRUE':
+                repo.setForceBaseUrl()
+            for xpatch in xrepo.iter('patchFile'):
+                repo.addPatchFile(xpatch.attrib['path'])
+            for xcmd in xrepo.iter('postDownloadAction'):
+                repo.addCommand(xcmd.attrib['command'])
             repos.addRepo(repo)
 
-        xrepos = xmldata.getElementsByTagName('extrarepo')
-        for xrepo in xrepos:
-            repo = ARRepo(xrepo.attributes['url'].nodeValue, xrepo.attributes['rev'].nodeValue, isExternal=True, isExtraRepo=True)
-            try:
-                repo.setPath(xrepo.attributes['path'].nodeValue)
-            except:
-                pass
-            xpatches = xrepo.getElementsByTagName('patchFile')
-            for xpatch in xpatches:
-                repo.addPatchFile(xpatch.attributes['path'].nodeValue)
-            xcmds = xrepo.getElementsByTagName('postDownloadAction')
-            for xcmd in xcmds:
-                repo.addCommand(xcmd.attributes['command'].nodeValue)
+        for xrepo in xmldata['extrarepo']:
+            repo = ARRepo(xrepo.attrib['url'], xrepo.attrib['rev'], isExternal=True, isExtraRepo=True)
+            if xrepo.get('path') is not None:
+                repo.setPath(xrepo.get('path'))
+            for xpatch in xrepo.iter('patchFile'):
+                repo.addPatchFile(xpatch.attrib['path'])
+            for xcmd in xrepo.iter('postDownloadAction'):
+                repo.addCommand(xcmd.attrib['command'])
             repos.addRepo(repo)
 
-        xrepos = xmldata.getElementsByTagName('extrepo')
-        for xrepo in xrepos:
-            repo = ARRepo(xrepo.attributes['url'].nodeValue, xrepo.attributes['rev'].nodeValue, isExternal=True)
-            xpatches = xrepo.getElementsByTagName('patchFile')
-            for xpatch in xpatches:
-                repo.addPatchFile(xpatch.attributes['path'].nodeValue)
-            xcmds = xrepo.getElementsByTagName('postDownloadAction')
-            for xcmd in xcmds:
-                repo.addCommand(xcmd.attributes['command'].nodeValue)
+        for xrepo in xmldata['extrepo']:
+            repo = ARRepo(xrepo.attrib['url'], xrepo.attrib['rev'], isExternal=True)
+            for xpatch in xrepo.iter('patchFile'):
+                repo.addPatchFile(xpatch.attrib['path'])
+            for xcmd in xrepo.iter('postDownloadAction'):
+                repo.addCommand(xcmd.attrib['command'])
             repos.addRepo(repo)
 
-        xrepos = xmldata.getElementsByTagName('webfile')
-        for xrepo in xrepos:
-            webfile = ARWebfile(xrepo.attributes['url'].nodeValue, xrepo.attributes['storePath'].nodeValue)
-            xpatches = xrepo.getElementsByTagName('patchFile')
-            for xpatch in xpatches:
-                webfile.addPatchFile(xpatch.attributes['path'].nodeValue)
-            xcmds = xrepo.getElementsByTagName('postDownloadAction')
-            for xcmd in xcmds:
-                webfile.addCommand(xcmd.attributes['command'].nodeValue)
+        for xrepo in xmldata['webfile']:
+            webfile = ARWebfile(xrepo.attrib['url'], xrepo.attrib['storePath'])
+            for xpatch in xrepo.iter('patchFile'):
+                webfile.addPatchFile(xpatch.attrib['path'])
+            for xcmd in xrepo.iter('postDownloadAction'):
+                webfile.addCommand(xcmd.attrib['command'])
             repos.addWebfile(webfile)
 
     return repos
@@ -727,23 +774,16 @@ def parseTargetsXmlFile(paths):
     for root_path in paths:
         path = '%(root_path)s/targets.xml' % locals()
 
-        xfile=open(path, 'r')
-        xdata=xfile.read()
-        xfile.close()
-
-        xmldata = parseString(xdata)
+        xmldata = parseXmlElements(path, ('target',))
 
-        xtargets = xmldata.getElementsByTagName('target')
-        for xtarget in xtargets:
-            needToAdd = True
-            try:
-                target = targets.getTarget(xtarget.attributes['name'].nodeValue, silent=True)
-                needToAdd = False
-            except:
-                target = ARTarget(xtarget.attributes['name'].nodeValue, xtarget.attributes['soext'].nodeValue)
-            xscrs = xtarget.getElementsByTagName('postbuildscript')
-            for xscr in xscrs:
-                target.addPostbuildScript(os.path.join(root_path, xscr.attributes['name'].nodeValue), xscr.attributes['name'].nodeValue)
+        for xtarget in xmldata['target']:
+            needToAdd = False
+            target = targets.getByName(xtarget.attrib['name'])
+            if target is None:
+                target = ARTarget(xtarget.attrib['name'], xtarget.attrib['soext'])
+                needToAdd = True
+            for xscr in xtarget.iter('postbuildscript'):
+                target.addPostbuildScript(os.path.join(root_path, xscr.attrib['name']), xscr.attrib['name'])
 
             if needToAdd:
                 targets.addTarget(target)
@@ -757,24 +797,16 @@ def parsePrebuiltXmlFile(paths, targets):
     for root_path in paths:
         path = '%(root_path)s/prebuilt.xml' % locals()
 
-        xfile=open(path, 'r')
-        xdata=xfile.read()
-        xfile.close()
-
-        xmldata = parseString(xdata)
+        xmldata = parseXmlElements(path, ('prebuilt',))
 
-    
-        xprebuilts = xmldata.getElementsByTagName('prebuilt')
-        for xpb in xprebuilts:
-            needToAdd = True
-            try:
-                pb = prebuilts.getPrebuilt(xpb.attributes['name'].nodeValue, silent=True)
-                needToAdd = False
-            except:
-                pb = ARPrebuilt(xpb.attributes['name'].nodeValue, xpb.attributes['type'].nodeValue, xpb.attributes['path'].nodeValue)
-            xtars = xpb.getElementsByTagName('validtar')
-            for xtar in xtars:
-                pb.addTarget(targets.getTarget(xtar.attributes['name'].nodeValue))
+        for xpb in xmldata['prebuilt']:
+            needToAdd = False
+            pb = prebuilts.getByName(xpb.attrib['name'])
+            if pb is None:
+                pb = ARPrebuilt(xpb.attrib['name'], xpb.attrib['type'], xpb.attrib['path'])
+                needToAdd = True
+            for xtar in xpb.iter('validtar'):
+                pb.addTarget(targets.getTarget(xtar.attrib['name']))
             if needToAdd:
                 prebuilts.addPrebuilt(pb)
 
@@ -787,92 +819,55 @@ def parseLibraryXmlFile(paths, targets, prebuilts):
     for root_path in paths:
         path = '%(root_path)s/libraries.xml' % locals()
 
-        xfile=open(path, 'r')
-        xdata=xfile.read()
-        xfile.close()
-
-        xmldata = parseString(xdata)
-
-        xlibraries = xmldata.getElementsByTagName('extlib')
-        for xlib in xlibraries:
-            needToAdd = True
-            try:
-                lib = libraries.getLib(xlib.attributes['name'].nodeValue, silent=True)
-                needToAdd = False
-            except:
-                lib = ARLibrary(xlib.attributes['name'].nodeValue, isExternal=True, extPath=xlib.attributes['path'].nodeValue)
-            xdeps = xlib.getElementsByTagName('dep')
-            for xdep in xdeps:
-                ltargets = []
-                xtars = xdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                lib.addDep(libraries.getLib(xdep.attributes['name'].nodeValue).ARCopy(ltargets))
+        # All the extlib of a file are parsed before its lib
+        xmldata = parseXmlElements(path, ('extlib', 'lib'))
+
+        for xlib in xmldata['extlib']:
+            needToAdd = False
+            lib = libraries.getByName(xlib.attrib['name'])
+            if lib is None:
+                lib = ARLibrary(xlib.attrib['name'], isExternal=True, extPath=xlib.attrib['path'])
+                needToAdd = True
+            for xdep in xlib.iter('dep'):
+                lib.addDep(libraries.getLib(xdep.attrib['name']), parseDepTargets(xdep, targets))
             hasCustomBuild = False
-            if xlib.hasAttribute('customBuild') and xlib.attributes['customBuild'].nodeValue is not None:
-                lib.customBuild = xlib.attributes['customBuild'].nodeValue
+            if xlib.get('customBuild') is not None:
+                lib.customBuild = xlib.get('customBuild')
                 hasCustomBuild = True
-            xsofiles = xlib.getElementsByTagName('sofile')
+            xsofiles = list(xlib.iter('sofile'))
             if xsofiles and not hasCustomBuild:
                 ARPrint('You can not use sofile in a library without a customBuild script !')
                 raise OSError
             for xsofile in xsofiles:
-                lib.soLibs.append(xsofile.attributes['name'].nodeValue)
+                lib.soLibs.append(xsofile.attrib['name'])
                 lib.hasBaseSoLibs = True
-            xtargets = xlib.getElementsByTagName('validtar')
-            for xtarget in xtargets:
-                lib.addTarget(targets.getTarget(xtarget.attributes['name'].nodeValue))
-            xdeps = xlib.getElementsByTagName('dep')
-            for xdep in xdeps:
-                ltargets = []
-                xtars = xdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                lib.addDep(libraries.getLib(xdep.attributes['name'].nodeValue).ARCopy(ltargets))
-            xpbdeps = xlib.getElementsByTagName('prebuiltdep')
-            for xpbdep in xpbdeps:
-                ltargets = []
-                xtars = xpbdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                lib.addPrebuiltDep(prebuilts.getPrebuilt(xpbdep.attributes['name'].nodeValue).ARCopy(ltargets))
-            xflags = xlib.getElementsByTagName('extraConfigureFlag')
-            for xflag in xflags:
-                lib.addExtraConfFlag(xflag.attributes['value'].nodeValue)
+            for xtarget in xlib.iter('validtar'):
+                lib.addTarget(targets.getTarget(xtarget.attrib['name']))
+            for xdep in xlib.iter('dep'):
+                lib.addDep(libraries.getLib(xdep.attrib['name']), parseDepTargets(xdep, targets))
+            for xpbdep in xlib.iter('prebuiltdep'):
+                lib.addPrebuiltDep(prebuilts.getPrebuilt(xpbdep.attrib['name']), parseDepTargets(xpbdep, targets))
+            for xflag in xlib.iter('extraConfigureFlag'):
+                lib.addExtraConfFlag(xflag.attrib['value'])
             if needToAdd:
                 libraries.addLib(lib)
 
-        xlibraries = xmldata.getElementsByTagName('lib')
-        for xlib in xlibraries:
-            needToAdd = True
-            try:
-                lib = libraries.getLib(xlib.attributes['name'].nodeValue, silent=True)
-                needToAdd = False
-            except:
-                lib = ARLibrary(xlib.attributes['name'].nodeValue)
-            xtargets = xlib.getElementsByTagName('validtar')
-            for xtarget in xtargets:
-                lib.addTarget(targets.getTarget(xtarget.attributes['name'].nodeValue))
-            xdeps = xlib.getElementsByTagName('dep')
-            for xdep in xdeps:
-                ltargets = []
-                xtars = xdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                lib.addDep(libraries.getLib(xdep.attributes['name'].nodeValue).ARCopy(ltargets))
-            xpbdeps = xlib.getElementsByTagName('prebuiltdep')
-            for xpbdep in xpbdeps:
-                ltargets = []
-                xtars = xpbdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                lib.addPrebuiltDep(prebuilts.getPrebuilt(xpbdep.attributes['name'].nodeValue).ARCopy(ltargets))
-            xflags = xlib.getElementsByTagName('extraConfigureFlag')
-            for xflag in xflags:
-                lib.addExtraConfFlag(xflag.attributes['value'].nodeValue)
-            xcdeps = xlib.getElementsByTagName('configureDepFile')
-            for xcdep in xcdeps:
-                lib.addConfDep(xcdep.attributes['name'].nodeValue)
+        for xlib in xmldata['lib']:
+            needToAdd = False
+            lib = libraries.getByName(xlib.attrib['name'])
+            if lib is None:
+                lib = ARLibrary(xlib.attrib['name'])
+                needToAdd = True
+            for xtarget in xlib.iter('validtar'):
+                lib.addTarget(targets.getTarget(xtarget.attrib['name']))
+            for xdep in xlib.iter('dep'):
+                lib.addDep(libraries.getLib(xdep.attrib['name']), parseDepTargets(xdep, targets))
+            for xpbdep in xlib.iter('prebuiltdep'):
+                lib.addPrebuiltDep(prebuilts.getPrebuilt(xpbdep.attrib['name']), parseDepTargets(xpbdep, targets))
+            for xflag in xlib.iter('extraConfigureFlag'):
+                lib.addExtraConfFlag(xflag.attrib['value'])
+            for xcdep in xlib.iter('configureDepFile'):
+                lib.addConfDep(xcdep.attrib['name'])
             if needToAdd:
                 libraries.addLib(lib)
 
@@ -885,42 +880,103 @@ def parseBinariesXmlFile(paths, targets, libraries):
     for root_path in paths:
         path = '%(root_path)s/binaries.xml' % locals()
 
-        xfile=open(path, 'r')
-        xdata=xfile.read()
-        xfile.close()
-
-        xmldata = parseString(xdata)
-
-        xbinaries = xmldata.getElementsByTagName('binary')
-        for xbin in xbinaries:
-            needToAdd = True
-            try:
-                bin = binaries.getBin(xbin.attributes['name'].nodeValue, silent=True)
-                needToAdd = False
-            except:
-                bin = ARBinary(xbin.attributes['name'].nodeValue, xbin.attributes['pathToBuildDir'].nodeValue)
-            xtars = xbin.getElementsByTagName('validtar')
-            for xtar in xtars:
-                bin.addTarget(targets.getTarget(xtar.attributes['name'].nodeValue))
-            xdeps = xbin.getElementsByTagName('deplib')
-            for xdep in xdeps:
-                ltargets = []
-                xtars = xdep.getElementsByTagName('validdeptar')
-                for xtar in xtars:
-                    ltargets.append(targets.getTarget(xtar.attributes['name'].nodeValue))
-                bin.addDep(libraries.getLib(xdep.attributes['name'].nodeValue).ARCopy(ltargets))
-            xflags = xbin.getElementsByTagName('extraConfigureFlag')
-            for xflag in xflags:
-                bin.addExtraConfFlag(xflag.attributes['value'].nodeValue)
+        xmldata = parseXmlElements(path, ('binary',))
+
+        for xbin in xmldata['binary']:
+            needToAdd = False
+            bin = binaries.getByName(xbin.attrib['name'])
+            if bin is None:
+                bin = ARBinary(xbin.attrib['name'], xbin.attrib['pathToBuildDir'])
+                needToAdd = True
+            for xtar in xbin.iter('validtar'):
+                bin.addTarget(targets.getTarget(xtar.attrib['name']))
+            for xdep in xbin.iter('deplib'):
+                bin.addDep(libraries.getLib(xdep.attrib['name']), parseDepTargets(xdep, targets))
+            for xflag in xbin.iter('extraConfigureFlag'):
+                bin.addExtraConfFlag(xflag.attrib['value'])
             if needToAdd:
                 binaries.addBin(bin)
 
     return binaries
 
-def parseAll(paths):
+#
+# Parsed model cache
+#
+# The model built from the manifests of all the xml dirs is pickled, with a
+# key covering everything it depends on : the path, size, mtime and content
+# of every manifest, the location of the scripts (paths are made absolute
+# from there), the platform (host shared object extension), the python
+# version and this file itself
+#
+
+MANIFEST_FILES = [ 'repos.xml', 'targets.xml', 'prebuilt.xml', 'libraries.xml', 'binaries.xml' ]
+
+# The cache is kept next to the log file
+def getModelCacheFile():
+    LOGFILE = os.environ.get('ARLOGF')
+    if not LOGFILE:
+        LOGFILE = ARPathFromHere('build.log')
+    return os.path.join(os.path.dirname(LOGFILE), 'build.model')
+
+def getModelCacheKey(paths):
+    key = hashlib.sha1()
+    key.update(('%s %s %s\n' % (tuple(sys.version_info), sys.platform, ARPathFromHere(''))).encode('utf-8'))
+    # The model classes are defined here, with helpers (ARIntern...) from ARFuncs
+    sources = [ os.path.abspath(path).replace('.pyc', '.py') for path in (__file__, sys.modules['ARFuncs'].__file__) ]
+    for root_path in paths:
+        for name in MANIFEST_FILES:
+            sources.append(os.path.abspath('%(root_path)s/%(name)s' % locals()))
+    for path in sources:
+        st = os.stat(path)
+        key.update(('%s %d %d\n' % (path, st.st_size, int(st.st_mtime * 1000000))).encode('utf-8'))
+        xfile = open(path, 'rb')
+        key.update(xfile.read())
+        xfile.close()
+    return key.hexdigest()
+
+def loadModelCache(cacheFile, key):
+    try:
+        cfile = open(cacheFile, 'rb')
+        try:
+            (cacheKey, model) = pickle.load(cfile)
+        finally:
+            cfile.close()
+    except Exception:
+        return None
+    if cacheKey != key:
+        return None
+    return model
+
+def storeModelCache(cacheFile, key, model):
+    tmpFile = '%s.%d' % (cacheFile, os.getpid())
+    try:
+        cfile = open(tmpFile, 'wb')
+        try:
+            pickle.dump((key, model), cfile, pickle.HIGHEST_PROTOCOL)
+        finally:
+            cfile.close()
+        os.rename(tmpFile, cacheFile)
+    except Exception:
+        ARDeleteIfExists(tmpFile)
+
+def parseAll(paths, cacheFile=None):
+    key = None
+    if cacheFile is not None:
+        try:
+            key = getModelCacheKey(paths)
+        except (IOError, OSError):
+            # Let the parsers report the missing file
+            key = None
+    if key is not None:
+        model = loadModelCache(cacheFile, key)
+        if model is not None:
+            return model
     repos = parseRepoXmlFile(paths)
     targets = parseTargetsXmlFile(paths)
     prebuilts = parsePrebuiltXmlFile(paths, targets)
     libraries = parseLibraryXmlFile(paths, targets, prebuilts)
     binaries = parseBinariesXmlFile(paths, targets, libraries)
-    return (repos, targets, prebuilts, libraries, binaries)
+    model = (repos, targets, prebuilts, libraries, binaries)
+    if key is not None:
+        storeModelCache(cacheFile, key, model)
+    return model